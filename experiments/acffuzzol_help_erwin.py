@@ -1,18 +1,16 @@
-with open('./coverages/linecovmap_gen50_0.txt', 'r') as f:
-  lines_erwin = set(f.read().splitlines())
-with open('./coverages/linecovmap_acffuzzolerwin.txt', 'r') as f:
-  lines_acffuzzolerwin = set(f.read().splitlines())
-with open('./coverages/linecovmap_unittest.txt', 'r') as f:
-  lines_unittest = set(f.read().splitlines())
+from covmap import load_coverage_map, get_index
+line_index = get_index('line')
+edge_index = get_index('edge')
+
+lines_erwin = load_coverage_map('./coverages/linecovmap_gen50_0.npz', line_index)
+lines_acffuzzolerwin = load_coverage_map('./coverages/linecovmap_acffuzzolerwin.npz', line_index)
+lines_unittest = load_coverage_map('./coverages/linecovmap_unittest.npz', line_index)
 
 print(f'Fuzz and ACF helps Erwin to cover {len(lines_acffuzzolerwin - lines_erwin - lines_unittest)} lines that unit test cannot cover')
 
-with open('./coverages/edgecovmap_gen50.txt', 'r') as f:
-  edges_erwin = set(f.read().splitlines())
-with open('./coverages/edgecovmap_acffuzzolerwin.txt', 'r') as f:
-  edges_acffuzzolerwin = set(f.read().splitlines())
-with open('./coverages/edgecovmap_unittest.txt', 'r') as f:
-  edges_unittest = set(f.read().splitlines())
+edges_erwin = load_coverage_map('./coverages/edgecovmap_gen50.npz', edge_index)
+edges_acffuzzolerwin = load_coverage_map('./coverages/edgecovmap_acffuzzolerwin.npz', edge_index)
+edges_unittest = load_coverage_map('./coverages/edgecovmap_unittest.npz', edge_index)
 
 print(f'Fuzz and ACF helps Erwin to cover {len(edges_acffuzzolerwin - edges_erwin - edges_unittest)} edges that unit test cannot cover')
 
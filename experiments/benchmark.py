@@ -1,16 +1,24 @@
 import subprocess
 import os
 from compile import solidity_compilation_flags
+from compile_cache import CompileCache, cache_key, normalise_error, restore_error, returncode_to_result, result_to_returncode
+from runner import run, classify, megabytes, TIMEOUT, OOM
+from checkpoint import save_json_atomically, load_json_checkpoint
+from scheduler import RandomScheduler, BanditScheduler, subsets
 import numpy as np
 from colorama import Fore
 import glob
 import sys
 import csv
 import time
-from collections import defaultdict
+from collections import defaultdict, namedtuple
 import shutil
 import json
 import re
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import cpu_count
 
 def install_benchmark():
   print("Installing benchmark")
@@ -53,19 +61,57 @@ def extract_error(err):
       return line
   return err
 
-def compile(solc_path, sol_file):
-  compile_command = f'{solc_path} {sol_file}'
+# Shared with Erwin's test mode when both run from the repository root
+compile_cache = CompileCache('./compile_cache')
+
+def compile(solc_path, sol_file, timeout=None, memory_bytes=None):
+  '''
+  Compile the program under the time and memory limits.
+  Return (error message, output, return code, outcome), where the outcome is one of runner's classes
+  and the return code is None if the compilation timed out.
+  '''
+  with open(sol_file, 'r') as f:
+    key = cache_key(f.read(), solc_path)
+  cached = compile_cache.get(key)
+  if cached is not None:
+    err = restore_error(cached['error'], sol_file)
+    returncode = result_to_returncode(cached)
+    return remove_generated_program_names(extract_error(err)), '', returncode, classify(returncode, err)
+  compile_command = [solc_path, sol_file]
   # print(Fore.GREEN + f'compiler_command: {compile_command}')
-  try:
-    p = subprocess.run(compile_command, shell=True, capture_output=True)
-    return remove_generated_program_names(extract_error(p.stderr.decode('utf-8'))), p.stdout.decode('utf-8'), p.returncode
-  except subprocess.CalledProcessError as e:
-    print(f"Error occurred: {e}")
-    sys.exit(1)
+  p = run(compile_command, timeout=timeout, memory_bytes=memory_bytes)
+  err = p.stderr.decode('utf-8', 'replace')
+  # Timeouts and OOMs depend on the limits of this run, so they are not cached
+  if p.outcome not in [TIMEOUT, OOM]:
+    status, signal_name = returncode_to_result(p.returncode)
+    compile_cache.put(key, status, signal_name, normalise_error(err, sol_file))
+  return remove_generated_program_names(extract_error(err)), p.stdout.decode('utf-8', 'replace'), p.returncode, p.outcome
 
-def generate():
+def compile_job(version, solc_path, sol_file, timeout, memory_bytes):
+  '''
+  Compile one generated program with one solc version in a worker process.
+  Return the (version, program) pair together with the compilation result
+  so that results can be collected in completion order.
+  '''
+  err, out, returncode, outcome = compile(solc_path, sol_file, timeout, memory_bytes)
+  return version, sol_file, err, returncode, outcome
+
+def benchmark_scheduler(kind):
+  '''
+  The scheduler of the Erwin command of every round.
+  The bandit chooses among the commands, -max 50, 100 or 150, and the optional suffixes,
+  and is rewarded with the new bugs per second of a round.
+  '''
+  if kind == 'bandit':
+    arms = [f'{command} -max {max_count} {" ".join(subset)}'.strip()
+            for command in commands for max_count in [50, 100, 150]
+            for subset in subsets(optional_command_suffixes, len(optional_command_suffixes) - 1)]
+    return BanditScheduler(arms, './experiments/test_programs/scheduler.json')
+  return RandomScheduler(lambda: f'{np.random.choice(commands)} -max 100 {" ".join(optional_command_suffix())}'.strip())
+
+def generate(arm):
   suffix = ' --error_prob 0.0'
-  command = f'{np.random.choice(commands)} -max 100 --generation_rounds 1 --refresh_folder {" ".join(optional_command_suffix())} {suffix}'
+  command = f'{arm} --generation_rounds 1 --refresh_folder {suffix}'
   # print(Fore.CYAN + f"Erwin command: {command}")
   heads = [
     'pragma experimental ABIEncoderV2;',
@@ -166,36 +212,187 @@ def load_json(file_path):
   return {}
 
 def save_json(file_path, data):
-  with open(file_path, 'w') as f:
-    json.dump(data, f, indent=2)
-
-def compare_strings(s1, s2):
-  def match(str1, pattern):
-    if not pattern:
-      return not str1
-    if not str1 and pattern != '#':
+  save_json_atomically(file_path, data, indent=2)
+
+def signature_regex(signature):
+  '''
+  Translate an error signature into a regular expression.
+  '#' in a signature matches any (possibly empty) sequence of characters, and everything else matches itself.
+  '''
+  # Consecutive wildcards are collapsed so that the regex does not stack `.*`
+  return '.*'.join(re.escape(piece) for piece in re.sub('#+', '#', signature).split('#'))
+
+class SignatureIndex:
+  '''
+  All error signatures of one solc version compiled into a single anchored regex,
+  so that an error message is matched against every signature in one pass
+  instead of one recursive wildcard match per signature.
+  '''
+  def __init__(self, signatures, regex=None):
+    self.signatures = set(signatures)
+    if regex is None:
+      regex = '|'.join(f'(?:{signature_regex(signature)})' for signature in sorted(self.signatures))
+    self.regex = regex
+    self.pattern = re.compile(regex, re.DOTALL) if self.signatures else None
+
+  def __contains__(self, signature):
+    return signature in self.signatures
+
+  def match(self, message):
+    return self.pattern is not None and self.pattern.fullmatch(message) is not None
+
+def signatures_hash(signatures):
+  return hashlib.sha256(json.dumps(sorted(set(signatures))).encode('utf-8')).hexdigest()
+
+def load_signature_indexes(signatures, path='./experiments/error_message_index.json'):
+  '''
+  Build the SignatureIndex of each version from {version: [signature, ...]}.
+  The compiled regexes are cached in `path`, next to error_message.json,
+  and the cache entry of a version is rebuilt once its signatures change.
+  '''
+  cache = load_json(path)
+  indexes = {}
+  updated = False
+  for version, version_signatures in signatures.items():
+    digest = signatures_hash(version_signatures)
+    entry = cache.get(version)
+    if entry is not None and entry['hash'] == digest:
+      indexes[version] = SignatureIndex(version_signatures, entry['regex'])
+    else:
+      indexes[version] = SignatureIndex(version_signatures)
+      cache[version] = {'hash': digest, 'regex': indexes[version].regex}
+      updated = True
+  if updated:
+    save_json(path, cache)
+  return indexes
+
+# The oracle of one solc version: its compiler, the SignatureIndex of the error messages of its
+# bug-triggering programs, and the set of error messages of the bugs already found with it
+Oracle = namedtuple('Oracle', ['solc_path', 'index', 'seen'])
+
+def benchmark_fingerprint(path, error_message_path):
+  '''
+  Identify the benchmark checkout by the modification times of its version folders,
+  which change when programs are added or removed, and the collected error messages by their content.
+  '''
+  h = hashlib.sha256()
+  for version in sorted(os.listdir(path)):
+    h.update(f'{version}:{os.stat(os.path.join(path, version)).st_mtime_ns}\n'.encode('utf-8'))
+  with open(error_message_path, 'rb') as f:
+    h.update(f.read())
+  return h.hexdigest()
+
+def scan_benchmark(path, error_messages):
+  '''
+  Map each solc version in the benchmark to its compiler and the error messages of its bug-triggering programs.
+  '''
+  versions = {}
+  for version in os.listdir(path):
+    signatures = []
+    for file in os.listdir(os.path.join(path, version)):
+      if file == 'solc-static-linux':
+        continue
+      file_path = os.path.join(path, version, file)
+      if file_path in error_messages:
+        signatures.append(error_messages[file_path])
+    versions[version] = {'solc_path': os.path.join(path, version, 'solc-static-linux'), 'signatures': signatures}
+  return versions
+
+def load_oracles(path, error_message_path, bugs_data, index_path='./experiments/oracle_index.json'):
+  '''
+  Build the Oracle of every solc version in the benchmark.
+  The scan of the benchmark is saved in `index_path` together with the fingerprint of the benchmark,
+  so the version folders are only listed again when the checkout or error_message.json changes.
+  The seen error messages come from the bugs recorded in bugs.json.
+  '''
+  fingerprint = benchmark_fingerprint(path, error_message_path)
+  cache = load_json(index_path)
+  if cache.get('fingerprint') == fingerprint:
+    versions = cache['versions']
+  else:
+    versions = scan_benchmark(path, load_json(error_message_path))
+    save_json(index_path, {'fingerprint': fingerprint, 'versions': versions})
+  indexes = load_signature_indexes({version: entry['signatures'] for version, entry in versions.items()})
+  return {version: Oracle(entry['solc_path'], indexes[version], set(bugs_data.get(version, {}).values()))
+          for version, entry in versions.items()}
+
+def record_bug(version, sol_file, err, returncode, oracle, bugs):
+  '''
+  Record the program as a bug of the version if it fails in the same way as a benchmark program of this version
+  and no recorded program of this version has failed in this way before.
+  The program is copied instead of moved because other versions may still be compiling it.
+  '''
+  if returncode == -11:
+    if 'segfault' not in oracle.index or 'segfault' in oracle.seen:
       return False
-    if pattern[0] == '#':
-      return match(str1, pattern[1:]) or (str1 and match(str1[1:], pattern))
-    return str1 and str1[0] == pattern[0] and match(str1[1:], pattern[1:])
-  return match(s1, s2)
-
-def contains(s1, ss):
-  for s2 in ss:
-    if compare_strings(s1, s2):
-      return True
-  return False
+    err = 'segfault'
+  elif returncode is None or not err:
+    return False
+  elif not oracle.index.match(err) or err in oracle.seen:
+    return False
+  sol_file_name = sol_file.split('/')[-1]
+  bugs[version][sol_file_name] = err
+  oracle.seen.add(err)
+  if not os.path.exists(f'./experiments/test_programs/{version}'):
+    os.makedirs(f'./experiments/test_programs/{version}')
+  shutil.copy(sol_file, f'./experiments/test_programs/{version}/{sol_file_name}')
+  return True
+
+def record_hang(version, sol_file, outcome, hangs):
+  '''
+  Record a program that exceeds the time or memory limit of the version.
+  The benchmark has no such bugs to match, so every such program is kept as a finding
+  under ./experiments/test_programs/<outcome>/<version>.
+  '''
+  sol_file_name = sol_file.split('/')[-1]
+  hangs[version][sol_file_name] = outcome
+  hang_dir = f'./experiments/test_programs/{outcome}/{version}'
+  if not os.path.exists(hang_dir):
+    os.makedirs(hang_dir)
+  shutil.copy(sol_file, f'{hang_dir}/{sol_file_name}')
+  print(Fore.RED + f'{outcome}: {sol_file_name} with solc {version}')
+
+def differential_testing(executor, oracles, sol_files, timeout, memory_bytes=None):
+  '''
+  Compile every generated program with every solc version on the process pool.
+  Results are checked against the oracles in completion order in this process,
+  so the deduplication against the seen error messages sees one result at a time.
+  Return (bugs, hangs): the newly found bugs, a dict from version to a dict from program name to error message,
+  and the programs that time out or run out of memory, a dict from version to a dict from program name to the outcome.
+  '''
+  bugs = defaultdict(dict)
+  hangs = defaultdict(dict)
+  futures = [executor.submit(compile_job, version, solc_path, sol_file, timeout, memory_bytes)
+             for version, (solc_path, _, _) in oracles.items()
+             for sol_file in sol_files]
+  for future in as_completed(futures):
+    version, sol_file, err, returncode, outcome = future.result()
+    if outcome in [TIMEOUT, OOM]:
+      record_hang(version, sol_file, outcome, hangs)
+    else:
+      record_bug(version, sol_file, err, returncode, oracles[version], bugs)
+  return bugs, hangs
 
 if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--jobs', type=int, help='Number of compiler processes running in parallel', default=cpu_count())
+  parser.add_argument('--timeout', type=float, help='Time limit in seconds of compiling one program with one solc version', default=60)
+  parser.add_argument('--scheduler', type=str, help='How the Erwin command of a round is chosen: uniformly at random, or by a UCB1 bandit rewarded with the new bugs per second of a round', choices=['random', 'bandit'], default='random')
+  parser.add_argument('--resume', action='store_true', help='Continue the campaign with the time budget left at its last checkpoint')
+  parser.add_argument('--memory_limit', type=int, help='Memory limit in MB of compiling one program with one solc version, 0 for no limit', default=4096)
+  args = parser.parse_args()
   if sys.platform != 'linux':
     print("This script is only supported on Linux.")
     sys.exit(1)
   install_benchmark()
-  benchmark_error_message = load_json('./experiments/error_message.json')
   time_limit = 20*24*3600
   time_budget = time_limit
+  # The bugs found so far are in bugs.json and hangs.json, so the time budget is all the checkpoint needs
+  checkpoint_file = './experiments/test_programs/checkpoint.json'
+  checkpoint = load_json_checkpoint(checkpoint_file) if args.resume else None
+  if checkpoint is not None:
+    time_budget = checkpoint['time_budget']
   path = './ISSTA24-Solidity-Study/benchmark'
-  bugs_error_message = defaultdict(set)
   if not os.path.exists('./experiments/test_programs'):
     os.makedirs('./experiments/test_programs')
   bugs_file = './experiments/test_programs/bugs.json'
@@ -203,48 +400,25 @@ if __name__ == "__main__":
     with open(bugs_file, 'w') as f:
       f.write('')
   bugs_data = load_json(bugs_file)
-  for version in bugs_data:
-    for bug in bugs_data[version]:
-      bugs_error_message[version].add(bugs_data[version][bug])
-  while time_budget > 0:
-    time_budget -= generate()
-    for version in os.listdir(path):
-      bugs = dict()
-      other_bugs = dict()
-      solc_path = os.path.join(path, version, 'solc-static-linux')
-      vals = []
-      for file in os.listdir(os.path.join(path, version)):
-        if file == 'solc-static-linux':
-          continue
-        file_path = os.path.join(path, version, file)
-        if file_path in benchmark_error_message and version in file_path:
-          vals.append(benchmark_error_message[file_path])
-      for sol_file in glob.glob(os.path.join('./generated_programs', '*.sol')):
-        err, out, returncode = compile(solc_path, sol_file)
-        if returncode == -11:
-          sol_file_name = sol_file.split('/')[-1]
-          record = False
-          if 'segfault' in vals and 'segfault' not in bugs_error_message[version]:
-            bugs[sol_file_name] = 'segfault'
-            bugs_error_message[version].add('segfault')  
-            record = True
-          if record:
-            if not os.path.exists(f'./experiments/test_programs/{version}'):
-              os.makedirs(f'./experiments/test_programs/{version}')
-            shutil.move(sol_file, f'./experiments/test_programs/{version}/{sol_file_name}')
-        elif err:
-          sol_file_name = sol_file.split('/')[-1]
-          record = False
-          if contains(err, vals) and err not in bugs_error_message[version]:
-            bugs[sol_file_name] = err
-            bugs_error_message[version].add(err)
-            record = True
-          if record:
-            if not os.path.exists(f'./experiments/test_programs/{version}'):
-              os.makedirs(f'./experiments/test_programs/{version}')
-            shutil.move(sol_file, f'./experiments/test_programs/{version}/{sol_file_name}')
-      if version not in bugs_data:
-        bugs_data[version] = {}
-      bugs_data[version].update(bugs)
+  hangs_file = './experiments/test_programs/hangs.json'
+  hangs_data = load_json(hangs_file)
+  oracles = load_oracles(path, './experiments/error_message.json', bugs_data)
+  scheduler = benchmark_scheduler(args.scheduler)
+  with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+    while time_budget > 0:
+      round_start = time.time()
+      arm = scheduler.choose()
+      time_budget -= generate(arm)
+      sol_files = glob.glob(os.path.join('./generated_programs', '*.sol'))
+      bugs, hangs = differential_testing(executor, oracles, sol_files, args.timeout, megabytes(args.memory_limit))
+      scheduler.reward(arm, sum(len(version_bugs) for version_bugs in bugs.values()), time.time() - round_start)
+      for version in oracles:
+        if version not in bugs_data:
+          bugs_data[version] = {}
+        bugs_data[version].update(bugs[version])
+        if hangs[version]:
+          hangs_data.setdefault(version, {}).update(hangs[version])
       save_json(bugs_file, bugs_data)
-    print(f'Time left: {time_budget} seconds')
\ No newline at end of file
+      save_json(hangs_file, hangs_data)
+      save_json(checkpoint_file, {'time_budget': time_budget})
+      print(f'Time left: {time_budget} seconds')
@@ -0,0 +1,64 @@
+'''
+Checkpoints of long-running campaigns.
+
+benchmark.py and coverage.py save their campaign state after every round,
+so that `--resume` continues a campaign killed by an OOM or a reboot
+with the time budget, the coverage and the time-series files where the last round left them.
+Every checkpoint is written to a temporary file and renamed into place, so a crash
+while checkpointing leaves the previous checkpoint intact.
+'''
+import json
+import os
+import tempfile
+
+def save_json_atomically(path, data, indent=None):
+  directory = os.path.dirname(path) or '.'
+  os.makedirs(directory, exist_ok=True)
+  fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+  with os.fdopen(fd, 'w') as f:
+    json.dump(data, f, indent=indent)
+    f.flush()
+    os.fsync(f.fileno())
+  os.replace(tmp, path)
+
+def load_json_checkpoint(path):
+  try:
+    with open(path, 'r') as f:
+      return json.load(f)
+  except (FileNotFoundError, json.JSONDecodeError):
+    return None
+
+class Checkpoint:
+  '''
+  The checkpoint of a campaign of several executions.
+  It holds {'execution': i, 'series_offset': n, ...} while execution i runs, where n is the size of the
+  time-series file after the last recorded round and the rest is the state the campaign saves with the round,
+  and {'execution': i + 1} once execution i is over.
+  '''
+  def __init__(self, path, resume):
+    self.path = path
+    self.state = load_json_checkpoint(path) if resume else None
+
+  def first_execution(self):
+    return 0 if self.state is None else self.state['execution']
+
+  def resumes(self, execution):
+    '''Whether the execution continues from a saved round instead of starting over.'''
+    return self.state is not None and self.state['execution'] == execution and 'series_offset' in self.state
+
+  def open_series(self, path, execution):
+    '''
+    Open the time-series file of the execution.
+    A resumed file is cut back to the last checkpointed round, so rounds after it are not recorded twice.
+    '''
+    if not self.resumes(execution):
+      return open(path, 'w')
+    series = open(path, 'a')
+    series.truncate(self.state['series_offset'])
+    return series
+
+  def save_round(self, execution, series, **state):
+    save_json_atomically(self.path, {'execution': execution, 'series_offset': series.tell(), **state})
+
+  def save_execution(self, execution):
+    save_json_atomically(self.path, {'execution': execution + 1})
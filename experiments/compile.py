@@ -1,4 +1,6 @@
+import json
 import random
+from runner import run, OK, ERROR, TIMEOUT
 
 def solidity_compilation_flags() -> str:
   output_flags = [
@@ -112,3 +114,151 @@ def solidity_compilation_flags() -> str:
 
   flags = f"{pick_random_element(selected_output_flags)} {' '.join(selected_opt_flags)} {' '.join(selected_model_checker_flags)} --via-ir"
   return flags
+
+# Output flags of the command line and the corresponding output selection of the standard JSON interface.
+# Each pair is (file-level outputs, contract-level outputs).
+standard_json_outputs = {
+  '--ast-compact-json': (['ast'], []),
+  '--asm': ([], ['evm.assembly']),
+  '--asm-json': ([], ['evm.legacyAssembly']),
+  '--opcodes': ([], ['evm.bytecode.opcodes']),
+  '--bin': ([], ['evm.bytecode.object']),
+  '--bin-runtime': ([], ['evm.deployedBytecode.object']),
+  '--abi': ([], ['abi']),
+  '--ir': ([], ['ir']),
+  '--ir-ast-json': ([], ['irAst']),
+  '--ir-optimized': ([], ['irOptimized']),
+  '--ir-optimized-ast-json': ([], ['irOptimizedAst']),
+  '--hashes': ([], ['evm.methodIdentifiers']),
+  '--userdoc': ([], ['userdoc']),
+  '--devdoc': ([], ['devdoc']),
+  '--metadata': ([], ['metadata']),
+  '--storage-layout': ([], ['storageLayout']),
+}
+
+def standard_json_settings(flags: str) -> dict:
+  '''
+  Translate the command-line flags returned by solidity_compilation_flags()
+  into the equivalent `settings` of a `solc --standard-json` input.
+  '''
+  settings = {'outputSelection': {'*': {'': [], '*': []}}}
+  optimizer = {}
+  model_checker = {}
+  tokens = flags.split()
+  i = 0
+  def value():
+    nonlocal i
+    i += 1
+    return tokens[i]
+  while i < len(tokens):
+    flag = tokens[i]
+    if flag in standard_json_outputs:
+      file_outputs, contract_outputs = standard_json_outputs[flag]
+      settings['outputSelection']['*'][''] += file_outputs
+      settings['outputSelection']['*']['*'] += contract_outputs
+    elif flag == '--via-ir':
+      settings['viaIR'] = True
+    elif flag == '--optimize':
+      optimizer['enabled'] = True
+    elif flag == '--optimize-runs':
+      optimizer['runs'] = int(value())
+    elif flag == '--optimize-yul':
+      optimizer.setdefault('details', {})['yul'] = True
+    elif flag == '--no-optimize-yul':
+      optimizer.setdefault('details', {})['yul'] = False
+    elif flag == '--yul-optimizations':
+      optimizer.setdefault('details', {}).setdefault('yulDetails', {})['optimizerSteps'] = value()
+    elif flag == '--model-checker-div-mod-no-slacks':
+      model_checker['divModNoSlacks'] = True
+    elif flag == '--model-checker-engine':
+      model_checker['engine'] = value()
+    elif flag == '--model-checker-ext-calls':
+      model_checker['extCalls'] = value()
+    elif flag == '--model-checker-invariants':
+      model_checker['invariants'] = value().split(',')
+    elif flag == '--model-checker-print-query':
+      model_checker['printQuery'] = True
+    elif flag == '--model-checker-show-proved-safe':
+      model_checker['showProvedSafe'] = True
+    elif flag == '--model-checker-show-unproved':
+      model_checker['showUnproved'] = True
+    elif flag == '--model-checker-show-unsupported':
+      model_checker['showUnsupported'] = True
+    elif flag == '--model-checker-solvers':
+      model_checker['solvers'] = value().split(',')
+    elif flag == '--model-checker-targets':
+      model_checker['targets'] = value().split(',')
+    elif flag == '--model-checker-timeout':
+      model_checker['timeout'] = int(value())
+    elif flag == '--model-checker-bmc-loop-iterations':
+      model_checker['bmcLoopIterations'] = int(value())
+    i += 1
+  if optimizer:
+    settings['optimizer'] = optimizer
+  if model_checker:
+    settings['modelChecker'] = model_checker
+  return settings
+
+def standard_json_input(sol_files, flags: str) -> dict:
+  '''Pack the programs into one `solc --standard-json` input, one source per program, compiled with the given flags.'''
+  sources = {}
+  for sol_file in sol_files:
+    with open(sol_file, 'r') as f:
+      sources[sol_file] = {'content': f.read()}
+  return {'language': 'Solidity', 'sources': sources, 'settings': standard_json_settings(flags)}
+
+# Errors in the settings rather than in a program, e.g., an unknown EVM version or SMT solver,
+# which every program of the bucket would get on its own
+SETTINGS_ERROR_TYPES = ['JSONError', 'ConfigError']
+
+def compile_standard_json(solc_path, sol_files, flags, env=None, timeout=None, memory_bytes=None):
+  '''
+  Compile the programs in one `solc --standard-json` process, bounded as runner.run bounds it.
+  Return (return code, decoded output, outcome of runner.run), where the output is None if solc did not print a valid JSON,
+  and the return code is None if the compilation timed out.
+  '''
+  standard_json = json.dumps(standard_json_input(sol_files, flags))
+  p = run([solc_path, '--standard-json'], timeout=timeout, memory_bytes=memory_bytes, input=standard_json, env=env, text=True)
+  if p.outcome == TIMEOUT:
+    return None, None, p.outcome
+  try:
+    return p.returncode, json.loads(p.stdout), p.outcome
+  except json.JSONDecodeError:
+    return p.returncode, None, p.outcome
+
+def compile_batch(solc_path, sol_files, flags, env=None, timeout=None, memory_bytes=None):
+  '''
+  Compile a bucket of programs in one solc process and map the diagnostics back to the programs.
+  Return {sol_file: (return code, [error message, ...], outcome)}, where the return code is 1 if the program
+  has an error, as `solc <flags> <sol_file>` would exit, and 0 otherwise, and the outcome is one of runner's outcomes.
+  If solc crashes, times out, runs out of memory, or reports an error that belongs to no program, e.g., an internal compiler error,
+  the bucket is bisected until the program that triggers it is compiled on its own,
+  and that program gets solc's own return code (negative for a signal, None for a timeout) or 1, and solc's outcome.
+  An error in the settings is not bisected but recorded for every program of the bucket.
+  '''
+  returncode, output, outcome = compile_standard_json(solc_path, sol_files, flags, env, timeout, memory_bytes)
+  results = {sol_file: (0, [], OK) for sol_file in sol_files}
+  unattributed = []
+  settings_errors = []
+  if returncode == 0 and output is not None:
+    for error in output.get('errors', []):
+      sol_file = error.get('sourceLocation', {}).get('file')
+      message = error.get('formattedMessage', error.get('message', ''))
+      if sol_file in results:
+        status, messages, _ = results[sol_file]
+        status = 1 if error.get('severity') == 'error' else status
+        results[sol_file] = (status, messages + [message], ERROR if status else OK)
+      elif error.get('severity') == 'error' and 'sourceLocation' not in error and error.get('type') in SETTINGS_ERROR_TYPES:
+        settings_errors.append(message)
+      elif error.get('severity') == 'error':
+        unattributed.append(message)
+  if settings_errors:
+    return {sol_file: (1, settings_errors, ERROR) for sol_file in sol_files}
+  if returncode == 0 and output is not None and not unattributed:
+    return results
+  if len(sol_files) == 1:
+    return {sol_files[0]: (returncode if returncode != 0 else 1, unattributed, outcome if outcome != OK else ERROR)}
+  middle = len(sol_files) // 2
+  results = compile_batch(solc_path, sol_files[:middle], flags, env, timeout, memory_bytes)
+  results.update(compile_batch(solc_path, sol_files[middle:], flags, env, timeout, memory_bytes))
+  return results
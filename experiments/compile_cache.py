@@ -0,0 +1,127 @@
+'''
+Content-addressed cache of compilation results.
+
+A result is keyed by (normalised program hash, compiler binary hash, flag string)
+and holds the exit status, the signal and the error message of the compilation,
+so a program that was already compiled by the same compiler with the same flags
+is not compiled again, in this run or in the following ones.
+Programs that only differ in whitespace share one entry.
+
+Every entry is a small JSON file `<folder>/<key[:2]>/<key>.json`.
+Entries are written to a temporary file and renamed into place, so concurrent
+writers, e.g., the worker processes of benchmark.py and Erwin's test mode (src/cache.ts),
+never see half-written entries. When the folder grows beyond `max_bytes`,
+the least recently used entries are evicted.
+'''
+import hashlib
+import json
+import os
+import re
+import shutil
+import signal
+import tempfile
+
+PROGRAM_PLACEHOLDER = '<program>'
+
+def normalise_program(program):
+  return re.sub(r'\s+', ' ', program).strip()
+
+def program_hash(program):
+  return hashlib.sha256(normalise_program(program).encode('utf-8')).hexdigest()
+
+binary_hashes = {}
+def binary_hash(binary):
+  '''Hash the content of the compiler binary. Hashes are memoised until the binary changes.'''
+  path = shutil.which(binary) or binary
+  if not os.path.exists(path):
+    return hashlib.sha256(binary.encode('utf-8')).hexdigest()
+  st = os.stat(path)
+  signature = (path, st.st_mtime_ns, st.st_size)
+  if signature not in binary_hashes:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+      for chunk in iter(lambda: f.read(1 << 20), b''):
+        h.update(chunk)
+    binary_hashes[signature] = h.hexdigest()
+  return binary_hashes[signature]
+
+def cache_key(program, binary, flags=''):
+  return hashlib.sha256(f'{program_hash(program)}\n{binary_hash(binary)}\n{flags}'.encode('utf-8')).hexdigest()
+
+def normalise_error(stderr, sol_file):
+  '''Replace the path of the compiled program so that the error can be reused for another copy of the program.'''
+  return stderr.replace(sol_file, PROGRAM_PLACEHOLDER)
+
+def restore_error(error, sol_file):
+  return error.replace(PROGRAM_PLACEHOLDER, sol_file)
+
+def returncode_to_result(returncode):
+  '''Split a subprocess return code into (exit status, signal name); a negative code means the process was killed by a signal.'''
+  if returncode < 0:
+    return None, signal.Signals(-returncode).name
+  return returncode, None
+
+def result_to_returncode(result):
+  if result['signal'] is not None:
+    return -signal.Signals[result['signal']].value
+  return result['status']
+
+class CompileCache:
+  def __init__(self, folder='./compile_cache', max_bytes=1 << 30, eviction_interval=256):
+    self.folder = folder
+    self.max_bytes = max_bytes
+    self.eviction_interval = eviction_interval
+    self.puts = 0
+
+  def path(self, key):
+    return os.path.join(self.folder, key[:2], f'{key}.json')
+
+  def get(self, key):
+    '''Return the cached result, a dict with keys 'status', 'signal' and 'error', or None.'''
+    path = self.path(key)
+    try:
+      with open(path, 'r') as f:
+        result = json.load(f)
+      # Touch the entry so that eviction keeps recently used entries
+      os.utime(path)
+      return result
+    except (FileNotFoundError, json.JSONDecodeError):
+      return None
+
+  def put(self, key, status, signal_name, error):
+    path = self.path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+      json.dump({'status': status, 'signal': signal_name, 'error': error}, f)
+    os.replace(tmp, path)
+    self.puts += 1
+    if self.puts % self.eviction_interval == 0:
+      self.evict()
+
+  def evict(self):
+    '''Remove the least recently used entries until the cache takes at most 80% of max_bytes.'''
+    entries = []
+    total = 0
+    for root, _, files in os.walk(self.folder):
+      for file in files:
+        if not file.endswith('.json'):
+          continue
+        path = os.path.join(root, file)
+        try:
+          st = os.stat(path)
+        except FileNotFoundError:
+          continue
+        entries.append((st.st_mtime_ns, st.st_size, path))
+        total += st.st_size
+    if total <= self.max_bytes:
+      return
+    entries.sort()
+    for _, size, path in entries:
+      if total <= self.max_bytes * 0.8:
+        break
+      try:
+        os.remove(path)
+      except FileNotFoundError:
+        pass
+      total -= size
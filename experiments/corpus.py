@@ -0,0 +1,137 @@
+'''
+Per-program coverage attribution and corpus minimisation.
+
+A corpus folder keeps every program that covered something new when it was compiled,
+together with the coverage map of everything the program covered (`<program>.npz`),
+and novelty.csv lists the kept programs in arrival order with the number of keys
+each one covered and the number of keys it covered first.
+The bit positions of all maps of a corpus come from the coverage index of the execution,
+whose keys are copied into the corpus folder (corpus.index) so that the maps can be read after the index is gone.
+The shm backend has no keys, its positions are the edge ids of the instrumented compiler build.
+
+`python corpus.py minimise <output folder> <corpus folder>...` picks the smallest subset of the programs
+that preserves the union of their coverage by greedy set cover, and copies it into the output folder,
+which gives a small regression corpus to replay against new compiler builds.
+'''
+import csv
+import glob
+import heapq
+import os
+import shutil
+import sys
+import numpy as np
+from covmap import CoverageIndex, CoverageMap, load_coverage_map
+
+class Corpus:
+  def __init__(self, folder, index):
+    self.folder = folder
+    self.index = index
+    os.makedirs(folder, exist_ok=True)
+    self.folder_index = CoverageIndex(os.path.join(folder, 'corpus.index'))
+
+  def add(self, sol_file, positions, covered):
+    '''
+    Add the bit positions covered by compiling `sol_file` into the coverage map `covered`.
+    If any of them is new, keep the program and its coverage map in the corpus.
+    Return the number of new positions.
+    '''
+    positions = np.unique(np.asarray(positions, dtype=np.int64))
+    if len(positions) == 0:
+      return 0
+    covered._fit(int(positions[-1]) + 1)
+    new = int(np.count_nonzero(~covered.bits[positions]))
+    covered.add_positions(positions)
+    if new == 0:
+      return 0
+    # The index of the execution only grows, so the copy stays a prefix of it
+    for key in self.index.keys[len(self.folder_index):]:
+      self.folder_index.position(key)
+    self.folder_index.save()
+    stem = os.path.splitext(os.path.basename(sol_file))[0]
+    program_map = CoverageMap(self.index)
+    program_map.add_positions(positions)
+    program_map.save(os.path.join(self.folder, f'{stem}.npz'))
+    shutil.copy(sol_file, self.folder)
+    with open(os.path.join(self.folder, 'novelty.csv'), 'a') as f:
+      csv.writer(f).writerow([os.path.basename(sol_file), len(positions), new])
+    return new
+
+def greedy_set_cover(bitmaps):
+  '''
+  Pick programs until their union covers the union of all bitmaps, each time the one covering the most uncovered bits.
+  Gains only shrink as programs are picked, so stale gains in the heap are upper bounds
+  and a program is only re-evaluated when it reaches the top (lazy greedy).
+  Return the picked indexes of `bitmaps` with the number of bits each one added.
+  '''
+  size = max((len(bits) for bits in bitmaps), default=0)
+  bitmaps = [np.concatenate([bits, np.zeros(size - len(bits), dtype=bool)]) for bits in bitmaps]
+  uncovered = np.zeros(size, dtype=bool)
+  for bits in bitmaps:
+    uncovered |= bits
+  heap = [(-int(np.count_nonzero(bits)), k) for k, bits in enumerate(bitmaps)]
+  heapq.heapify(heap)
+  picked = []
+  while heap and uncovered.any():
+    _, k = heapq.heappop(heap)
+    gain = int(np.count_nonzero(bitmaps[k] & uncovered))
+    if gain == 0:
+      continue
+    if heap and gain < -heap[0][0]:
+      heapq.heappush(heap, (-gain, k))
+      continue
+    picked.append((k, gain))
+    uncovered &= ~bitmaps[k]
+  return picked
+
+def load_corpora(corpus_folders, index):
+  '''
+  Load the programs of the corpus folders with their coverage maps over `index`.
+  Each folder numbers its keys with its own index, so its positions are mapped back to keys
+  and positioned again in `index`. Folders without keys (the shm backend) keep their edge ids.
+  Return the (program, map file) pairs and the bitmaps in the same order.
+  '''
+  programs = []
+  bitmaps = []
+  for folder in corpus_folders:
+    folder_index = CoverageIndex(os.path.join(folder, 'corpus.index'))
+    for npz in sorted(glob.glob(os.path.join(folder, '*.npz'))):
+      sol_file = os.path.splitext(npz)[0] + '.sol'
+      if not os.path.exists(sol_file):
+        continue
+      bits = load_coverage_map(npz, folder_index).bits
+      if len(folder_index) > 0:
+        program_map = CoverageMap(index)
+        program_map.add_positions([index.position(folder_index.keys[pos]) for pos in np.flatnonzero(bits)])
+        bits = program_map.bits
+      programs.append((sol_file, npz))
+      bitmaps.append(bits)
+  return programs, bitmaps
+
+def minimise(output_folder, corpus_folders):
+  '''
+  Copy the programs picked by greedy set cover into `output_folder` with their maps over one shared index,
+  so that the output is a corpus folder itself. Return the picked programs with the number of keys each one added.
+  '''
+  os.makedirs(output_folder, exist_ok=True)
+  index_path = os.path.join(output_folder, 'corpus.index')
+  if os.path.exists(index_path):
+    os.remove(index_path)
+  index = CoverageIndex(index_path)
+  programs, bitmaps = load_corpora(corpus_folders, index)
+  picked = greedy_set_cover(bitmaps)
+  with open(os.path.join(output_folder, 'minimised.csv'), 'w') as f:
+    writer = csv.writer(f)
+    for k, gain in picked:
+      sol_file, npz = programs[k]
+      shutil.copy(sol_file, output_folder)
+      CoverageMap(index, bitmaps[k]).save(os.path.join(output_folder, os.path.basename(npz)))
+      writer.writerow([os.path.basename(sol_file), gain])
+  covered = sum(gain for _, gain in picked)
+  print(f'{len(picked)} of {len(programs)} programs cover all {covered} keys of the corpus')
+  return [(programs[k][0], gain) for k, gain in picked]
+
+if __name__ == '__main__':
+  if len(sys.argv) < 4 or sys.argv[1] != 'minimise':
+    print('Usage: python corpus.py minimise <output folder> <corpus folder>...')
+    exit(1)
+  minimise(sys.argv[2], sys.argv[3:])
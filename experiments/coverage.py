@@ -3,6 +3,7 @@ import glob
 import numpy as np
 import subprocess
 import os
+import shutil
 from collections import defaultdict, namedtuple
 import sys
 import time
@@ -14,24 +15,27 @@ from multiprocessing import Pool, cpu_count
 from concurrent.futures import ProcessPoolExecutor, as_completed, ThreadPoolExecutor
 import argparse
 import asyncio
-from compile import solidity_compilation_flags
+from compile import solidity_compilation_flags, standard_json_input, compile_batch
+from erwin_server import ErwinServer
+from covmap import CoverageIndex, CoverageMap, get_index, load_coverage_map
+from llvmcov import ProfdataMerger, export_branches, merge_profiles
+from shmcov import ForkServer
+from runner import run, classify, megabytes, TIMEOUT, OOM
+from checkpoint import Checkpoint
+from scheduler import RandomScheduler, BanditScheduler, subsets
+from corpus import Corpus
 
 def int_to_string_array(int_array):
   string_array = [str(num) for num in int_array]
   return string_array
 
-# Extract edge coverages from llvm-cov JSON file
-def extract_collected_edges(coverage_data) -> dict :
-  position = namedtuple('Position', ['function_name', 'line_start', 'column_start', 'line_end', 'column_end'])
+Position = namedtuple('Position', ['function_name', 'line_start', 'column_start', 'line_end', 'column_end'])
+
+# Extract edge coverages from the branches streamed out of llvm-cov export, see llvmcov.iter_branches
+def extract_collected_edges(branches) -> dict :
   collected_edges = defaultdict(int)
-  # Iterate through the functions in the coverage data
-  for function in coverage_data['data'][0]['functions']:
-    function_name = function['name']
-    # Check if the function has collected edges
-    if 'branches' in function:
-      for branch in function['branches']:
-        # https://github.com/llvm/llvm-project/blob/34f8573a514915222630cf21e8a0c901a25f4ca0/llvm/tools/llvm-cov/CoverageExporterJson.cpp#L96
-        collected_edges[position(function_name, branch[0],branch[1],branch[2],branch[3])] = branch[4]
+  for function_name, line_start, column_start, line_end, column_end, count in branches:
+    collected_edges[Position(function_name, line_start, column_start, line_end, column_end)] = count
   return collected_edges
 
 solidity_sources = []
@@ -46,61 +50,125 @@ def collect_solidity_sources(root_dir):
 # Define a named tuple for filename and line number
 FilenameLine = namedtuple('FilenameLine', ['filename', 'linenum'])
 
-def process_gcov_file(gcov_file):
-  collected_lines = set()
-  lines = set()
+# The state of a line in a source file.
+# A line can only move to a larger state during an execution.
+NOT_A_LINE = 0
+UNCOVERED_LINE = 1
+COVERED_LINE = 2
 
-  with open(gcov_file, 'r') as f:
-    stmtlines = f.readlines()
+# (mtime, size) of each .gcda file when gcov last ran on it
+gcda_signatures = {}
+# gcov filename (the basename of the source file + '.gcov') -> bytearray of line states indexed by line number.
+# It accumulates the line coverage of all .gcda files since the last reset.
+line_states = {}
 
-  for line in stmtlines:
-    if line == '------------------\n':
-      continue
-    
-    parts = line.strip().split(':')
-    if len(parts) < 2:
+class LineSet:
+  """
+  A read-only view of the lines in `line_states` whose state is not less than `min_state`.
+  It supports len() and iteration over FilenameLine, so it can stand in for the
+  set of FilenameLine returned by extract_collected_lines before.
+  FilenameLine tuples are only built when iterating.
+  """
+  def __init__(self, line_states, min_state):
+    self.line_states = line_states
+    self.min_state = min_state
+
+  def __len__(self):
+    if self.min_state == COVERED_LINE:
+      return sum(states.count(COVERED_LINE) for states in self.line_states.values())
+    return sum(len(states) - states.count(NOT_A_LINE) for states in self.line_states.values())
+
+  def __iter__(self):
+    for filename, states in self.line_states.items():
+      for linenum, state in enumerate(states):
+        if state >= self.min_state:
+          yield FilenameLine(filename=filename, linenum=str(linenum))
+
+def update_line_state(gcov_filename, linenum, state):
+  states = line_states.get(gcov_filename)
+  if states is None:
+    states = line_states[gcov_filename] = bytearray()
+  if linenum >= len(states):
+    states.extend(bytes(linenum + 1 - len(states)))
+  if state > states[linenum]:
+    states[linenum] = state
+
+def process_gcov_json(output):
+  """
+  Process the output of `gcov --json-format --stdout` on one .gcda file.
+  Only the sources of the Solidity compiler are kept.
+  """
+  for source in json.loads(output)['files']:
+    gcov_filename = os.path.basename(source['file']) + '.gcov'
+    if gcov_filename.split('.gcov')[0] not in solidity_sources:
       continue
+    for line in source['lines']:
+      update_line_state(gcov_filename, line['line_number'], COVERED_LINE if line['count'] > 0 else UNCOVERED_LINE)
 
+def process_gcov_text(output):
+  """
+  Process the output of `llvm-cov gcov --stdout` on one .gcda file, which
+  concatenates the .gcov contents of all source files reached from the .gcda file.
+  Each source starts with a `-:    0:Source:<path>` line.
+  Only the sources of the Solidity compiler are kept.
+  """
+  gcov_filename = None
+  for line in output.splitlines():
+    parts = line.split(':', 3)
+    if len(parts) < 3:
+      continue
     covcnt = parts[0].strip()
     linenum = parts[1].strip()
-
-    if covcnt != '-' and covcnt != '#####':
-      collected_lines.add(FilenameLine(filename=os.path.basename(gcov_file), linenum=linenum))
-      lines.add(FilenameLine(filename=os.path.basename(gcov_file), linenum=linenum))
-    elif covcnt == '#####':
-      lines.add(FilenameLine(filename=os.path.basename(gcov_file), linenum=linenum))
-
-  return collected_lines, lines
-
-def process_gcov_files(gcov_files):
-  total_collected_lines = set()
-  total_lines = set()
-
-  for gcov_file in gcov_files:
-    collected_lines, lines = process_gcov_file(gcov_file)
-    total_collected_lines.update(collected_lines)
-    total_lines.update(lines)
-
-  return total_collected_lines, total_lines
-
-# Extract line coverages from gcov files generated by gcov
-def extract_collected_lines(gcov_folder_path) -> set :
+    if len(parts) == 4 and covcnt == '-' and linenum == '0' and parts[2] == 'Source':
+      gcov_filename = os.path.basename(parts[3].strip()) + '.gcov'
+      continue
+    if gcov_filename is None or gcov_filename.split('.gcov')[0] not in solidity_sources or not linenum.isdigit():
+      continue
+    if covcnt == '#####':
+      update_line_state(gcov_filename, int(linenum), UNCOVERED_LINE)
+    elif covcnt != '-':
+      update_line_state(gcov_filename, int(linenum), COVERED_LINE)
+
+def reset_line_coverage_cache():
+  gcda_signatures.clear()
+  line_states.clear()
+
+def find_changed_gcda_files(gcda_folder_path):
+  """Find the .gcda files whose mtime or size changed since gcov last ran on them."""
+  changed_gcda_files = []
+  for gcda_file in find_gcda_files(gcda_folder_path):
+    stat = os.stat(gcda_file)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    if gcda_signatures.get(gcda_file) != signature:
+      gcda_signatures[gcda_file] = signature
+      changed_gcda_files.append(gcda_file)
+  return changed_gcda_files
+
+# Extract line coverages from the .gcda files that changed since the last call.
+# gcda counters only grow during an execution, so the covered lines of the
+# unchanged .gcda files are kept from the previous calls.
+# Return (covered lines, all lines), both iterate over FilenameLine.
+def extract_collected_lines(gcov_folder_path) -> tuple :
+  start = time.time()
+  changed_gcda_files = find_changed_gcda_files(gcov_folder_path)
+  end = time.time()
+  print(Fore.MAGENTA + f"find_changed_gcda_files: {end-start} seconds")
+  print(Fore.RESET + f"Found {len(changed_gcda_files)} changed .gcda files")
   start = time.time()
-  generate_gcov_files(gcov_folder_path)
+  outputs = generate_gcov_files_in_parallel(changed_gcda_files, gcov_folder_path)
   end = time.time()
-  print(Fore.MAGENTA + f"generate_gcov_files: {end-start} seconds")
-  # find all gcov files
-  gcov_files = []
-  for root, dirs, files in os.walk(gcov_folder_path):
-    for file in files:
-      if file.endswith('.gcov') and file.split('.gcov')[0] in solidity_sources:
-        gcov_files.append(os.path.join(root, file))
-  print(Fore.RESET + f"Found {len(gcov_files)} .gcov files")
+  print(Fore.MAGENTA + f"generate_gcov_files_in_parallel: {end-start} seconds")
   start = time.time()
-  res = process_gcov_files(gcov_files)
+  for _, output in outputs:
+    if output == '':
+      continue
+    if sys.platform == 'linux':
+      process_gcov_json(output)
+    else:
+      process_gcov_text(output)
   end = time.time()
-  print(Fore.MAGENTA + f"process_gcov_files: {end-start} seconds")
-  return res
+  print(Fore.MAGENTA + f"process_gcov_output: {end-start} seconds")
+  return LineSet(line_states, COVERED_LINE), LineSet(line_states, UNCOVERED_LINE)
 
 def remove_gcov_files(gcov_folder_path):
   cur_path = os.getcwd()
@@ -148,138 +216,373 @@ def generate_gcov_files(gcda_folder_path) :
     print(f"Error: {e}")
   os.chdir(cur_path)
 
-def run_gcov(file):
-  """Run gcov on a single file."""
+def run_gcov(file, cwd):
+  """Run gcov on a single file and return the coverage from stdout, in JSON on linux."""
   if sys.platform == 'linux':
-    command = 'gcov'
+    command = 'gcov --json-format'
   elif sys.platform == 'darwin':  
     command = 'llvm-cov gcov'
   else:
     print("Unsupported OS: ", sys.platform)
-    return
+    return (file, '')
   try:
-    result = subprocess.run(f'{command} {file}', shell=True, capture_output=True, text=True, check=True)
+    result = subprocess.run(f'{command} --stdout {file}', shell=True, capture_output=True, text=True, check=True, cwd=cwd)
     return (file, result.stdout)
   except subprocess.CalledProcessError as e:
-    return (file, f"Error processing {file}: {e.stderr}")
+    print(Fore.RESET + f"Error processing {file}: {e.stderr}")
+    return (file, '')
 
-def generate_gcov_files_in_parallel(gcda_directory, max_workers=None):
-  """Run gcov on all .gcda files in parallel."""
-  start = time.time()
-  gcda_files = find_gcda_files(gcda_directory)
-  end = time.time()
-  print(Fore.MAGENTA + f"find_gcda_files: {end-start} seconds")
+def generate_gcov_files_in_parallel(gcda_files, gcda_directory, max_workers=None):
+  """Run gcov on the given .gcda files in parallel and return [(gcda file, gcov output)]."""
   if not max_workers:
     max_workers = cpu_count()
-  print(Fore.RESET + f"Found {len(gcda_files)} .gcda files. Processing with {max_workers} workers.")
-  # with Pool(processes=max_workers) as pool:
-  #   pool.starmap(run_gcov, [(file, gcda_directory) for file in gcda_files])
-  cur_dir = os.getcwd()
-  os.chdir(gcda_directory)
+  if len(gcda_files) == 0:
+    return []
   with ThreadPoolExecutor(max_workers=max_workers) as executor:
-    futures = [executor.submit(run_gcov, file) for file in gcda_files]
-  os.chdir(cur_dir)
-  # for future in futures:
-  #   file, output = future.result()
-  #   print(Fore.RESET + f"Processed: {file}, output: {output}")
-
-optional_command_suffixes = [
-  '--mapping_type_prob 0.0',
-  '--array_type_prob 0.0',
-  '--struct_type_prob 0.0'
-]
+    return list(executor.map(lambda file: run_gcov(os.path.abspath(file), gcda_directory), gcda_files))
 
-commands = [
-  'npx erwin generate -m type',
-  'npx erwin generate -m loc',
-  'npx erwin generate -m scope',
+optional_overrides = [
+  {'mapping_type_prob': 0.0},
+  {'array_type_prob': 0.0},
+  {'struct_type_prob': 0.0}
 ]
 
-def optional_command_suffix():
-  # Randomly choose optional command suffixes, or return []
-  return np.random.choice(optional_command_suffixes, size = np.random.randint(0, len(optional_command_suffixes)), replace = False)
+modes = ['type', 'loc', 'scope']
+
+def optional_override():
+  # Randomly choose optional configuration overrides, or return {}
+  override = {}
+  for o in random.sample(optional_overrides, random.randint(0, len(optional_overrides) - 1)):
+    override.update(o)
+  return override
+
+def experiment1_scheduler(name, modes, max_counts):
+  '''
+  The scheduler of the configuration overrides of every round, over the modes, the `maximum_solution_count`s
+  (None for Erwin's default) and the optional overrides.
+  With `--scheduler bandit`, the statistics are kept in ./coverage_report/scheduler_<setting>.json.
+  '''
+  def with_max_count(arm, max_count):
+    return arm if max_count is None else {**arm, 'maximum_solution_count': max_count}
+  if parser_args.scheduler == 'bandit':
+    arms = [with_max_count({'mode': mode, **{k: v for o in subset for k, v in o.items()}}, max_count)
+            for mode in modes for max_count in max_counts
+            for subset in subsets(optional_overrides, len(optional_overrides) - 1)]
+    return BanditScheduler(arms, f'./coverage_report/scheduler_{name}.json')
+  return RandomScheduler(lambda: with_max_count({'mode': str(np.random.choice(modes)), **optional_override()}, random.choice(max_counts)))
+
+def generate_programs(server, arm, generated_programs_folder_path):
+  '''
+  Ask the Erwin server for one generation round with the configuration overrides of the arm.
+  Return the paths of the generated programs, or [] if the generation fails.
+  '''
+  request = {**arm, 'generation_rounds': 1, 'refresh_folder': True, 'out_dir': generated_programs_folder_path}
+  print(Fore.CYAN + f"Erwin request: {request}")
+  gen_start = time.time()
+  reply = server.generate(request)
+  gen_end = time.time()
+  print(Fore.CYAN + f"Erwin execution: {gen_end-gen_start} seconds")
+  if not reply['ok']:
+    print(f"Error: {reply.get('error')}")
+    return []
+  return reply['programs']
+
+def record_hang(sol_file, outcome):
+  '''Keep a program that exceeds the time or memory limit under ./coverage_report/<outcome> as a finding.'''
+  hang_dir = os.path.join('coverage_report', outcome)
+  os.makedirs(hang_dir, exist_ok=True)
+  shutil.copy(sol_file, hang_dir)
+  print(Fore.RED + f"{outcome}: {sol_file}")
+
+def compile_sol_file(sol_file, mode, env=None, profile_dir='temp_profiles'):
+  filename = os.path.basename(sol_file)
+  profraw_file = os.path.join(profile_dir, f"{os.path.splitext(filename)[0]}.profraw")
+  # solc runs without a shell, so a signal that kills it is not turned into a 128+n exit code,
+  # and its error output reaches runner.classify, which looks for std::bad_alloc in it
+  compiler_command = [parser_args.solc_path, *solidity_compilation_flags().split(), sol_file]
+  env = (os.environ if env is None else env).copy()
+  if mode == 'edge':
+    env['LLVM_PROFILE_FILE'] = profraw_file
+  p = run(compiler_command, timeout=parser_args.timeout, memory_bytes=megabytes(parser_args.memory_limit), env=env, capture_stdout=False)
+  if p.outcome in [TIMEOUT, OOM]:
+    record_hang(sol_file, p.outcome)
+
+def compile_bucket(sol_files, mode, env=None, profile_dir='temp_profiles'):
+  """
+  Compile a bucket of programs with the same random flags in one `solc --standard-json` process.
+  A crashing bucket is bisected by compile_batch, so every solc process of the bucket
+  writes its own profraw file.
+  """
+  env = (os.environ if env is None else env).copy()
+  if mode == 'edge':
+    stem = os.path.splitext(os.path.basename(sol_files[0]))[0]
+    env['LLVM_PROFILE_FILE'] = os.path.join(profile_dir, f'{stem}_%p.profraw')
+  results = compile_batch(parser_args.solc_path, sol_files, solidity_compilation_flags(), env,
+                          parser_args.timeout, megabytes(parser_args.memory_limit))
+  for sol_file, (_, _, outcome) in results.items():
+    if outcome in [TIMEOUT, OOM]:
+      record_hang(sol_file, outcome)
+
+def buckets(sol_files):
+  return [sol_files[k:k + parser_args.batch_size] for k in range(0, len(sol_files), parser_args.batch_size)]
+
+def compile_shard(sol_files, mode, env=None, profile_dir='temp_profiles'):
+  if parser_args.batch_size > 1:
+    for bucket in buckets(sol_files):
+      compile_bucket(bucket, mode, env, profile_dir)
+    return
+  for sol_file in sol_files:
+    compile_sol_file(sol_file, mode, env, profile_dir)
+
+def gcov_prefix_env(worker_dir, gcov_folder_path):
+  # gcda files are written to their absolute build paths.
+  # Strip the path of the gcov folder and write them under worker_dir instead,
+  # so that the tree under worker_dir mirrors the tree under the gcov folder.
+  env = os.environ.copy()
+  env['GCOV_PREFIX'] = os.path.abspath(worker_dir)
+  env['GCOV_PREFIX_STRIP'] = str(len(os.path.realpath(gcov_folder_path).strip(os.sep).split(os.sep)))
+  return env
+
+def gcov_tool_merge(merged_dir, dir1, dir2):
+  cmd = ['gcov-tool', 'merge', '-o', merged_dir, dir1, dir2]
+  try:
+    subprocess.run(cmd, check=True, capture_output=True, text=True)
+  except subprocess.CalledProcessError as e:
+    print(f"Error in running {cmd}: {e}")
+    exit(1)
+
+def merge_gcda_folder(worker_dir, gcov_folder_path):
+  # Merge the gcda files under worker_dir into the gcov folder.
+  # Only the gcda files of the gcov folder that worker_dir also holds take part in the merge and are written back,
+  # so the other ones keep their mtimes and find_changed_gcda_files does not rerun gcov on them.
+  gcda_paths = [os.path.relpath(gcda_file, worker_dir) for gcda_file in find_gcda_files(worker_dir)]
+  if len(gcda_paths) == 0:
+    return
+  existing_dir = worker_dir + '_existing'
+  existing_paths = [path for path in gcda_paths if os.path.exists(os.path.join(gcov_folder_path, path))]
+  for path in existing_paths:
+    os.makedirs(os.path.dirname(os.path.join(existing_dir, path)), exist_ok=True)
+    shutil.copy2(os.path.join(gcov_folder_path, path), os.path.join(existing_dir, path))
+  if len(existing_paths) == 0:
+    merged_dir = worker_dir
+  else:
+    merged_dir = worker_dir + '_merged'
+    gcov_tool_merge(merged_dir, worker_dir, existing_dir)
+  for path in gcda_paths:
+    target = os.path.join(gcov_folder_path, path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.move(os.path.join(merged_dir, path), target)
+  shutil.rmtree(merged_dir, ignore_errors=True)
+  shutil.rmtree(existing_dir, ignore_errors=True)
+
+def merge_gcda_folders(gcda_dir, gcov_folder_path):
+  # Merge the per-worker gcda files under gcda_dir into each other first,
+  # so that the gcov folder takes part in one merge per round instead of one per worker
+  start = time.time()
+  worker_dirs = [worker_dir for worker_dir in sorted(glob.glob(os.path.join(gcda_dir, 'worker_*')))
+                 if len(find_gcda_files(worker_dir)) > 0]
+  if worker_dirs:
+    combined_dir = worker_dirs[0]
+    for k, worker_dir in enumerate(worker_dirs[1:]):
+      merged_dir = os.path.join(gcda_dir, f'combined_{k}')
+      gcov_tool_merge(merged_dir, combined_dir, worker_dir)
+      combined_dir = merged_dir
+    merge_gcda_folder(combined_dir, gcov_folder_path)
+  shutil.rmtree(gcda_dir, ignore_errors=True)
+  end = time.time()
+  print(Fore.MAGENTA + f"merge_gcda_folders: {end-start} seconds")
 
-def compile(sol_dir, mode):
+def compile(sol_dir, mode, profile_dir='temp_profiles', gcda_dir=None):
+  """
+  Compile all Solidity programs in sol_dir with the instrumented compiler.
+  In edge mode, profraw files are written into profile_dir.
+  In line mode, gcda files are written into the gcov folder, unless gcda_dir is given,
+  in which case they are left in per-worker folders under gcda_dir for merge_gcda_folders.
+  """
   #!Step 1: Compile all Solidity programs with the instrumented compiler
-  for sol_file in glob.glob(os.path.join(sol_dir, '*.sol')):
-    filename = os.path.basename(sol_file)
-    profraw_file = os.path.join('temp_profiles', f"{os.path.splitext(filename)[0]}.profraw")
-    if mode == 'edge':
-      compiler_command = f'LLVM_PROFILE_FILE="{profraw_file}" {parser_args.solc_path} {solidity_compilation_flags()} {sol_file}'
-    elif mode == 'line':
-      compiler_command = f'{parser_args.solc_path} {solidity_compilation_flags()} {sol_file}'
-    subprocess.run(compiler_command, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-
-def generate_solidity_edge_coverage(solc_path, sol_dir):
+  sol_files = glob.glob(os.path.join(sol_dir, '*.sol'))
+  jobs = max(1, min(parser_args.jobs, len(sol_files)))
+  if mode == 'edge':
+    # Each program already writes its own profraw file
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+      if parser_args.batch_size > 1:
+        list(executor.map(lambda bucket: compile_bucket(bucket, mode, profile_dir=profile_dir), buckets(sol_files)))
+      else:
+        list(executor.map(lambda sol_file: compile_sol_file(sol_file, mode, profile_dir=profile_dir), sol_files))
+  elif mode == 'line':
+    if jobs == 1 and gcda_dir is None:
+      compile_shard(sol_files, mode)
+      return
+    # Each worker writes gcda files into its own GCOV_PREFIX folder
+    # so that concurrent compiler runs do not clobber the counters of each other.
+    merge_now = gcda_dir is None
+    gcda_dir = 'temp_gcda' if gcda_dir is None else gcda_dir
+    shutil.rmtree(gcda_dir, ignore_errors=True)
+    shards = [sol_files[k::jobs] for k in range(jobs)]
+    worker_dirs = [os.path.join(gcda_dir, f'worker_{k}') for k in range(jobs)]
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+      futures = [executor.submit(compile_shard, shard, mode, gcov_prefix_env(worker_dir, parser_args.gcov_folder_path))
+                 for shard, worker_dir in zip(shards, worker_dirs)]
+      for future in futures:
+        future.result()
+    #!Step 2: Merge the per-worker gcda files into the gcov folder
+    if merge_now:
+      merge_gcda_folders(gcda_dir, parser_args.gcov_folder_path)
+
+def generate_solidity_edge_coverage(profdata, profile_dir='temp_profiles'):
   """
-  Generate coverage reports for multiple Solidity files.
+  Merge the raw profiles of the latest compilations into a per-round delta profile.
+  Deltas are merged into the accumulated profile data by a ProfdataMerger,
+  and the coverage reports are generated by generate_solidity_edge_reports.
 
-  :param solc_path: Path to the instrumented Solidity compiler
-  :param sol_dir: Directory containing Solidity files
+  :param profdata: Path to the delta profile data
+  :param profile_dir: Directory containing the raw profiles
   """
   #!Step 1: Merge all raw profile data
-  # Get all .profraw files in the temp_profiles directory
-  profraw_files = glob.glob('temp_profiles/*.profraw')
+  # Get all .profraw files in the profile directory
+  profraw_files = glob.glob(os.path.join(profile_dir, '*.profraw'))
   # Check if any files were found
   if not profraw_files:
-    print("No .profraw files found in the temp_profiles directory.")
+    print(f"No .profraw files found in the {profile_dir} directory.")
     exit(1)
-  # Construct the command
-  if not os.path.exists('coverage_report') or not os.path.exists('coverage_report/solc_combined.profdata'):
-    cmd = ['llvm-profdata', 'merge', '-sparse'] + profraw_files + ['-o', 'coverage_report/solc_combined.profdata']
-  else:
-    cmd = ['llvm-profdata', 'merge', '-sparse'] + profraw_files + ['coverage_report/solc_combined.profdata'] + ['-o', 'coverage_report/solc_combined.profdata']
   try:
-    subprocess.run(cmd, check=True, capture_output=True, text=True)
+    merge_profiles(profraw_files, profdata)
   except subprocess.CalledProcessError as e:
-    print(f"Error in running {cmd}: {e}")
+    print(f"Error in running {e.cmd}: {e}")
     exit(1)
-  # Get list of all Solidity files
-  sol_files = glob.glob(os.path.join(sol_dir, '*.sol'))
 
-  #!Step 2: Generate coverage reports
+def count_collected_edges(collected_edges, covered_edges):
+  """
+  Add the edges covered in a round into the cached covered-edge bitmap.
+  Return (covered edge count, edge count) accumulated so far.
+  Every export lists all branches in the binary, so the index holds all edges after the first round.
+  """
+  index = covered_edges.index
+  # Edges are keyed by their strings, as an index reloaded from its file holds them
+  covered_positions = [index.position(f'{edge}') for edge, count in collected_edges.items() if count > 0]
+  for edge in collected_edges:
+    index.position(f'{edge}')
+  covered_edges.add_positions(covered_positions)
+  return len(covered_edges), len(index)
+
+def execution_corpus(name, execution, index, resumed):
+  """
+  The corpus of an edge execution under --corpus, or None.
+  A resumed execution keeps adding to its corpus.
+  """
+  if not parser_args.corpus:
+    return None
+  folder = f'./coverage_report/corpus_{name}_{execution}'
+  if not resumed:
+    shutil.rmtree(folder, ignore_errors=True)
+  return Corpus(folder, index)
+
+def attribute_edges(solc_path, profile_dir, sol_files, corpus, covered_edges):
+  """
+  Export the edges covered by every program of a round on its own, from the profraw file it wrote into profile_dir,
+  and add them program by program to the covered edges and the corpus.
+  Only a program compiled by its own solc process has its own profraw file, hence --batch_size 1.
+  """
+  def export(sol_file):
+    stem = os.path.splitext(os.path.basename(sol_file))[0]
+    profraw = os.path.join(profile_dir, f'{stem}.profraw')
+    if not os.path.exists(profraw):
+      return sol_file, []
+    profdata = os.path.join(profile_dir, f'{stem}.profdata')
+    merge_profiles([profraw], profdata)
+    collected_edges = extract_collected_edges(export_branches(solc_path, profdata, [sol_file]))
+    return sol_file, [f'{edge}' for edge, count in collected_edges.items() if count > 0]
+  start = time.time()
+  index = covered_edges.index
+  with ThreadPoolExecutor(max_workers=parser_args.jobs) as executor:
+    # Positions are assigned in this thread, in the order of the programs
+    for sol_file, edges in executor.map(export, sol_files):
+      corpus.add(sol_file, [index.position(edge) for edge in edges], covered_edges)
+  end = time.time()
+  print(Fore.MAGENTA + f"attribute_edges: {end-start} seconds")
+
+def generate_solidity_edge_reports(solc_path, profdata, sol_files=()):
+  """
+  Generate the human-readable coverage reports from the profile data.
+  They are slow and nothing in the round loop reads them,
+  so they are generated at the end of an execution, or on demand by `python coverage.py report`.
+
+  :param solc_path: Path to the instrumented Solidity compiler
+  :param profdata: Path to the profile data
+  :param sol_files: Solidity files passed to llvm-cov as source filters
+  """
   # HTML report
+  start = time.time()
   subprocess.run([
-    'llvm-cov', 'show', solc_path, '-instr-profile=coverage_report/solc_combined.profdata',
+    'llvm-cov', 'show', solc_path, f'-instr-profile={profdata}',
     '-format=html', '-output-dir=coverage_report', *sol_files
   ])
+  end = time.time()
+  print(Fore.MAGENTA + f"llvm-cov show: {end-start} seconds")
 
   # Text summary
+  start = time.time()
   with open('coverage_report/coverage_summary.txt', 'w') as f:
     subprocess.run([
-      'llvm-cov', 'report', solc_path, '-instr-profile=coverage_report/solc_combined.profdata', 
+      'llvm-cov', 'report', solc_path, f'-instr-profile={profdata}', 
       *sol_files
     ], stdout=f)
-
-  # Detailed coverage data in JSON format
-  with open('coverage_report/coverage_data.json', 'w') as f:
-    subprocess.run([
-      'llvm-cov', 'export', solc_path, '-instr-profile=coverage_report/solc_combined.profdata',
-      '-format=text', *sol_files
-    ], stdout=f)
-
-def run_experiment1_line(name, executions, time_limit, command_prefix, command_suffix, solc_path, generated_programs_folder_path, gcov_folder_path):
+  end = time.time()
+  print(Fore.MAGENTA + f"llvm-cov report: {end-start} seconds")
+
+def campaign_checkpoint(kind, name):
+  return Checkpoint(f'./coverage_report/checkpoint_{kind}_{name}.json', parser_args.resume)
+
+def resume_line_coverage(gcov_folder_path):
+  '''
+  The gcda files of a resumed execution are still in the gcov folder,
+  so its line states are rebuilt by running gcov on all of them.
+  '''
+  reset_line_coverage_cache()
+  covered_line, _ = extract_collected_lines(gcov_folder_path)
+  return covered_line
+
+def edge_checkpoint_map(name, resumed):
+  '''
+  Return the covered-edge bitmap of an edge execution and the path it is checkpointed to.
+  Its index is kept next to the checkpoint, so that the bitmap can be reloaded by a resumed execution.
+  '''
+  index_path = f'./coverage_report/checkpoint_edge_{name}.index'
+  map_path = f'./coverage_report/checkpoint_edgecovmap_{name}.npz'
+  if resumed:
+    return load_coverage_map(map_path, CoverageIndex(index_path)), map_path
+  for path in [index_path, map_path]:
+    if os.path.exists(path):
+      os.remove(path)
+  return CoverageMap(CoverageIndex(index_path)), map_path
+
+def merge_leftover_deltas(merger):
+  # The deltas that were not in the master profile when the execution stopped
+  # go in before the resumed rounds reuse their names
+  for delta in glob.glob('./coverage_report/deltas/*.profdata'):
+    merger.submit(delta)
+  merger.flush()
+
+def run_experiment1_line(name, executions, time_limit, server, scheduler, solc_path, generated_programs_folder_path, gcov_folder_path):
   if not os.path.exists('coverage_report'):
     os.makedirs('coverage_report')
-  for i in range(executions):
-    remove_gcda_files(gcov_folder_path)
-    time_budget = time_limit
-    fline = open(f'./coverage_report/linecov_{name}_{i}.txt', 'w')
-    g_covered_line = set()
+  checkpoint = campaign_checkpoint('line', name)
+  for i in range(checkpoint.first_execution(), executions):
+    fline = checkpoint.open_series(f'./coverage_report/linecov_{name}_{i}.txt', i)
+    if checkpoint.resumes(i):
+      time_budget = checkpoint.state['time_budget']
+      g_covered_line = resume_line_coverage(gcov_folder_path)
+    else:
+      remove_gcda_files(gcov_folder_path)
+      reset_line_coverage_cache()
+      time_budget = time_limit
+      g_covered_line = set()
+    last_covered_linecnt = len(g_covered_line)
     while time_budget > 0:
       all_start = time.time()
-      remove_gcov_files(gcov_folder_path)
-      command = f'{np.random.choice(commands) if command_prefix=="" else command_prefix} {command_suffix} {" ".join(optional_command_suffix())}'
-      print(Fore.CYAN + f"Erwin command: {command}")
-      gen_start = time.time()
-      try:
-        p = subprocess.run(command, shell=True, capture_output=True, text=True)
-      except Exception as e:
-        print(f"Error: {e}\n{p.stderr}\n{p.stdout}")
-        continue
-      gen_end = time.time()
-      print(Fore.CYAN + f"Erwin execution: {gen_end-gen_start} seconds")
-      if not os.path.exists(generated_programs_folder_path) or len(os.listdir(generated_programs_folder_path)) == 0:
+      arm = scheduler.choose()
+      if len(generate_programs(server, arm, generated_programs_folder_path)) == 0:
+        scheduler.reward(arm, 0, time.time() - all_start)
         continue
       compile_start = time.time()
       compile(generated_programs_folder_path, 'line')
@@ -290,23 +593,40 @@ def run_experiment1_line(name, executions, time_limit, command_prefix, command_s
       covered_linecnt = len(covered_line)
       linecnt = len(line)
       all_end = time.time()
+      scheduler.reward(arm, covered_linecnt - last_covered_linecnt, all_end - all_start)
+      last_covered_linecnt = covered_linecnt
       time_budget -= all_end - all_start
       print(Fore.BLUE + f"> Execution {i+1}, Time Cost: {all_end - all_start} seconds, Time Budget: {time_budget} seconds, {covered_linecnt}/{linecnt} lines covered")
       fline.write(f'{time_limit - time_budget}: {covered_linecnt}/{linecnt}\n')
       fline.flush()
-    with open(f'./coverage_report/linecovmap_{name}_{i}.txt', 'a') as f:
-      for line in g_covered_line:
-        f.write(f"{line.filename}:{line.linenum}\n")
+      checkpoint.save_round(i, fline, time_budget=time_budget)
+    line_map = CoverageMap(get_index('line', './coverage_report'))
+    for line in g_covered_line:
+      line_map.add(f"{line.filename}:{line.linenum}")
+    line_map.save(f'./coverage_report/linecovmap_{name}_{i}.npz')
     fline.close()
+    checkpoint.save_execution(i)
 
-def run_experiment1_edge(name, executions, time_limit, command_prefix, command_suffix, solc_path, generated_programs_folder_path, gcov_folder_path):
+def run_experiment1_edge(name, executions, time_limit, server, scheduler, solc_path, generated_programs_folder_path, gcov_folder_path):
   if not os.path.exists('coverage_report'):
     os.makedirs('coverage_report')
-  for i in range(executions):
-    time_budget = time_limit
-    fedge = open(f'./coverage_report/edgecov_{name}_{i}.txt', 'w')
-    if os.path.exists(f'./coverage_report/solc_combined.profdata'):
-      os.remove(f'./coverage_report/solc_combined.profdata')
+  checkpoint = campaign_checkpoint('edge', name)
+  for i in range(checkpoint.first_execution(), executions):
+    fedge = checkpoint.open_series(f'./coverage_report/edgecov_{name}_{i}.txt', i)
+    merger = ProfdataMerger('./coverage_report/solc_combined.profdata', parser_args.master_merge_interval)
+    if checkpoint.resumes(i):
+      time_budget = checkpoint.state['time_budget']
+      merge_leftover_deltas(merger)
+    else:
+      time_budget = time_limit
+      if os.path.exists(f'./coverage_report/solc_combined.profdata'):
+        os.remove(f'./coverage_report/solc_combined.profdata')
+      shutil.rmtree('./coverage_report/deltas', ignore_errors=True)
+      os.makedirs('./coverage_report/deltas')
+    covered_edges, covered_edges_path = edge_checkpoint_map(name, checkpoint.resumes(i))
+    corpus = execution_corpus(name, i, covered_edges.index, checkpoint.resumes(i))
+    last_covered_edgecnt = len(covered_edges)
+    round_id = 0
     while time_budget > 0:
       all_start = time.time()
       if os.path.exists('temp_profiles'):
@@ -314,17 +634,9 @@ def run_experiment1_edge(name, executions, time_limit, command_prefix, command_s
           os.remove(file)
         os.rmdir('temp_profiles')
       os.makedirs('temp_profiles')
-      command = f'{np.random.choice(commands) if command_prefix=="" else command_prefix} {command_suffix} {" ".join(optional_command_suffix())}'
-      print(Fore.CYAN + f"Erwin command: {command}")
-      gen_start = time.time()
-      try:
-        p = subprocess.run(command, shell=True, capture_output=True, text=True)
-      except Exception as e:
-        print(f"Error: {e}\n{p.stderr}\n{p.stdout}")
-        continue
-      gen_end = time.time()
-      print(Fore.CYAN + f"Erwin execution: {gen_end-gen_start} seconds")
-      if not os.path.exists(generated_programs_folder_path) or len(os.listdir(generated_programs_folder_path)) == 0:
+      arm = scheduler.choose()
+      if len(generate_programs(server, arm, generated_programs_folder_path)) == 0:
+        scheduler.reward(arm, 0, time.time() - all_start)
         continue
       compile_start = time.time()
       compile(generated_programs_folder_path, 'edge')
@@ -333,41 +645,298 @@ def run_experiment1_edge(name, executions, time_limit, command_prefix, command_s
         continue
       print(Fore.MAGENTA + f"compile: {compile_end-compile_start} seconds")
       start = time.time()
-      # Compile the generated programs and generate coverage json file
-      generate_solidity_edge_coverage(solc_path, generated_programs_folder_path)
+      # Merge the raw profiles of this round into a small delta
+      delta = f'./coverage_report/deltas/round_{round_id}.profdata'
+      round_id += 1
+      generate_solidity_edge_coverage(delta)
       end = time.time()
-      print(Fore.MAGENTA + f"generate_solidity_edge_coverage: {end-start} seconds")
-      # Collect llvm-cov coverage data
-      with open('./coverage_report/coverage_data.json', 'r') as f:
-        coverage_data = json.load(f)
+      print(Fore.MAGENTA + f"merge profraws: {end-start} seconds")
+      # Stream the branches out of llvm-cov export on the delta, without writing the export to disk
       start = time.time()
-      collected_edges = extract_collected_edges(coverage_data)
+      sol_files = glob.glob(os.path.join(generated_programs_folder_path, '*.sol'))
+      collected_edges = extract_collected_edges(export_branches(solc_path, delta, sol_files))
       end = time.time()
       print(Fore.MAGENTA + f"extract_collected_edges: {end-start} seconds")
-      edgecnt = 0
-      covered_edgecnt = 0
-      for edge in collected_edges:
-        edgecnt += 1
-        if collected_edges[edge] > 0:
-          covered_edgecnt += 1
+      if corpus is not None:
+        attribute_edges(solc_path, 'temp_profiles', sol_files, corpus, covered_edges)
+      # The delta goes into the master in the background
+      merger.submit(delta)
+      covered_edgecnt, edgecnt = count_collected_edges(collected_edges, covered_edges)
       all_end = time.time()
+      scheduler.reward(arm, covered_edgecnt - last_covered_edgecnt, all_end - all_start)
+      last_covered_edgecnt = covered_edgecnt
       time_budget -= all_end - all_start
       print(Fore.BLUE + f"> Execution {i+1}, Time Cost: {all_end - all_start} seconds, Time Budget: {time_budget} seconds, {covered_edgecnt}/{edgecnt} edges covered")
       fedge.write(f'{time_limit - time_budget}: {covered_edgecnt}/{edgecnt}\n')
       fedge.flush()
+      covered_edges.save(covered_edges_path)
+      checkpoint.save_round(i, fedge, time_budget=time_budget)
+      if parser_args.reports == 'round':
+        merger.flush()
+        generate_solidity_edge_reports(solc_path, 'coverage_report/solc_combined.profdata', sol_files)
     fedge.close()
+    start = time.time()
+    merger.flush()
+    end = time.time()
+    print(Fore.MAGENTA + f"merge deltas into the master profile: {end-start} seconds")
+    if parser_args.reports == 'end' and os.path.exists('coverage_report/solc_combined.profdata'):
+      generate_solidity_edge_reports(solc_path, 'coverage_report/solc_combined.profdata',
+                                     glob.glob(os.path.join(generated_programs_folder_path, '*.sol')))
+    checkpoint.save_execution(i)
   # reset the color
   # Clean up intermediate profraw files
-  for file in glob.glob('temp_profiles/*'):
-    os.remove(file)
-  os.rmdir('temp_profiles')
+  shutil.rmtree('temp_profiles', ignore_errors=True)
+
+async def pipeline(time_limit, server, scheduler, generated_programs_folder_path, compile_round, extract_round, record_round, last_covered=0):
+  """
+  Run generation, compilation and coverage extraction as three concurrent stages
+  connected by bounded queues, so that generating round N+1, compiling round N
+  and extracting the coverage of round N-1 overlap.
+  Every round has its own program folder, and compile_round must only write
+  round-private files, since only extract_round touches the accumulated coverage data.
+  The scheduler is rewarded with the coverage a round adds to `last_covered`
+  over the seconds the round spent in the three stages.
+  """
+  start = time.time()
+  compile_queue = asyncio.Queue(maxsize=parser_args.queue_size)
+  extract_queue = asyncio.Queue(maxsize=parser_args.queue_size)
+  # round id -> [arm, seconds spent so far]
+  rounds = {}
+
+  async def generation_stage():
+    round_id = 0
+    while time.time() - start < time_limit:
+      round_dir = os.path.join(generated_programs_folder_path, f'round_{round_id}')
+      arm = scheduler.choose()
+      generation_start = time.time()
+      programs = await asyncio.to_thread(generate_programs, server, arm, round_dir)
+      generation_seconds = time.time() - generation_start
+      if len(programs) > 0:
+        rounds[round_id] = [arm, generation_seconds]
+        await compile_queue.put((round_id, round_dir))
+      else:
+        scheduler.reward(arm, 0, generation_seconds)
+      round_id += 1
+    await compile_queue.put(None)
+
+  async def compilation_stage():
+    while (item := await compile_queue.get()) is not None:
+      compile_start = time.time()
+      await asyncio.to_thread(compile_round, *item)
+      compile_end = time.time()
+      rounds[item[0]][1] += compile_end - compile_start
+      print(Fore.MAGENTA + f"compile round {item[0]}: {compile_end-compile_start} seconds")
+      await extract_queue.put(item)
+    await extract_queue.put(None)
+
+  async def extraction_stage():
+    nonlocal last_covered
+    while (item := await extract_queue.get()) is not None:
+      extract_start = time.time()
+      covered, total = await asyncio.to_thread(extract_round, *item)
+      shutil.rmtree(item[1], ignore_errors=True)
+      arm, seconds = rounds.pop(item[0])
+      scheduler.reward(arm, covered - last_covered, seconds + time.time() - extract_start)
+      last_covered = covered
+      record_round(time.time() - start, covered, total)
+
+  await asyncio.gather(generation_stage(), compilation_stage(), extraction_stage())
+
+def run_experiment1_line_pipeline(name, executions, time_limit, server, scheduler, solc_path, generated_programs_folder_path, gcov_folder_path):
+  if not os.path.exists('coverage_report'):
+    os.makedirs('coverage_report')
+  os.makedirs(generated_programs_folder_path, exist_ok=True)
+
+  # With one job, or without gcov-tool on darwin, rounds compile straight into the gcov folder and nothing is merged.
+  # gcov may then already see counters of the next round, which only credits its lines one round early.
+  direct = parser_args.jobs == 1 or sys.platform == 'darwin'
+
+  def compile_round(round_id, round_dir):
+    compile(round_dir, 'line', gcda_dir=None if direct else os.path.join('temp_gcda', f'round_{round_id}'))
+
+  def extract_round(round_id, round_dir):
+    if not direct:
+      merge_gcda_folders(os.path.join('temp_gcda', f'round_{round_id}'), gcov_folder_path)
+    covered_line, line = extract_collected_lines(gcov_folder_path)
+    return len(covered_line), len(line)
+
+  checkpoint = campaign_checkpoint('line', name)
+  for i in range(checkpoint.first_execution(), executions):
+    # The gcda files of the rounds in flight when the execution stopped are dropped
+    shutil.rmtree('temp_gcda', ignore_errors=True)
+    fline = checkpoint.open_series(f'./coverage_report/linecov_{name}_{i}.txt', i)
+    if checkpoint.resumes(i):
+      resumed_elapsed = checkpoint.state['elapsed']
+      last_covered_linecnt = len(resume_line_coverage(gcov_folder_path))
+    else:
+      resumed_elapsed = 0
+      last_covered_linecnt = 0
+      remove_gcda_files(gcov_folder_path)
+      reset_line_coverage_cache()
+
+    def record_round(elapsed, covered_linecnt, linecnt):
+      elapsed += resumed_elapsed
+      print(Fore.BLUE + f"> Execution {i+1}, Elapsed: {elapsed} seconds, Time Budget: {time_limit - elapsed} seconds, {covered_linecnt}/{linecnt} lines covered")
+      fline.write(f'{elapsed}: {covered_linecnt}/{linecnt}\n')
+      fline.flush()
+      checkpoint.save_round(i, fline, elapsed=elapsed)
+
+    asyncio.run(pipeline(time_limit - resumed_elapsed, server, scheduler, generated_programs_folder_path, compile_round, extract_round, record_round, last_covered_linecnt))
+    line_map = CoverageMap(get_index('line', './coverage_report'))
+    for line in LineSet(line_states, COVERED_LINE):
+      line_map.add(f"{line.filename}:{line.linenum}")
+    line_map.save(f'./coverage_report/linecovmap_{name}_{i}.npz')
+    fline.close()
+    checkpoint.save_execution(i)
+
+def run_experiment1_edge_pipeline(name, executions, time_limit, server, scheduler, solc_path, generated_programs_folder_path, gcov_folder_path):
+  if not os.path.exists('coverage_report'):
+    os.makedirs('coverage_report')
+  os.makedirs(generated_programs_folder_path, exist_ok=True)
+
+  def compile_round(round_id, round_dir):
+    profile_dir = os.path.join('temp_profiles', f'round_{round_id}')
+    os.makedirs(profile_dir, exist_ok=True)
+    compile(round_dir, 'edge', profile_dir=profile_dir)
+
+  checkpoint = campaign_checkpoint('edge', name)
+  for i in range(checkpoint.first_execution(), executions):
+    shutil.rmtree('temp_profiles', ignore_errors=True)
+    fedge = checkpoint.open_series(f'./coverage_report/edgecov_{name}_{i}.txt', i)
+    merger = ProfdataMerger('./coverage_report/solc_combined.profdata', parser_args.master_merge_interval)
+    if checkpoint.resumes(i):
+      resumed_elapsed = checkpoint.state['elapsed']
+      merge_leftover_deltas(merger)
+    else:
+      resumed_elapsed = 0
+      if os.path.exists(f'./coverage_report/solc_combined.profdata'):
+        os.remove(f'./coverage_report/solc_combined.profdata')
+      shutil.rmtree('./coverage_report/deltas', ignore_errors=True)
+      os.makedirs('./coverage_report/deltas')
+    covered_edges, covered_edges_path = edge_checkpoint_map(name, checkpoint.resumes(i))
+    corpus = execution_corpus(name, i, covered_edges.index, checkpoint.resumes(i))
+
+    def extract_round(round_id, round_dir):
+      profile_dir = os.path.join('temp_profiles', f'round_{round_id}')
+      delta = f'./coverage_report/deltas/round_{round_id}.profdata'
+      generate_solidity_edge_coverage(delta, profile_dir)
+      sol_files = glob.glob(os.path.join(round_dir, '*.sol'))
+      if corpus is not None:
+        attribute_edges(solc_path, profile_dir, sol_files, corpus, covered_edges)
+      shutil.rmtree(profile_dir, ignore_errors=True)
+      collected_edges = extract_collected_edges(export_branches(solc_path, delta, sol_files))
+      merger.submit(delta)
+      return count_collected_edges(collected_edges, covered_edges)
+
+    def record_round(elapsed, covered_edgecnt, edgecnt):
+      elapsed += resumed_elapsed
+      print(Fore.BLUE + f"> Execution {i+1}, Elapsed: {elapsed} seconds, Time Budget: {time_limit - elapsed} seconds, {covered_edgecnt}/{edgecnt} edges covered")
+      fedge.write(f'{elapsed}: {covered_edgecnt}/{edgecnt}\n')
+      fedge.flush()
+      covered_edges.save(covered_edges_path)
+      checkpoint.save_round(i, fedge, elapsed=elapsed)
+
+    asyncio.run(pipeline(time_limit - resumed_elapsed, server, scheduler, generated_programs_folder_path, compile_round, extract_round, record_round, len(covered_edges)))
+    fedge.close()
+    merger.flush()
+    if parser_args.reports != 'none' and os.path.exists('coverage_report/solc_combined.profdata'):
+      generate_solidity_edge_reports(solc_path, 'coverage_report/solc_combined.profdata')
+    checkpoint.save_execution(i)
+  shutil.rmtree('temp_profiles', ignore_errors=True)
+
+def compile_shard_shm(forkserver, sol_files):
+  """
+  Compile the programs one by one in forks of the forkserver.
+  Return a (program, ids of the edges covered by its compilation) pair for every program.
+  """
+  covered = []
+  for sol_file in sol_files:
+    status = forkserver.run(json.dumps(standard_json_input([sol_file], solidity_compilation_flags())))
+    outcome = TIMEOUT if status is None else classify(os.waitstatus_to_exitcode(status), forkserver.error_output())
+    if outcome in [TIMEOUT, OOM]:
+      record_hang(sol_file, outcome)
+    covered.append((sol_file, forkserver.covered_edges()))
+  return covered
+
+def run_experiment1_shm(name, executions, time_limit, server, scheduler, solc_path, generated_programs_folder_path, gcov_folder_path):
+  """
+  Edge coverage through the shm backend: solc is linked with shmcov_runtime.c,
+  runs as --jobs forkservers, and reports the edges of every compilation in shared memory,
+  so no profile is written, merged or exported.
+  """
+  if not os.path.exists('coverage_report'):
+    os.makedirs('coverage_report')
+  checkpoint = campaign_checkpoint('shm', name)
+  for i in range(checkpoint.first_execution(), executions):
+    fshm = checkpoint.open_series(f'./coverage_report/shmcov_{name}_{i}.txt', i)
+    # The bitmap holds edge ids, so it needs no index to be reloaded
+    covered_edges_path = f'./coverage_report/checkpoint_shmcovmap_{name}.npz'
+    if checkpoint.resumes(i):
+      time_budget = checkpoint.state['time_budget']
+      covered_edges = load_coverage_map(covered_edges_path, CoverageIndex())
+    else:
+      time_budget = time_limit
+      covered_edges = CoverageMap(CoverageIndex())
+    corpus = execution_corpus(name, i, covered_edges.index, checkpoint.resumes(i))
+    forkservers = [ForkServer(solc_path, timeout=parser_args.timeout, memory_bytes=megabytes(parser_args.memory_limit))
+                   for _ in range(parser_args.jobs)]
+    try:
+      for forkserver in forkservers:
+        forkserver.start()
+      edgecnt = forkservers[0].edge_count()
+      last_covered_edgecnt = len(covered_edges)
+      while time_budget > 0:
+        all_start = time.time()
+        arm = scheduler.choose()
+        sol_files = generate_programs(server, arm, generated_programs_folder_path)
+        if len(sol_files) == 0:
+          scheduler.reward(arm, 0, time.time() - all_start)
+          continue
+        compile_start = time.time()
+        shards = [sol_files[k::len(forkservers)] for k in range(len(forkservers))]
+        with ThreadPoolExecutor(max_workers=len(forkservers)) as executor:
+          for shard_covered in executor.map(compile_shard_shm, forkservers, shards):
+            for sol_file, covered in shard_covered:
+              if corpus is None:
+                covered_edges.add_positions(covered)
+              else:
+                corpus.add(sol_file, covered, covered_edges)
+        compile_end = time.time()
+        print(Fore.MAGENTA + f"compile: {compile_end-compile_start} seconds")
+        covered_edgecnt = len(covered_edges)
+        all_end = time.time()
+        scheduler.reward(arm, covered_edgecnt - last_covered_edgecnt, all_end - all_start)
+        last_covered_edgecnt = covered_edgecnt
+        time_budget -= all_end - all_start
+        print(Fore.BLUE + f"> Execution {i+1}, Time Cost: {all_end - all_start} seconds, Time Budget: {time_budget} seconds, {covered_edgecnt}/{edgecnt} edges covered")
+        fshm.write(f'{time_limit - time_budget}: {covered_edgecnt}/{edgecnt}\n')
+        fshm.flush()
+        covered_edges.save(covered_edges_path)
+        checkpoint.save_round(i, fshm, time_budget=time_budget)
+    finally:
+      for forkserver in forkservers:
+        forkserver.close()
+    covered_edges.save(f'./coverage_report/shmcovmap_{name}_{i}.npz')
+    fshm.close()
+    checkpoint.save_execution(i)
+
+def run_experiment1(name, executions, time_limit, server, scheduler, solc_path, generated_programs_folder_path, gcov_folder_path):
+  if parser_args.backend == 'shm':
+    run_experiment1_shm(name, executions, time_limit, server, scheduler, solc_path, generated_programs_folder_path, gcov_folder_path)
+    return
+
+  if parser_args.pipeline:
+    if parser_args.line:
+      run_experiment1_line_pipeline(name, executions, time_limit, server, scheduler, solc_path, generated_programs_folder_path, gcov_folder_path)
+    if parser_args.edge:
+      run_experiment1_edge_pipeline(name, executions, time_limit, server, scheduler, solc_path, generated_programs_folder_path, gcov_folder_path)
+    return
 
-def run_experiment1(name, executions, time_limit, command_prefix, command_suffix, solc_path, generated_programs_folder_path, gcov_folder_path):
   if parser_args.line:
-    run_experiment1_line(name, executions, time_limit, command_prefix, command_suffix, solc_path, generated_programs_folder_path, gcov_folder_path)
+    run_experiment1_line(name, executions, time_limit, server, scheduler, solc_path, generated_programs_folder_path, gcov_folder_path)
   
   if parser_args.edge:
-    run_experiment1_edge(name, executions, time_limit, command_prefix, command_suffix, solc_path, generated_programs_folder_path, gcov_folder_path)
+    run_experiment1_edge(name, executions, time_limit, server, scheduler, solc_path, generated_programs_folder_path, gcov_folder_path)
 
 '''
 Experiment 1.
@@ -377,20 +946,27 @@ def experiment1():
   
   collect_solidity_sources(parser_args.compiler_source_folder_path)
   
-  command_suffix = f'--generation_rounds 1 --refresh_folder'
-  
+  server = ErwinServer(parser_args.erwin_command)
+  server.start()
+
+  # The empty mode means trivial generation
   if (parser_args.setting == 'trivial'):
     print('Setting 1: Trivial generation')
-    run_experiment1('trivial', parser_args.executions, parser_args.time_limit, 'npx erwin generate', command_suffix, parser_args.solc_path, parser_args.generated_programs_folder_path, parser_args.gcov_folder_path)
+    run_experiment1('trivial', parser_args.executions, parser_args.time_limit, server, experiment1_scheduler('trivial', [''], [None]), parser_args.solc_path, parser_args.generated_programs_folder_path, parser_args.gcov_folder_path)
   elif (parser_args.setting == 'gen50'):
     print('Setting 2: Generate at most 50 programs from an IR')
-    run_experiment1('gen50', parser_args.executions, parser_args.time_limit, '', f'-max 50 {command_suffix}', parser_args.solc_path, parser_args.generated_programs_folder_path, parser_args.gcov_folder_path)
+    run_experiment1('gen50', parser_args.executions, parser_args.time_limit, server, experiment1_scheduler('gen50', modes, [50]), parser_args.solc_path, parser_args.generated_programs_folder_path, parser_args.gcov_folder_path)
   elif (parser_args.setting == 'gen100'):
     print('Setting 3: Generate at most 100 programs from an IR')
-    run_experiment1('gen100', parser_args.executions, parser_args.time_limit, '', f'-max 100 {command_suffix}', parser_args.solc_path, parser_args.generated_programs_folder_path, parser_args.gcov_folder_path)
+    run_experiment1('gen100', parser_args.executions, parser_args.time_limit, server, experiment1_scheduler('gen100', modes, [100]), parser_args.solc_path, parser_args.generated_programs_folder_path, parser_args.gcov_folder_path)
   elif (parser_args.setting == 'gen150'):
     print('Setting 4: Generate at most 150 programs from an IR')
-    run_experiment1('gen150', parser_args.executions, parser_args.time_limit, '', f'-max 150 {command_suffix}', parser_args.solc_path, parser_args.generated_programs_folder_path, parser_args.gcov_folder_path)
+    run_experiment1('gen150', parser_args.executions, parser_args.time_limit, server, experiment1_scheduler('gen150', modes, [150]), parser_args.solc_path, parser_args.generated_programs_folder_path, parser_args.gcov_folder_path)
+  elif (parser_args.setting == 'adaptive'):
+    print('Setting 5: Generate at most 50, 100 or 150 programs from an IR, as chosen by the scheduler')
+    run_experiment1('adaptive', parser_args.executions, parser_args.time_limit, server, experiment1_scheduler('adaptive', modes, [50, 100, 150]), parser_args.solc_path, parser_args.generated_programs_folder_path, parser_args.gcov_folder_path)
+
+  server.close()
 
 if __name__ == '__main__':
   parser = argparse.ArgumentParser(
@@ -398,7 +974,7 @@ if __name__ == '__main__':
                     description='Collect coverage data from Solidity compilers.')
   subparsers = parser.add_subparsers(dest='experiment', help='Experiment-specific arguments')
   parser_exp1 = subparsers.add_parser('experiment1', help='Arguments for Experiment 1')
-  parser_exp1.add_argument('--setting', type=str, help='Generation setting', choices=['trivial', 'gen50', 'gen100', 'gen150'], default='trivial')
+  parser_exp1.add_argument('--setting', type=str, help='Generation setting', choices=['trivial', 'gen50', 'gen100', 'gen150', 'adaptive'], default='trivial')
   parser_exp1.add_argument('--executions', type=int, help='Number of executions of this experiment', default=5)
   parser_exp1.add_argument('--time_limit', type=float, help='Time limit for each executions, in seconds', default=3600*24)
   parser_exp1.add_argument('--solc_path', type=str, help='Path to the instrumented Solidity compiler', required=True)
@@ -407,11 +983,35 @@ if __name__ == '__main__':
   parser_exp1.add_argument('--compiler_source_folder_path', type=str, help='Path to the compiler source folder', required=True)
   parser_exp1.add_argument('--line', action='store_true', help='Collect line coverage data')
   parser_exp1.add_argument('--edge', action='store_true', help='Collect edge coverage data')
+  parser_exp1.add_argument('--reports', type=str, help='When to generate the HTML and summary reports of edge coverage', choices=['end', 'round', 'none'], default='end')
+  parser_exp1.add_argument('--master_merge_interval', type=int, help='Number of rounds whose delta profiles are merged into the master profile at a time', default=10)
+  parser_exp1.add_argument('--pipeline', action='store_true', help='Overlap generation, compilation and coverage extraction of consecutive rounds')
+  parser_exp1.add_argument('--queue_size', type=int, help='Number of rounds that can wait between two pipeline stages', default=1)
+  parser_exp1.add_argument('--jobs', type=int, help='Number of compiler processes running in parallel', default=cpu_count())
+  parser_exp1.add_argument('--batch_size', type=int, help='Number of programs compiled together by one solc --standard-json process', default=1)
+  parser_exp1.add_argument('--backend', type=str, help='How coverage is collected: from llvm profiles and gcov files, or from a forkserver solc linked with shmcov_runtime.c that counts edges in shared memory', choices=['profile', 'shm'], default='profile')
+  parser_exp1.add_argument('--timeout', type=float, help='Time limit in seconds of one solc process', default=60)
+  parser_exp1.add_argument('--memory_limit', type=int, help='Memory limit in MB of one solc process, 0 for no limit', default=4096)
+  parser_exp1.add_argument('--scheduler', type=str, help='How the mode, the maximum_solution_count and the optional overrides of a round are chosen: uniformly at random, or by a UCB1 bandit rewarded with the new coverage per second of a round', choices=['random', 'bandit'], default='random')
+  parser_exp1.add_argument('--corpus', action='store_true', help='Keep every program that covers new edges, with the map of the edges it covers, in ./coverage_report/corpus_<setting>_<n>. The profile backend exports every program on its own for it and needs --batch_size 1')
+  parser_exp1.add_argument('--resume', action='store_true', help='Continue the executions of the setting from their last checkpoint in ./coverage_report')
+  parser_exp1.add_argument('--erwin_command', type=str, help='Command to start the Erwin generation server', default='npx erwin serve')
+  parser_report = subparsers.add_parser('report', help='Generate the HTML and summary reports of edge coverage on demand')
+  parser_report.add_argument('--solc_path', type=str, help='Path to the instrumented Solidity compiler', required=True)
+  parser_report.add_argument('--profdata', type=str, help='Path to the profile data', default='coverage_report/solc_combined.profdata')
 
   parser_args = parser.parse_args()
 
   if parser_args.experiment == 'experiment1':
-    if not parser_args.edge and not parser_args.line:
+    if not parser_args.edge and not parser_args.line and parser_args.backend != 'shm':
       print('Please specify at least one type of coverage data to collect (edge or line)')
       exit(1)
+    if parser_args.corpus and parser_args.backend == 'profile' and parser_args.batch_size > 1:
+      print('--corpus needs one profraw file per program, i.e., --batch_size 1')
+      exit(1)
+    if parser_args.line and sys.platform == 'darwin':
+      # gcov-tool is not available to merge the per-worker gcda files
+      parser_args.jobs = 1
     experiment1()
+  elif parser_args.experiment == 'report':
+    generate_solidity_edge_reports(parser_args.solc_path, parser_args.profdata)
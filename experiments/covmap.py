@@ -0,0 +1,200 @@
+'''
+Compact coverage maps.
+
+A coverage map is a NumPy bitmap over a global, append-only index of coverage keys.
+Line keys look like `Parser.cpp.gcov:345` and edge keys look like
+`Position(function_name=..., line_start=..., column_start=..., line_end=..., column_end=...)`,
+the same strings the text maps in ./coverages hold.
+A map is saved as a compressed .npz file that holds the packed bits and a fingerprint of the index it was built against,
+and all maps of the same kind share one index file, e.g., ./coverages/linecov.index.
+Loading a map against another index, e.g., the index of another folder or campaign, raises a ValueError.
+
+`python covmap.py convert line ./coverages/linecovmap_*.txt` converts text maps into .npz maps.
+'''
+import hashlib
+import os
+import sys
+import numpy as np
+
+class CoverageIndex:
+  '''
+  A stable mapping from coverage keys to bit positions.
+  Keys are only appended, so a bit position never changes once assigned.
+  The index file holds one key per line, and the line number is the bit position.
+  '''
+  def __init__(self, path=None):
+    self.path = path
+    self.keys = []
+    self.positions = {}
+    self.saved = 0
+    self.hasher = hashlib.sha1()
+    self.hashed = 0
+    self.fingerprints = {}
+    if path is not None and os.path.exists(path):
+      with open(path, 'r') as f:
+        for key in f.read().splitlines():
+          self.positions[key] = len(self.keys)
+          self.keys.append(key)
+      self.saved = len(self.keys)
+
+  def __len__(self):
+    return len(self.keys)
+
+  def position(self, key):
+    '''Return the bit position of the key, assigning a new one if the key is new.'''
+    pos = self.positions.get(key)
+    if pos is None:
+      pos = self.positions[key] = len(self.keys)
+      self.keys.append(key)
+    return pos
+
+  def fingerprint(self, size=None):
+    '''A digest of the first `size` keys, all of them by default, which ties a saved map to the index it was built against.'''
+    size = len(self.keys) if size is None else size
+    if size not in self.fingerprints:
+      if size >= self.hashed:
+        for key in self.keys[self.hashed:size]:
+          self.hasher.update(f'{key}\n'.encode())
+        self.hashed = size
+        self.fingerprints[size] = self.hasher.hexdigest()
+      else:
+        hasher = hashlib.sha1()
+        for key in self.keys[:size]:
+          hasher.update(f'{key}\n'.encode())
+        self.fingerprints[size] = hasher.hexdigest()
+    return self.fingerprints[size]
+
+  def save(self):
+    '''Append the keys added since the last save to the index file.'''
+    if self.path is None or self.saved == len(self.keys):
+      return
+    with open(self.path, 'a') as f:
+      for key in self.keys[self.saved:]:
+        f.write(f'{key}\n')
+    self.saved = len(self.keys)
+
+class CoverageMap:
+  '''
+  A set of coverage keys stored as a bitmap over a CoverageIndex.
+  It supports the set operations the comparison scripts need, i.e., |, -, &, len() and iteration over keys.
+  '''
+  def __init__(self, index, bits=None):
+    self.index = index
+    self.bits = np.zeros(len(index), dtype=bool) if bits is None else bits
+
+  def _fit(self, size):
+    if len(self.bits) < size:
+      self.bits = np.concatenate([self.bits, np.zeros(size - len(self.bits), dtype=bool)])
+
+  def _aligned(self, other):
+    assert self.index is other.index, 'Coverage maps over different indexes cannot be compared'
+    size = max(len(self.bits), len(other.bits))
+    self._fit(size)
+    other._fit(size)
+    return self.bits, other.bits
+
+  def add(self, key):
+    pos = self.index.position(key)
+    self._fit(pos + 1)
+    self.bits[pos] = True
+
+  def add_positions(self, positions):
+    if len(positions) == 0:
+      return
+    self._fit(max(positions) + 1)
+    self.bits[positions] = True
+
+  def update(self, other):
+    a, b = self._aligned(other)
+    np.logical_or(a, b, out=a)
+
+  def __or__(self, other):
+    a, b = self._aligned(other)
+    return CoverageMap(self.index, a | b)
+
+  def __sub__(self, other):
+    a, b = self._aligned(other)
+    return CoverageMap(self.index, a & ~b)
+
+  def __and__(self, other):
+    a, b = self._aligned(other)
+    return CoverageMap(self.index, a & b)
+
+  def __len__(self):
+    return int(np.count_nonzero(self.bits))
+
+  def __contains__(self, key):
+    pos = self.index.positions.get(key)
+    return pos is not None and pos < len(self.bits) and bool(self.bits[pos])
+
+  def __iter__(self):
+    for pos in np.flatnonzero(self.bits):
+      yield self.index.keys[pos]
+
+  def positions(self):
+    '''Return the set of bit positions, a cheaper stand-in for the set of keys when only set sizes matter, e.g., in Venn diagrams.'''
+    return set(np.flatnonzero(self.bits).tolist())
+
+  def save(self, path):
+    '''Save the map as an .npz file. It is written next to `path` and renamed into place, so a checkpointed map is never half-written.'''
+    self.index.save()
+    tmp = os.path.splitext(path)[0] + '.tmp.npz'
+    np.savez_compressed(tmp, bits=np.packbits(self.bits), size=len(self.bits),
+                        index_size=len(self.index), index_fingerprint=self.index.fingerprint())
+    os.replace(tmp, path)
+
+def index_path(kind, folder='./coverages'):
+  '''The index file shared by all maps of one kind, 'line' or 'edge'.'''
+  return os.path.join(folder, f'{kind}cov.index')
+
+indexes = {}
+def get_index(kind, folder='./coverages'):
+  path = index_path(kind, folder)
+  if path not in indexes:
+    indexes[path] = CoverageIndex(path)
+  return indexes[path]
+
+def load_text_coverage_map(path, index):
+  coverage_map = CoverageMap(index)
+  with open(path, 'r') as f:
+    for key in f.read().splitlines():
+      key = key.strip()
+      if key:
+        coverage_map.add(key)
+  return coverage_map
+
+def load_coverage_map(path, index):
+  '''
+  Load an .npz coverage map.
+  If it does not exist but the text map with the same name does,
+  convert the text map and save the .npz map for the next time.
+  '''
+  stem = os.path.splitext(path)[0]
+  if os.path.exists(stem + '.npz'):
+    data = np.load(stem + '.npz')
+    # Maps saved before the fingerprint was added are not checked
+    if 'index_fingerprint' in data:
+      index_size = int(data['index_size'])
+      if index_size > len(index) or str(data['index_fingerprint']) != index.fingerprint(index_size):
+        raise ValueError(f'{stem}.npz was built against another coverage index than {index.path or "the given one"}')
+    size = int(data['size'])
+    bits = np.unpackbits(data['bits'], count=size).astype(bool)
+    coverage_map = CoverageMap(index, bits)
+    coverage_map._fit(len(index))
+    return coverage_map
+  coverage_map = load_text_coverage_map(stem + '.txt', index)
+  coverage_map.save(stem + '.npz')
+  return coverage_map
+
+def convert(kind, paths):
+  index = get_index(kind, os.path.dirname(paths[0]) or '.')
+  for path in paths:
+    coverage_map = load_text_coverage_map(path, index)
+    coverage_map.save(os.path.splitext(path)[0] + '.npz')
+    print(f'{path}: {len(coverage_map)} {kind}s')
+
+if __name__ == '__main__':
+  if len(sys.argv) < 4 or sys.argv[1] != 'convert' or sys.argv[2] not in ['line', 'edge']:
+    print('Usage: python covmap.py convert <line|edge> <text coverage map>...')
+    exit(1)
+  convert(sys.argv[2], sys.argv[3:])
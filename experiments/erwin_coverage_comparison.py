@@ -5,31 +5,30 @@ compared against unit tests, ACF, and Fuzzol.
 """
 
 from pathlib import Path
-from typing import Dict, Set
+from typing import Dict
 
+from covmap import CoverageMap, get_index
+import covmap
 
-def load_coverage_map(file_path: str) -> Set[str]:
-    """Load coverage data from a file into a set."""
-    coverage_set = set()
+
+def load_coverage_map(file_path: str, kind: str) -> CoverageMap:
+    """Load a coverage map (.npz, or the text map of the same name) over the shared index of its kind."""
+    index = get_index(kind, str(Path(file_path).parent))
     try:
-        with open(file_path, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line:
-                    coverage_set.add(line)
+        return covmap.load_coverage_map(file_path, index)
     except FileNotFoundError:
         print(f"Warning: File not found: {file_path}")
     except Exception as e:
         print(f"Error reading {file_path}: {e}")
-    return coverage_set
+    return CoverageMap(index)
 
 
-def compare_coverage(erwin_coverage: Set[str], other_coverages: Dict[str, Set[str]]) -> Dict[str, Set[str]]:
+def compare_coverage(erwin_coverage: CoverageMap, other_coverages: Dict[str, CoverageMap]) -> Dict[str, CoverageMap]:
     """Compare Erwin coverage against other tools and find unique coverage."""
     results = {}
 
     # Combine all other coverages
-    all_other_coverage = set()
+    all_other_coverage = CoverageMap(erwin_coverage.index)
     for coverage_set in other_coverages.values():
         all_other_coverage.update(coverage_set)
 
@@ -43,7 +42,7 @@ def compare_coverage(erwin_coverage: Set[str], other_coverages: Dict[str, Set[st
     return results
 
 
-def print_comparison_results(results: Dict[str, Set[str]], coverage_type: str):
+def print_comparison_results(results: Dict[str, CoverageMap], coverage_type: str):
     """Print comparison results in a readable format."""
     print(f"\n{'='*60}")
     print(f"{coverage_type.upper()} COVERAGE COMPARISON RESULTS")
@@ -70,7 +69,7 @@ def print_comparison_results(results: Dict[str, Set[str]], coverage_type: str):
             print("  No unique coverage found")
 
 
-def save_results_to_file(results: Dict[str, Set[str]], coverage_type: str, output_file: str):
+def save_results_to_file(results: Dict[str, CoverageMap], coverage_type: str, output_file: str):
     """Save complete comparison results to a file."""
     with open(output_file, 'a') as f:
         f.write(f"\n{'='*60}\n")
@@ -96,8 +95,8 @@ def save_results_to_file(results: Dict[str, Set[str]], coverage_type: str, outpu
                 f.write("  No unique coverage found\n")
 
 
-def save_summary_to_file(line_coverage: Dict[str, Set[str]], edge_coverage: Dict[str, Set[str]],
-                         line_results: Dict[str, Set[str]], edge_results: Dict[str, Set[str]],
+def save_summary_to_file(line_coverage: Dict[str, CoverageMap], edge_coverage: Dict[str, CoverageMap],
+                         line_results: Dict[str, CoverageMap], edge_results: Dict[str, CoverageMap],
                          output_file: str):
     """Save summary statistics to a file."""
     with open(output_file, 'a') as f:
@@ -127,7 +126,7 @@ def save_summary_to_file(line_coverage: Dict[str, Set[str]], edge_coverage: Dict
             f.write(f"  vs {tool.upper()}: {unique_count} ({unique_count / len(edge_coverage['erwin']) * 100:.2f}%)\n")
 
 
-def save_unique_items_to_files(line_results: Dict[str, Set[str]], edge_results: Dict[str, Set[str]], output_dir: str):
+def save_unique_items_to_files(line_results: Dict[str, CoverageMap], edge_results: Dict[str, CoverageMap], output_dir: str):
     """Save unique coverage items to separate files for further analysis."""
     # Save line coverage unique items
     for key, coverage_set in line_results.items():
@@ -164,20 +163,20 @@ def main():
 
     # Line coverage files
     line_files = {
-        'erwin': base_path / "linecovmap_gen50_0.txt",
-        'acf': base_path / "linecovmap_acf.txt",
-        'fuzzol': base_path / "linecovmap_fuzzol.txt",
-        'unittest': base_path / "linecovmap_unittest.txt",
-        'trivial': base_path / "linecovmap_trivial_0.txt"
+        'erwin': base_path / "linecovmap_gen50_0.npz",
+        'acf': base_path / "linecovmap_acf.npz",
+        'fuzzol': base_path / "linecovmap_fuzzol.npz",
+        'unittest': base_path / "linecovmap_unittest.npz",
+        'trivial': base_path / "linecovmap_trivial_0.npz"
     }
 
     # Edge coverage files
     edge_files = {
-        'erwin': base_path / "edgecovmap_gen50.txt",
-        'acf': base_path / "edgecovmap_acf.txt",
-        'fuzzol': base_path / "edgecovmap_fuzzol.txt",
-        'unittest': base_path / "edgecovmap_unittest.txt",
-        'trivial': base_path / "edgecovmap_trivial.txt"
+        'erwin': base_path / "edgecovmap_gen50.npz",
+        'acf': base_path / "edgecovmap_acf.npz",
+        'fuzzol': base_path / "edgecovmap_fuzzol.npz",
+        'unittest': base_path / "edgecovmap_unittest.npz",
+        'trivial': base_path / "edgecovmap_trivial.npz"
     }
 
     print("Erwin Coverage Comparison Tool")
@@ -191,7 +190,7 @@ def main():
 
     line_coverage = {}
     for tool, file_path in line_files.items():
-        line_coverage[tool] = load_coverage_map(str(file_path))
+        line_coverage[tool] = load_coverage_map(str(file_path), 'line')
         print(f"  {tool}: {len(line_coverage[tool])} lines")
         with open(main_output_file, 'a') as f:
             f.write(f"  {tool}: {len(line_coverage[tool])} lines\n")
@@ -203,7 +202,7 @@ def main():
 
     edge_coverage = {}
     for tool, file_path in edge_files.items():
-        edge_coverage[tool] = load_coverage_map(str(file_path))
+        edge_coverage[tool] = load_coverage_map(str(file_path), 'edge')
         print(f"  {tool}: {len(edge_coverage[tool])} edges")
         with open(main_output_file, 'a') as f:
             f.write(f"  {tool}: {len(edge_coverage[tool])} edges\n")
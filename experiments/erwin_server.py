@@ -0,0 +1,68 @@
+import json
+import subprocess
+
+class ErwinServer:
+  '''
+  Client of a long-lived `erwin serve` process.
+  Each call of `generate` sends one JSON-line request of configuration overrides,
+  e.g., {'mode': 'type', 'maximum_solution_count': 50}, and waits for the reply,
+  so that Node startup and module loading are paid once instead of once per round.
+  '''
+  def __init__(self, command='npx erwin serve'):
+    self.command = command
+    self.process = None
+    self.request_id = 0
+
+  def start(self):
+    # Erwin's own logs go to stderr, which is not read here
+    self.process = subprocess.Popen(self.command, shell=True, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                    stderr=subprocess.DEVNULL, text=True, bufsize=1)
+
+  def alive(self):
+    return self.process is not None and self.process.poll() is None
+
+  def generate(self, overrides):
+    '''
+    Ask the server to generate programs with the given configuration overrides.
+    Return the reply, a dict with keys 'ok', 'programs', 'time' and optionally 'error'.
+    The server is restarted if it died, e.g., on an Erwin bug with stop_on_erwin_bug.
+    '''
+    if not self.alive():
+      self.start()
+    self.request_id += 1
+    request = dict(overrides, id=self.request_id)
+    try:
+      self.process.stdin.write(json.dumps(request) + '\n')
+      self.process.stdin.flush()
+      while True:
+        line = self.process.stdout.readline()
+        if line == '':
+          return {'ok': False, 'programs': [], 'time': 0, 'error': 'erwin serve exited unexpectedly'}
+        line = line.strip()
+        if not line.startswith('{'):
+          continue
+        reply = json.loads(line)
+        if reply.get('id') == self.request_id:
+          return reply
+    except (BrokenPipeError, json.JSONDecodeError) as e:
+      self.close()
+      return {'ok': False, 'programs': [], 'time': 0, 'error': str(e)}
+
+  def close(self):
+    if self.process is None:
+      return
+    if self.process.poll() is None:
+      try:
+        self.process.stdin.close()
+        self.process.wait(timeout=10)
+      except (BrokenPipeError, subprocess.TimeoutExpired):
+        self.process.kill()
+        self.process.wait()
+    self.process = None
+
+  def __enter__(self):
+    self.start()
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.close()
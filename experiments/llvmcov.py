@@ -0,0 +1,150 @@
+'''
+Streaming reader of `llvm-cov export -format=text` output.
+
+The export of the Solidity compiler is hundreds of MB, most of which is the
+per-file `segments` we never read. Instead of loading the whole document,
+the reader scans the stream for the `"functions":[` array of data[0] and
+decodes its elements one by one, so only one function object is held in memory at a time.
+'''
+import json
+import os
+import subprocess
+import threading
+
+CHUNK_SIZE = 1 << 20
+
+def iter_json_array(stream, key, chunk_size=CHUNK_SIZE):
+  '''
+  Yield the decoded elements of the first JSON array following `key`, e.g., '"functions":[',
+  in a text stream, without decoding the rest of the document.
+  '''
+  decoder = json.JSONDecoder()
+  buf = ''
+  #!Step 1: Skip everything before the array
+  while True:
+    pos = buf.find(key)
+    if pos >= 0:
+      buf = buf[pos + len(key):]
+      break
+    chunk = stream.read(chunk_size)
+    if not chunk:
+      return
+    # Keep the tail in case the key is split across two chunks
+    buf = buf[-len(key):] + chunk
+  #!Step 2: Decode the array elements one by one
+  pos = 0
+  while True:
+    while pos < len(buf) and buf[pos] in ' \t\r\n,':
+      pos += 1
+    if pos == len(buf):
+      chunk = stream.read(chunk_size)
+      if not chunk:
+        return
+      buf = chunk
+      pos = 0
+      continue
+    if buf[pos] == ']':
+      return
+    try:
+      element, end = decoder.raw_decode(buf, pos)
+    except json.JSONDecodeError:
+      # The element is not complete yet
+      chunk = stream.read(chunk_size)
+      if not chunk:
+        raise
+      buf = buf[pos:] + chunk
+      pos = 0
+      continue
+    yield element
+    pos = end
+    if pos > chunk_size:
+      buf = buf[pos:]
+      pos = 0
+
+def iter_branches(stream):
+  '''
+  Yield (function_name, line_start, column_start, line_end, column_end, count)
+  for every branch of every function in an llvm-cov export stream.
+  '''
+  for function in iter_json_array(stream, '"functions":['):
+    function_name = function['name']
+    for branch in function.get('branches', []):
+      # https://github.com/llvm/llvm-project/blob/34f8573a514915222630cf21e8a0c901a25f4ca0/llvm/tools/llvm-cov/CoverageExporterJson.cpp#L96
+      yield (function_name, branch[0], branch[1], branch[2], branch[3], branch[4])
+
+def export_branches(binary, profdata, sources=()):
+  '''Run `llvm-cov export` and yield its branches as they are printed, without writing the export to disk.'''
+  cmd = ['llvm-cov', 'export', binary, f'-instr-profile={profdata}', '-format=text', *sources]
+  process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, bufsize=CHUNK_SIZE)
+  try:
+    yield from iter_branches(process.stdout)
+  finally:
+    process.stdout.close()
+    process.wait()
+
+def merge_profiles(inputs, output):
+  '''Merge raw or indexed profiles into one indexed profile with `llvm-profdata merge -sparse`.'''
+  cmd = ['llvm-profdata', 'merge', '-sparse'] + list(inputs) + ['-o', output]
+  subprocess.run(cmd, check=True, capture_output=True, text=True)
+
+class ProfdataMerger:
+  '''
+  Merge per-round delta profiles into the master profile in a background thread.
+  Deltas are merged in batches of `interval` so that the master, which grows with
+  the whole history, is rewritten once every `interval` rounds instead of every round.
+  `flush` blocks until every submitted delta is in the master.
+  A failed merge puts its deltas back into the pending ones, and its exception is raised
+  by the next `submit` or `flush` on the caller's thread.
+  '''
+  def __init__(self, master, interval=10):
+    self.master = master
+    self.interval = interval
+    self.pending = []
+    self.lock = threading.Lock()
+    self.worker = None
+    self.error = None
+
+  def _merge(self, deltas):
+    inputs = deltas + ([self.master] if os.path.exists(self.master) else [])
+    try:
+      merge_profiles(inputs, self.master + '.tmp')
+      os.replace(self.master + '.tmp', self.master)
+    except Exception as e:
+      with self.lock:
+        self.pending = deltas + self.pending
+        self.error = e
+      return
+    for delta in deltas:
+      os.remove(delta)
+
+  def _raise_error(self):
+    with self.lock:
+      error, self.error = self.error, None
+    if error is not None:
+      raise error
+
+  def _start(self):
+    with self.lock:
+      deltas = self.pending
+      self.pending = []
+    if deltas:
+      self.worker = threading.Thread(target=self._merge, args=(deltas,), daemon=True)
+      self.worker.start()
+
+  def submit(self, delta):
+    with self.lock:
+      self.pending.append(delta)
+      ready = len(self.pending) >= self.interval
+    self._raise_error()
+    # Only one merge into the master runs at a time
+    if ready and (self.worker is None or not self.worker.is_alive()):
+      self._start()
+
+  def flush(self):
+    if self.worker is not None:
+      self.worker.join()
+    self._raise_error()
+    self._start()
+    if self.worker is not None:
+      self.worker.join()
+    self._raise_error()
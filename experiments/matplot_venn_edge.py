@@ -2,14 +2,13 @@ import matplotlib.pyplot as plt
 from matplotlib_venn import venn2, venn3
 import matplotlib.patches as patches
 from venn import venn
+from covmap import load_coverage_map, get_index
+edge_index = get_index('edge')
 
 # Read the data
-with open('./coverages/edgecovmap_unittest.txt', 'r') as f:
-    edges_unittest = set(f.read().splitlines())
-with open('./coverages/edgecovmap_gen50.txt', 'r') as f:
-    edges_gen50_0 = set(f.read().splitlines())
-with open('./coverages/edgecovmap_acf.txt', 'r') as f:
-    edges_acf = set(f.read().splitlines())
+edges_unittest = load_coverage_map('./coverages/edgecovmap_unittest.npz', edge_index).positions()
+edges_gen50_0 = load_coverage_map('./coverages/edgecovmap_gen50.npz', edge_index).positions()
+edges_acf = load_coverage_map('./coverages/edgecovmap_acf.npz', edge_index).positions()
 
 # Set up the figure
 plt.figure(figsize=(10, 7))
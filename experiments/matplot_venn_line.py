@@ -1,14 +1,13 @@
 import matplotlib.pyplot as plt
 from matplotlib_venn import venn2, venn3
 import matplotlib.patches as patches
+from covmap import load_coverage_map, get_index
+line_index = get_index('line')
 
 # Read the data
-with open('./coverages/linecovmap_unittest.txt', 'r') as f:
-    lines_unittest = set(f.read().splitlines())
-with open('./coverages/linecovmap_gen50_0.txt', 'r') as f:
-    lines_gen50_0 = set(f.read().splitlines())
-with open('./coverages/linecovmap_acf_unittest.txt', 'r') as f:
-    lines_acf = set(f.read().splitlines())
+lines_unittest = load_coverage_map('./coverages/linecovmap_unittest.npz', line_index).positions()
+lines_gen50_0 = load_coverage_map('./coverages/linecovmap_gen50_0.npz', line_index).positions()
+lines_acf = load_coverage_map('./coverages/linecovmap_acf_unittest.npz', line_index).positions()
 
 # Set up the figure
 plt.figure(figsize=(10, 7))
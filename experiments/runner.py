@@ -0,0 +1,108 @@
+'''
+Bounded runs of compiler processes.
+
+`run` starts a command in a new process group under rlimits on CPU time and address space,
+kills the whole group once the wall-clock limit is exceeded, and classifies the outcome as
+ok, error (a nonzero exit), crash (killed by a signal), timeout or oom,
+so a compiler that loops in the optimizer or in the SMTChecker costs at most one time limit
+and is reported instead of stalling the experiment.
+'''
+import math
+import os
+import resource
+import signal
+import subprocess
+from collections import namedtuple
+
+OK = 'ok'
+ERROR = 'error'
+CRASH = 'crash'
+TIMEOUT = 'timeout'
+OOM = 'oom'
+
+RunResult = namedtuple('RunResult', ['outcome', 'returncode', 'stdout', 'stderr'])
+
+def megabytes(n):
+  return None if n is None or n <= 0 else int(n) << 20
+
+def cpu_limit(cpu_seconds):
+  '''The soft RLIMIT_CPU applied for `cpu_seconds`, which only takes whole seconds.'''
+  return max(1, math.ceil(cpu_seconds))
+
+def limit_resources(cpu_seconds=None, memory_bytes=None):
+  '''Return a preexec_fn that applies the limits in the child before it executes the command.'''
+  def preexec():
+    if cpu_seconds is not None:
+      # SIGXCPU at the soft limit, SIGKILL one second later if it is ignored
+      cpu = cpu_limit(cpu_seconds)
+      resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+    if memory_bytes is not None:
+      resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+  return preexec
+
+def kill_group(p):
+  try:
+    os.killpg(p.pid, signal.SIGKILL)
+  except (ProcessLookupError, PermissionError):
+    pass
+
+class RusagePopen(subprocess.Popen):
+  '''A Popen that reaps the process with os.wait4 instead of os.waitpid, and keeps its resource usage.'''
+  rusage = None
+
+  def _try_wait(self, wait_flags):
+    try:
+      pid, status, rusage = os.wait4(self.pid, wait_flags)
+    except ChildProcessError:
+      # As in Popen: SIGCHLD is ignored, so the status of the dead child is lost
+      return self.pid, 0
+    if pid == self.pid:
+      self.rusage = rusage
+    return pid, status
+
+def classify(returncode, stderr, cpu_limit_reached=False):
+  '''
+  Classify a finished process by its return code and its error output.
+  `cpu_limit_reached` tells a SIGKILL at the hard CPU limit, after SIGXCPU was ignored, from one for memory.
+  '''
+  if returncode == 0:
+    return OK
+  if returncode == -signal.SIGXCPU or (returncode == -signal.SIGKILL and cpu_limit_reached):
+    return TIMEOUT
+  if isinstance(stderr, bytes):
+    stderr = stderr.decode('utf-8', 'replace')
+  # A failed allocation under RLIMIT_AS surfaces as std::bad_alloc, and the OOM killer sends SIGKILL
+  if 'bad_alloc' in (stderr or '') or returncode == -signal.SIGKILL:
+    return OOM
+  if returncode < 0:
+    return CRASH
+  return ERROR
+
+def run(cmd, timeout=None, cpu_seconds=None, memory_bytes=None, input=None, env=None, text=False, shell=False, capture_stdout=True):
+  '''
+  Run the command with at most `timeout` seconds of wall-clock time, `cpu_seconds` seconds of CPU time
+  and `memory_bytes` bytes of address space; None means unlimited.
+  The CPU limit defaults to the wall-clock limit, so the command still stops if the driver dies before killing it.
+  The error output is always captured, as classify needs it; the output is discarded unless `capture_stdout`.
+  Return a RunResult; its return code is None if the command timed out.
+  '''
+  if cpu_seconds is None:
+    cpu_seconds = timeout
+  stdout = subprocess.PIPE if capture_stdout else subprocess.DEVNULL
+  p = RusagePopen(cmd, stdin=subprocess.DEVNULL if input is None else subprocess.PIPE, stdout=stdout, stderr=subprocess.PIPE,
+                  env=env, text=text, shell=shell, start_new_session=True,
+                  preexec_fn=limit_resources(cpu_seconds, memory_bytes))
+  try:
+    stdout, stderr = p.communicate(input, timeout=timeout)
+  except subprocess.TimeoutExpired:
+    # Kill the group rather than the process, so that a shell and the compiler it started both go
+    kill_group(p)
+    stdout, stderr = p.communicate()
+    return RunResult(TIMEOUT, None, stdout, stderr)
+  except BaseException:
+    kill_group(p)
+    p.wait()
+    raise
+  cpu_limit_reached = (cpu_seconds is not None and p.rusage is not None
+                       and p.rusage.ru_utime + p.rusage.ru_stime >= cpu_limit(cpu_seconds))
+  return RunResult(classify(p.returncode, stderr, cpu_limit_reached), p.returncode, stdout, stderr)
@@ -0,0 +1,89 @@
+'''
+Schedulers choosing the generation setting of every round.
+
+An arm is one generation setting, e.g., a dict of Erwin configuration overrides
+such as {'mode': 'type', 'maximum_solution_count': 50, 'struct_type_prob': 0.0},
+or an `npx erwin generate` command line.
+`choose` picks the arm of the next round, and `reward` reports what the round gained,
+e.g., the new lines or edges it covered, and how many seconds it took.
+'''
+import json
+import math
+import os
+import random
+from checkpoint import save_json_atomically, load_json_checkpoint
+
+def arm_key(arm):
+  return arm if isinstance(arm, str) else json.dumps(arm, sort_keys=True)
+
+class RandomScheduler:
+  '''Draw every arm from `sample`, ignoring the rewards.'''
+  def __init__(self, sample):
+    self.sample = sample
+
+  def choose(self):
+    return self.sample()
+
+  def reward(self, arm, gain, seconds):
+    pass
+
+class BanditScheduler:
+  '''
+  UCB1 over a fixed list of arms.
+  The reward of a round is its gain per second. UCB1 expects rewards in [0, 1],
+  so rewards are normalised by the largest reward seen so far, and the past rewards are rescaled when it grows.
+  The statistics are saved in `path` after every reward and loaded from it on construction,
+  so that they carry over to the following executions and campaigns.
+  '''
+  def __init__(self, arms, path=None, exploration=math.sqrt(2)):
+    self.arms = arms
+    self.path = path
+    self.exploration = exploration
+    self.pulls = {arm_key(arm): 0 for arm in arms}
+    self.rewards = {arm_key(arm): 0.0 for arm in arms}
+    self.scale = 0.0
+    stats = load_json_checkpoint(path) if path is not None else None
+    if stats is not None:
+      self.scale = stats['scale']
+      for key, arm_stats in stats['arms'].items():
+        # Arms that are no longer offered are dropped
+        if key in self.pulls:
+          self.pulls[key] = arm_stats['pulls']
+          self.rewards[key] = arm_stats['reward']
+
+  def choose(self):
+    unplayed = [arm for arm in self.arms if self.pulls[arm_key(arm)] == 0]
+    if unplayed:
+      return random.choice(unplayed)
+    log_total = math.log(sum(self.pulls.values()))
+    def upper_confidence_bound(arm):
+      key = arm_key(arm)
+      return self.rewards[key] / self.pulls[key] + self.exploration * math.sqrt(log_total / self.pulls[key])
+    return max(self.arms, key=upper_confidence_bound)
+
+  def reward(self, arm, gain, seconds):
+    reward = gain / max(seconds, 1e-6)
+    if reward > self.scale:
+      if self.scale > 0:
+        for key in self.rewards:
+          self.rewards[key] *= self.scale / reward
+      self.scale = reward
+    key = arm_key(arm)
+    self.pulls[key] += 1
+    self.rewards[key] += reward / self.scale if self.scale > 0 else 0.0
+    self.save()
+
+  def save(self):
+    if self.path is None:
+      return
+    save_json_atomically(self.path, {
+      'scale': self.scale,
+      'arms': {key: {'pulls': self.pulls[key], 'reward': self.rewards[key]} for key in self.pulls}
+    }, indent=2)
+
+def subsets(options, max_size):
+  '''All subsets of at most `max_size` options, as lists.'''
+  result = [[]]
+  for option in options:
+    result += [subset + [option] for subset in result if len(subset) < max_size]
+  return result
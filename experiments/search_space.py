@@ -6,15 +6,25 @@ with open('./search_space.csv', 'r') as f:
   vis_all = []
   loc_leaf = []
   loc_all = []
+  # The exact number of solutions, only recorded by newer versions of Erwin in the third column
+  type_exact = []
+  vis_exact = []
+  loc_exact = []
   for line in lines[::3]:
     type_leaf.append(int(line.split(',')[0]))
     type_all.append(int(line.split(',')[1]))
+    if len(line.split(',')) > 2:
+      type_exact.append(int(line.split(',')[2]))
   for line in lines[1::3]:
     vis_leaf.append(int(line.split(',')[0]))
     vis_all.append(int(line.split(',')[1]))
+    if len(line.split(',')) > 2:
+      vis_exact.append(int(line.split(',')[2]))
   for line in lines[2::3]:
     loc_leaf.append(int(line.split(',')[0]))
     loc_all.append(int(line.split(',')[1]))
+    if len(line.split(',')) > 2:
+      loc_exact.append(int(line.split(',')[2]))
 
 
 type_div = [all/leaf for leaf, all in zip(type_leaf, type_all)]
@@ -60,4 +70,30 @@ print((type_leaf[n//2] + type_leaf[n//2 + 1]) / 2)
 n = len(vis_leaf)
 print((vis_leaf[n//2] + vis_leaf[n//2 + 1]) / 2)
 n = len(loc_leaf)
-print((loc_leaf[n//2] + loc_leaf[n//2 + 1]) / 2)
\ No newline at end of file
+print((loc_leaf[n//2] + loc_leaf[n//2 + 1]) / 2)
+
+if type_exact and vis_exact and loc_exact:
+  # How much the cartesian product of leaf solution ranges overestimates the real number of solutions
+  type_exact_div = [leaf/exact for leaf, exact in zip(type_leaf, type_exact) if exact > 0]
+  vis_exact_div = [leaf/exact for leaf, exact in zip(vis_leaf, vis_exact) if exact > 0]
+  loc_exact_div = [leaf/exact for leaf, exact in zip(loc_leaf, loc_exact) if exact > 0]
+  print('==exact max==')
+  print(max(type_exact), max(vis_exact), max(loc_exact))
+  print('==exact min==')
+  print(min(type_exact), min(vis_exact), min(loc_exact))
+  print('==exact mean==')
+  print(sum(type_exact) / len(type_exact), sum(vis_exact) / len(vis_exact), sum(loc_exact) / len(loc_exact))
+  print('==exact median==')
+  type_exact = sorted(type_exact)
+  vis_exact = sorted(vis_exact)
+  loc_exact = sorted(loc_exact)
+  n = len(type_exact)
+  print((type_exact[n//2] + type_exact[n//2 + 1]) / 2)
+  n = len(vis_exact)
+  print((vis_exact[n//2] + vis_exact[n//2 + 1]) / 2)
+  n = len(loc_exact)
+  print((loc_exact[n//2] + loc_exact[n//2 + 1]) / 2)
+  print('==leaf/exact mean==')
+  print(sum(type_exact_div) / len(type_exact_div), sum(vis_exact_div) / len(vis_exact_div), sum(loc_exact_div) / len(loc_exact_div))
+  print('==leaf/exact max==')
+  print(max(type_exact_div), max(vis_exact_div), max(loc_exact_div))
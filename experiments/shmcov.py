@@ -0,0 +1,123 @@
+'''
+Driver of the shm coverage backend (coverage.py --backend shm).
+
+The instrumented solc links shmcov_runtime.c, which counts edges into a shared-memory
+bitmap and turns solc into an AFL-style forkserver. `ForkServer` starts
+`solc --standard-json` once; every compilation writes the standard JSON input
+into the file behind solc's stdin, asks the forkserver for a fork, and reads
+the edges covered by the compilation straight from the bitmap.
+'''
+import fcntl
+import os
+import select
+import signal
+import struct
+import subprocess
+import tempfile
+from multiprocessing import shared_memory
+import numpy as np
+from runner import limit_resources
+
+FORKSERVER_CONTROL_FD = 198
+FORKSERVER_STATUS_FD = 199
+HEADER_SIZE = 8
+
+class ForkServer:
+  def __init__(self, solc_path, shm_size=HEADER_SIZE + (1 << 24), timeout=60, memory_bytes=None):
+    self.solc_path = solc_path
+    self.timeout = timeout
+    self.memory_bytes = memory_bytes
+    self.shm = shared_memory.SharedMemory(create=True, size=shm_size)
+    self.counters = np.frombuffer(self.shm.buf, dtype=np.uint8, offset=HEADER_SIZE)
+    self.input = tempfile.NamedTemporaryFile('w+', suffix='.json')
+    # Opened for appending, so that every fork writes at the end after the file was emptied
+    self.errors = tempfile.TemporaryFile('w+b')
+    fcntl.fcntl(self.errors.fileno(), fcntl.F_SETFL, fcntl.fcntl(self.errors.fileno(), fcntl.F_GETFL) | os.O_APPEND)
+    self.process = None
+
+  def start(self):
+    control_r, self.control_w = os.pipe()
+    self.status_r, status_w = os.pipe()
+    env = os.environ.copy()
+    env['ERWIN_SHM_NAME'] = '/' + self.shm.name
+    env['ERWIN_SHM_SIZE'] = str(self.shm.size)
+    env['ERWIN_FORKSERVER'] = '1'
+    # The runtime expects the pipes at fixed fds
+    os.dup2(control_r, FORKSERVER_CONTROL_FD)
+    os.dup2(status_w, FORKSERVER_STATUS_FD)
+    try:
+      self.process = subprocess.Popen([self.solc_path, '--standard-json'], stdin=self.input,
+                                      stdout=subprocess.DEVNULL, stderr=self.errors, env=env,
+                                      pass_fds=(FORKSERVER_CONTROL_FD, FORKSERVER_STATUS_FD),
+                                      # Every fork inherits the memory limit of the forkserver
+                                      preexec_fn=limit_resources(memory_bytes=self.memory_bytes))
+    finally:
+      for fd in (control_r, status_w, FORKSERVER_CONTROL_FD, FORKSERVER_STATUS_FD):
+        os.close(fd)
+    if len(self._read_status(self.timeout)) != 4:
+      raise RuntimeError(f'{self.solc_path} is not linked with shmcov_runtime.c')
+    if self.edge_count() > len(self.counters):
+      raise RuntimeError(f'{self.solc_path} has {self.edge_count()} edges but the bitmap only {len(self.counters)} counters, raise shm_size')
+
+  def _read_status(self, timeout):
+    ready, _, _ = select.select([self.status_r], [], [], timeout)
+    if not ready:
+      return b''
+    return os.read(self.status_r, 4)
+
+  def edge_count(self):
+    '''Number of edges in the instrumented solc.'''
+    return struct.unpack_from('<Q', self.shm.buf, 0)[0]
+
+  def run(self, standard_json):
+    '''
+    Compile one standard JSON input in a fresh fork of solc.
+    Return the wait status of the compilation, or None if it timed out,
+    and leave its edge counters in the bitmap until the next run.
+    '''
+    self.counters.fill(0)
+    self.errors.truncate(0)
+    self.input.seek(0)
+    self.input.truncate()
+    self.input.write(standard_json)
+    self.input.flush()
+    os.write(self.control_w, b'\0\0\0\0')
+    pid = self._read_status(self.timeout)
+    if len(pid) != 4:
+      raise RuntimeError('The forkserver of solc died')
+    pid = struct.unpack('<i', pid)[0]
+    status = self._read_status(self.timeout)
+    if len(status) != 4:
+      os.kill(pid, signal.SIGKILL)
+      self._read_status(None)
+      return None
+    return struct.unpack('<i', status)[0]
+
+  def error_output(self):
+    '''The error output of the last run, e.g., the std::bad_alloc of a compilation out of memory.'''
+    self.errors.seek(0)
+    return self.errors.read().decode('utf-8', 'replace')
+
+  def covered_edges(self):
+    '''Ids of the edges covered by the last run.'''
+    return np.flatnonzero(self.counters[:self.edge_count()])
+
+  def close(self):
+    if self.process is not None:
+      os.close(self.control_w)
+      os.close(self.status_r)
+      self.process.wait()
+      self.process = None
+    self.input.close()
+    self.errors.close()
+    # The view must go before the shared memory can be unmapped
+    self.counters = None
+    self.shm.close()
+    self.shm.unlink()
+
+  def __enter__(self):
+    self.start()
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.close()
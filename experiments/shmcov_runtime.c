@@ -0,0 +1,106 @@
+/*
+ * SanitizerCoverage runtime of the shm coverage backend (coverage.py --backend shm).
+ *
+ * Link it into a solc built with `-fsanitize-coverage=trace-pc-guard`.
+ * Every edge gets a guard id, and executing the edge bumps a saturating 8-bit counter
+ * in a POSIX shared-memory bitmap named by ERWIN_SHM_NAME, so the coverage of a
+ * compilation can be read by the driver right after the compilation exits.
+ * The first 8 bytes of the shared memory hold the number of guards; the counters follow.
+ * A bitmap with fewer counters than guards would alias edges, so the driver refuses it
+ * when the number of guards exceeds the number of counters.
+ *
+ * If ERWIN_FORKSERVER is set, solc stops before main and becomes a forkserver
+ * speaking the AFL protocol on fds 198 (control) and 199 (status):
+ * it writes a 4-byte hello, then for each 4-byte request on fd 198 it rewinds
+ * stdin, forks a child that goes on to run main, and writes the child's pid
+ * and wait status on fd 199. Each compilation then costs a fork instead of an exec
+ * of the large instrumented binary.
+ */
+#include <fcntl.h>
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <sys/mman.h>
+#include <sys/wait.h>
+#include <unistd.h>
+
+#define FORKSERVER_CONTROL_FD 198
+#define FORKSERVER_STATUS_FD 199
+#define HEADER_SIZE 8
+
+static uint8_t *counters = NULL;
+static uint64_t *guard_count = NULL;
+static uint64_t capacity = 0;
+static uint64_t next_guard = 0;
+
+static void map_counters(void) {
+  const char *name = getenv("ERWIN_SHM_NAME");
+  const char *size = getenv("ERWIN_SHM_SIZE");
+  uint64_t bytes = size ? strtoull(size, NULL, 10) : 0;
+  uint8_t *base = NULL;
+  if (name && bytes > HEADER_SIZE) {
+    int fd = shm_open(name, O_RDWR, 0600);
+    if (fd >= 0) {
+      base = mmap(NULL, bytes, PROT_READ | PROT_WRITE, MAP_SHARED, fd, 0);
+      close(fd);
+      if (base == MAP_FAILED) base = NULL;
+    }
+  }
+  if (!base) {
+    /* Not driven by coverage.py: count into private memory */
+    bytes = HEADER_SIZE + (1 << 16);
+    base = calloc(1, bytes);
+  }
+  guard_count = (uint64_t *)base;
+  counters = base + HEADER_SIZE;
+  capacity = bytes - HEADER_SIZE;
+}
+
+void __sanitizer_cov_trace_pc_guard_init(uint32_t *start, uint32_t *stop) {
+  if (start == stop || *start) return;
+  if (!counters) map_counters();
+  uint64_t first = next_guard;
+  for (uint32_t *guard = start; guard < stop; guard++) {
+    /* Guard ids wrap around if the bitmap is too small for the binary, and the driver then fails on the guard count */
+    *guard = (uint32_t)(next_guard++ % capacity);
+  }
+  if (first <= capacity && next_guard > capacity) {
+    fprintf(stderr, "shmcov: %llu counters are too few for the edges of solc, so edges alias\n", (unsigned long long)capacity);
+  }
+  *guard_count = next_guard;
+}
+
+void __sanitizer_cov_trace_pc_guard(uint32_t *guard) {
+  /* Saturate rather than wrap, so an edge hit a multiple of 256 times still counts as covered */
+  uint8_t *counter = &counters[*guard];
+  if (*counter != UINT8_MAX) (*counter)++;
+}
+
+static void forkserver(void) {
+  uint32_t message = 0;
+  /* Nobody is listening: run as a normal solc */
+  if (write(FORKSERVER_STATUS_FD, &message, 4) != 4) return;
+  while (1) {
+    if (read(FORKSERVER_CONTROL_FD, &message, 4) != 4) _exit(0);
+    /* The driver rewrites the input file behind stdin before every request */
+    lseek(STDIN_FILENO, 0, SEEK_SET);
+    pid_t pid = fork();
+    if (pid < 0) _exit(1);
+    if (pid == 0) {
+      close(FORKSERVER_CONTROL_FD);
+      close(FORKSERVER_STATUS_FD);
+      return;
+    }
+    int status = 0;
+    if (write(FORKSERVER_STATUS_FD, &pid, 4) != 4) _exit(1);
+    if (waitpid(pid, &status, 0) < 0) _exit(1);
+    if (write(FORKSERVER_STATUS_FD, &status, 4) != 4) _exit(1);
+  }
+}
+
+/* Run after the guard initialisers of the sanitizer (priority 2) and before the C++ static initialisers of solc */
+__attribute__((constructor(101))) static void shmcov_init(void) {
+  if (!counters) map_counters();
+  if (getenv("ERWIN_FORKSERVER")) forkserver();
+}
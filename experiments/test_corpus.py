@@ -0,0 +1,40 @@
+'''
+Tests of corpus.py, run with `python -m unittest test_corpus` in ./experiments.
+'''
+import os
+import tempfile
+import unittest
+from corpus import Corpus, minimise
+from covmap import CoverageIndex, CoverageMap
+
+def build_corpus(root, name, keys, programs):
+  '''Build a corpus whose execution index holds `keys` in that order, keeping `programs`, a dict from program names to their keys.'''
+  index = CoverageIndex(os.path.join(root, f'{name}.index'))
+  for key in keys:
+    index.position(key)
+  corpus = Corpus(os.path.join(root, name), index)
+  covered = CoverageMap(index)
+  for program, program_keys in programs.items():
+    sol_file = os.path.join(root, program)
+    with open(sol_file, 'w') as f:
+      f.write(f'// {program}\n')
+    corpus.add(sol_file, [index.position(key) for key in program_keys], covered)
+  return corpus.folder
+
+class MinimiseTest(unittest.TestCase):
+  def test_corpora_with_different_indices(self):
+    with tempfile.TemporaryDirectory() as root:
+      # The same keys sit at different positions in the two indices
+      first = build_corpus(root, 'corpus_a_0', ['a', 'b', 'c'], {'p1.sol': ['a', 'b'], 'p2.sol': ['c']})
+      second = build_corpus(root, 'corpus_a_1', ['c', 'd', 'a'], {'p3.sol': ['c', 'd', 'a'], 'p4.sol': ['d']})
+      output = os.path.join(root, 'minimised')
+      picked = minimise(output, [first, second])
+      self.assertEqual([(os.path.basename(sol_file), gain) for sol_file, gain in picked], [('p3.sol', 3), ('p1.sol', 1)])
+      self.assertTrue(os.path.exists(os.path.join(output, 'p1.sol')))
+      self.assertFalse(os.path.exists(os.path.join(output, 'p2.sol')))
+      # The output is a corpus itself, so minimising it again keeps the same programs
+      again = minimise(os.path.join(root, 'again'), [output])
+      self.assertEqual(sorted(os.path.basename(sol_file) for sol_file, _ in again), ['p1.sol', 'p3.sol'])
+
+if __name__ == '__main__':
+  unittest.main()
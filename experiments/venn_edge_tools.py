@@ -1,13 +1,12 @@
 import matplotlib.pyplot as plt
 from venn import venn
+from covmap import load_coverage_map, get_index
+edge_index = get_index('edge')
 
 # Read the data
-with open('./coverages/edgecovmap_fuzzol.txt', 'r') as f:
-    edges_fuzzol = set(f.read().splitlines())
-with open('./coverages/edgecovmap_erwin.txt', 'r') as f:
-    edges_erwin = set(f.read().splitlines())
-with open('./coverages/edgecovmap_acf.txt', 'r') as f:
-    edges_acf = set(f.read().splitlines())
+edges_fuzzol = load_coverage_map('./coverages/edgecovmap_fuzzol.npz', edge_index).positions()
+edges_erwin = load_coverage_map('./coverages/edgecovmap_erwin.npz', edge_index).positions()
+edges_acf = load_coverage_map('./coverages/edgecovmap_acf.npz', edge_index).positions()
 
 fig, ax = plt.subplots(figsize=(10, 7))
 
@@ -1,13 +1,12 @@
 import matplotlib.pyplot as plt
 from venn import venn
+from covmap import load_coverage_map, get_index
+line_index = get_index('line')
 
 # Read the data
-with open('./coverages/linecovmap_acf.txt', 'r') as f:
-    lines_acf = set(f.read().splitlines())
-with open('./coverages/linecovmap_erwin.txt', 'r') as f:
-    lines_erwin = set(f.read().splitlines())
-with open('./coverages/linecovmap_fuzzol.txt', 'r') as f:
-    lines_fuzzol = set(f.read().splitlines())
+lines_acf = load_coverage_map('./coverages/linecovmap_acf.npz', line_index).positions()
+lines_erwin = load_coverage_map('./coverages/linecovmap_erwin.npz', line_index).positions()
+lines_fuzzol = load_coverage_map('./coverages/linecovmap_fuzzol.npz', line_index).positions()
 
 fig, ax = plt.subplots(figsize=(10, 7))
 
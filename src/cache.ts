@@ -0,0 +1,134 @@
+import crypto from 'crypto';
+import * as fs from 'fs';
+import path from 'path';
+import { config } from './config';
+
+/**
+ * The result of compiling a program, cached under `config.compile_cache_dir`.
+ * The layout and the keys are shared with experiments/compile_cache.py,
+ * so a result cached by the experiment scripts is reused here and vice versa.
+ */
+export type CompileResult = {
+  status : number | null,
+  signal : string | null,
+  error : string
+};
+
+const PROGRAM_PLACEHOLDER = '<program>';
+let puts = 0;
+const binary_hashes = new Map<string, string>();
+
+function sha256(text : string | Buffer) : string {
+  return crypto.createHash('sha256').update(text).digest('hex');
+}
+
+function normalise_program(program : string) : string {
+  return program.replace(/\s+/g, ' ').trim();
+}
+
+function resolve_binary(binary : string) : string {
+  if (binary.includes(path.sep) || fs.existsSync(binary)) return binary;
+  for (const dir of (process.env.PATH ?? '').split(path.delimiter)) {
+    const candidate = path.join(dir, binary);
+    if (fs.existsSync(candidate)) return candidate;
+  }
+  return binary;
+}
+
+function binary_hash(binary : string) : string {
+  const binary_path = resolve_binary(binary);
+  if (!fs.existsSync(binary_path)) return sha256(binary);
+  const st = fs.statSync(binary_path);
+  const signature = `${binary_path}:${st.mtimeMs}:${st.size}`;
+  if (!binary_hashes.has(signature)) {
+    binary_hashes.set(signature, sha256(fs.readFileSync(binary_path)));
+  }
+  return binary_hashes.get(signature)!;
+}
+
+/**
+ * The cache key of compiling `program` by `binary` with `flags`.
+ * Programs that only differ in whitespace share one key.
+ */
+export function compile_cache_key(program : string, binary : string, flags : string) : string {
+  return sha256(`${sha256(normalise_program(program))}\n${binary_hash(binary)}\n${flags}`);
+}
+
+function entry_path(key : string) : string {
+  return path.join(config.compile_cache_dir, key.slice(0, 2), `${key}.json`);
+}
+
+export function normalise_error(stderr : string, file_path : string) : string {
+  return stderr.split(file_path).join(PROGRAM_PLACEHOLDER);
+}
+
+export function restore_error(error : string, file_path : string) : string {
+  return error.split(PROGRAM_PLACEHOLDER).join(file_path);
+}
+
+export function get_cached_result(key : string) : CompileResult | undefined {
+  if (config.compile_cache_dir === '') return undefined;
+  const file = entry_path(key);
+  try {
+    const result = JSON.parse(fs.readFileSync(file, 'utf-8')) as CompileResult;
+    //! Touch the entry so that eviction keeps recently used entries
+    const now = new Date();
+    fs.utimesSync(file, now, now);
+    return result;
+  }
+  catch (err) {
+    return undefined;
+  }
+}
+
+/**
+ * Cache a compilation result.
+ * The entry is written to a temporary file and renamed into place,
+ * so concurrent writers never expose half-written entries.
+ */
+export function put_cached_result(key : string, result : CompileResult) : void {
+  if (config.compile_cache_dir === '') return;
+  const file = entry_path(key);
+  fs.mkdirSync(path.dirname(file), { recursive: true });
+  const tmp = `${file}.${process.pid}.${crypto.randomBytes(4).toString('hex')}.tmp`;
+  fs.writeFileSync(tmp, JSON.stringify(result), 'utf-8');
+  fs.renameSync(tmp, file);
+  puts++;
+  if (puts % 256 === 0) {
+    evict();
+  }
+}
+
+/**
+ * Remove the least recently used entries until the cache takes at most 80% of `config.compile_cache_max_bytes`.
+ */
+function evict() : void {
+  const entries : [number, number, string][] = [];
+  let total = 0;
+  for (const dir of fs.readdirSync(config.compile_cache_dir)) {
+    const dir_path = path.join(config.compile_cache_dir, dir);
+    if (!fs.statSync(dir_path).isDirectory()) continue;
+    for (const file of fs.readdirSync(dir_path)) {
+      if (!file.endsWith('.json')) continue;
+      const file_path = path.join(dir_path, file);
+      try {
+        const st = fs.statSync(file_path);
+        entries.push([st.mtimeMs, st.size, file_path]);
+        total += st.size;
+      }
+      catch (err) {
+        continue;
+      }
+    }
+  }
+  if (total <= config.compile_cache_max_bytes) return;
+  entries.sort((a, b) => a[0] - b[0]);
+  for (const [, size, file_path] of entries) {
+    if (total <= config.compile_cache_max_bytes * 0.8) break;
+    try {
+      fs.unlinkSync(file_path);
+    }
+    catch (err) { }
+    total -= size;
+  }
+}
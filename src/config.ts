@@ -1,3 +1,5 @@
+import { assert } from "./utility";
+
 export const config = {
   file: "",
   out_dir: "./generated_programs",
@@ -12,6 +14,8 @@ export const config = {
 
   // Dominance Constraint Solution
   maximum_solution_count: 500,
+  // "enumerate" keeps the first solutions in the enumeration order, "uniform" draws solutions uniformly from all the solutions
+  solution_sampling: "enumerate",
 
   // Function
   function_body_stmt_cnt_upper_limit: 1,
@@ -98,6 +102,8 @@ export const config = {
 
   // The number of generation rounds
   generation_rounds: 1,
+  // The number of worker processes that generate programs in parallel
+  workers: 1,
 
   // generation time
   time: false,
@@ -112,9 +118,110 @@ export const config = {
   enable_test: false,
   test_out_dir: "./test_results",
   terminate_on_compiler_crash: false,
+  // Cache of compilation results in the test mode, shared with experiments/compile_cache.py. An empty path disables the cache.
+  compile_cache_dir: "./compile_cache",
+  compile_cache_max_bytes: 1073741824, // 1 GB
+  // The number of programs compiled together by one `solc --standard-json` process in the test mode
+  compile_batch_size: 1,
+  // The time limit in seconds of one solc process in the test mode. A program that exceeds it is recorded under time_limit_exceeded.
+  compile_timeout: 60,
   // Refresh the folder of the generated programs before generating new programs
   refresh_folder: false,
 
   // Experiment
   enable_search_space_cmp: false,
-}
\ No newline at end of file
+}
+
+/**
+ * Check the validity of the configuration used by the generation.
+ * An assertion error is thrown if any option is invalid.
+ */
+export function check_generation_config() : void {
+  assert(config.array_length_upperlimit >= 1, "The upper limit of the length of an array must be not less than 0.");
+  assert(config.function_body_stmt_cnt_upper_limit >= 0, "The upper limit of the number of statements of a function must be not less than 0.");
+  assert(config.function_body_stmt_cnt_lower_limit >= 0, "The lower limit of the number of statements of a function must be not less than 0.");
+  assert(config.return_count_of_function_upperlimit >= 0, "The upper limit of the number of return values of a function must be not less than 0.");
+  assert(config.return_count_of_function_lowerlimit >= 0, "The lower limit of the number of return values of a function must be not less than 0.");
+  assert(config.param_count_of_function_lowerlimit >= 0, "The lower limit of the number of parameters of a function must be not less than 0.");
+  assert(config.param_count_of_function_upperlimit >= 0, "The upper limit of the number of parameters of a function must be not less than 0.");
+  assert(config.function_count_per_contract_lower_limit <= config.function_count_per_contract_upper_limit, "The lower limit of the number of functions must be less than or equal to the upper limit.");
+  assert(config.function_count_per_contract_lower_limit >= 0, "The number of functions must be not less than 0.");
+  assert(config.modifier_per_function_lower_limit <= config.modifier_per_function_upper_limit, "The lower limit of the number of modifiers must be less than or equal to the upper limit.");
+  assert(config.modifier_per_function_lower_limit >= 0, "The number of modifiers must be not less than 0.");
+  assert(config.modifier_count_per_contract_lower_limit <= config.modifier_count_per_contract_upper_limit, "The lower limit of the number of modifiers must be less than or equal to the upper limit.");
+  assert(config.modifier_count_per_contract_lower_limit >= 0, "The number of modifiers must be not less than 0.");
+  assert(config.literal_prob >= 0 && config.literal_prob <= 1, "The probability of generating a literal must be in the range [0,1].");
+  assert(config.maximum_solution_count >= 0, "The maximum number of solutions must be not less than 0.");
+  assert(["enumerate", "uniform"].includes(config.solution_sampling), "The solution sampling is not either 'enumerate' or 'uniform', instead it is " + config.solution_sampling);
+  assert(config.tuple_prob >= 0 && config.tuple_prob <= 1, "The probability of generating a tuple surrounding an expression must be in the range [0,1].");
+  assert(config.init_state_var_in_constructor_prob >= 0 && config.init_state_var_in_constructor_prob <= 1, "The probability of initializing a state variable in the constructor must be in the range [0,1].");
+  assert(config.expression_complexity_level >= 1, "The complex level of the expression must be not less than 1.");
+  assert(config.state_variable_count_upperlimit >= 0, "state_variable_count_upperlimit must be not less than 0.");
+  assert(config.state_variable_count_lowerlimit >= 0, "state_variable_count_lowerlimit must be not less than 0.");
+  assert(config.contract_count >= 0, "contract_count must be not less than 0.");
+  if (config.mode === "") {
+    console.warn("You didn't specify the mode of Erwin. Therefore, Erwin will generate trivially, without exhaustively enumerating test programs in the search space.");
+    config.mode = "type";
+    config.maximum_solution_count = 1;
+  }
+  assert(["type", "scope", "loc"].includes(config.mode), "The mode is not either 'type', 'scope', 'loc', instead it is " + config.mode);
+  assert(config.uint_num >= 1 && config.uint_num <= 6, "The number of uint types must be in the range [1,6].");
+  assert(config.int_num >= 1 && config.int_num <= 6, "The number of int types must be in the range [1,6].");
+  assert(config.vardecl_prob >= 0 && config.vardecl_prob <= 1.0, "The probability of generating a variable declaration must be in the range [0,1].");
+  assert(config.new_prob >= 0 && config.new_prob <= 1.0, "The probability of generating a variable declaration in place must be in the range [0,1].");
+  assert(config.else_prob >= 0.0 && config.else_prob <= 1.0, "The probability of generating an else statement must be in the range [0,1].");
+  assert(config.mapping_type_prob >= 0.0 && config.mapping_type_prob <= 1.0, "The probability of generating a mapping must be in the range [0,1].");
+  assert(config.array_type_prob >= 0.0 && config.array_type_prob <= 1.0, "The probability of generating an array must be in the range [0,1].");
+  assert(config.string_type_prob >= 0.0 && config.string_type_prob <= 1.0, "The probability of generating a string must be in the range [0,1].");
+  assert(config.contract_type_prob >= 0.0 && config.contract_type_prob <= 1.0, "The probability of generating a contract instance must be in the range [0,1].");
+  assert(config.struct_type_prob >= 0.0 && config.struct_type_prob <= 1.0, "The probability of generating a struct instance must be in the range [0,1].");
+  assert(config.array_type_prob + config.mapping_type_prob + config.contract_type_prob + config.struct_type_prob + config.string_type_prob < 1, "A variable can be of elementary type, contract type, contract type, struct type, mapping type, array type, or string type. Therefore, the sum of the probabilities of generating non-elementary types must be less than 1 to ensure the generation of elementary-type variables.");
+  assert(config.dynamic_array_prob >= 0.0 && config.dynamic_array_prob <= 1.0, "The probability of generating a dynamic array must be in the range [0,1].");
+  assert(config.event_prob >= 0.0 && config.event_prob <= 1.0, "The probability of generating an event must be in the range [0,1].");
+  assert(config.error_prob >= 0.0 && config.error_prob <= 1.0, "The probability of generating an error must be in the range [0,1].");
+  assert(config.return_count_of_function_lowerlimit <= config.return_count_of_function_upperlimit, "The lower limit of the number of return values of a function must be less than or equal to the upper limit.");
+  assert(config.param_count_of_function_lowerlimit <= config.param_count_of_function_upperlimit, "The lower limit of the number of parameters of a function must be less than or equal to the upper limit.");
+  assert(config.state_variable_count_lowerlimit <= config.state_variable_count_upperlimit, "state_variable_count_lowerlimit must be less than or equal to state_variable_count_upperlimit.");
+  assert(config.nonstructured_statement_prob >= 0.0 && config.nonstructured_statement_prob <= 1.0, "The probability of generating a nonstructured statement must be in the range [0,1].");
+  assert(config.expression_complexity_prob >= 0.0 && config.expression_complexity_prob <= 1.0, "The probability of generating a complex expression must be in the range [0,1].");
+  assert(config.function_body_stmt_cnt_lower_limit <= config.function_body_stmt_cnt_upper_limit, "The lower limit of the number of statements of a function must be less than or equal to the upper limit.");
+  assert(config.function_body_stmt_cnt_lower_limit >= 0, "The lower limit of the number of statements of a function must be not less than 1.");
+  assert(config.statement_complexity__level >= 0, "The complex level of the statement must be not less than 0.");
+  assert(config.type_complexity_level >= 0, "The complex level of the type must be not less than 0.");
+  assert(config.for_init_cnt_lower_limit <= config.for_init_cnt_upper_limit, "The lower limit of the number of initialization in a for loop must be less than or equal to the upper limit.");
+  assert(config.for_init_cnt_lower_limit >= 0, "The upper limit of the number of initialization in a for loop must be not less than 0.");
+  assert(config.function_body_stmt_cnt_lower_limit <= config.function_body_stmt_cnt_upper_limit, "The lower limit of the number of statements of a function must be less than or equal to the upper limit.");
+  assert(config.function_body_stmt_cnt_lower_limit >= 0, "The lower limit of the number of statements of a function must be not less than 1.");
+  assert(config.for_body_stmt_cnt_lower_limit <= config.for_body_stmt_cnt_upper_limit, "The lower limit of the number of statements in the body of a for loop must be less than or equal to the upper limit.");
+  assert(config.for_body_stmt_cnt_lower_limit >= 0, "The lower limit of the number of statements in the body of a for loop must be not less than 0.");
+  assert(config.while_body_stmt_cnt_lower_limit <= config.while_body_stmt_cnt_upper_limit, "The lower limit of the number of statements in the body of a while loop must be less than or equal to the upper limit.");
+  assert(config.while_body_stmt_cnt_lower_limit >= 0, "The lower limit of the number of statements in the body of a while loop must be not less than 0.");
+  assert(config.do_while_body_stmt_cnt_lower_limit <= config.do_while_body_stmt_cnt_upper_limit, "The lower limit of the number of statements in the body of a do while loop must be less than or equal to the upper limit.");
+  assert(config.do_while_body_stmt_cnt_lower_limit >= 0, "The lower limit of the number of statements in the body of a do while loop must be not less than 0.");
+  assert(config.if_body_stmt_cnt_lower_limit <= config.if_body_stmt_cnt_upper_limit, "The lower limit of the number of statements in the body of an if statement must be less than or equal to the upper limit.");
+  assert(config.struct_member_variable_count_lowerlimit <= config.struct_member_variable_count_upperlimit, "The lower limit of the number of member variables in a struct must be less than or equal to the upper limit.");
+  assert(config.struct_member_variable_count_lowerlimit >= 1, "The lower limit of the number of member variables in a struct must be not less than 1.");
+  assert(config.struct_decl_per_contract_lowerlimit <= config.struct_decl_per_contract_upperlimit, "The lower limit of the number of struct declarations in a contract must be less than or equal to the upper limit.");
+  assert(config.struct_decl_per_contract_lowerlimit >= 1, "The lower limit of the number of struct declarations in a contract must be not less than 1.");
+  assert(config.event_decl_per_contract_lowerlimit <= config.event_decl_per_contract_upperlimit, "The lower limit of the number of events in a contract must be less than or equal to the upper limit.");
+  assert(config.event_decl_per_contract_lowerlimit >= 1, "The lower limit of the number of events in a contract must be not less than 1.");
+  assert(config.error_decl_per_contract_lowerlimit <= config.error_decl_per_contract_upperlimit, "The lower limit of the number of errors in a contract must be less than or equal to the upper limit.");
+  assert(config.error_decl_per_contract_lowerlimit >= 1, "The lower limit of the number of errors in a contract must be not less than 1.");
+  assert(config.struct_prob >= 0 && config.struct_prob <= 1, "The probability of generating a struct must be in the range [0,1].");
+  assert(config.in_func_initialization_prob >= 0 && config.in_func_initialization_prob <= 1, "The probability of generating an initialization statement must be in the range [0,1].");
+  assert(config.contract_member_initialization_prob >= 0 && config.contract_member_initialization_prob <= 1, "The probability of generating an initialization statement must be in the range [0,1].");
+  assert(config.init_with_state_var_prob >= 0 && config.init_with_state_var_prob <= 1, "The probability of initializing a variable with a state variable must be in the range [0,1].");
+  assert(config.constructor_prob >= 0 && config.constructor_prob <= 1, "The probability of generating a constructor must be in the range [0,1].");
+  assert(config.return_prob >= 0 && config.return_prob <= 1, "The probability of generating a return statement must be in the range [0,1].");
+  assert(config.reuse_name_prob >= 0 && config.reuse_name_prob < 1, "The probability of reusing a name must be in the range [0,1).");
+  assert(config.generation_rounds >= 1, "The number of generation rounds must be not less than 1.");
+  assert(config.workers >= 1, "The number of workers must be not less than 1.");
+  //! search_space.csv expects the lines of the three DAGs of one round to be adjacent
+  assert(config.workers === 1 || !config.enable_search_space_cmp, "The search space comparison record only supports one worker.");
+  assert(config.test_out_dir !== "", "The output directory for the generated test program is not provided.");
+  assert(config.compile_timeout > 0, "The time limit of one compilation must be positive.");
+  if (config.enable_test && config.target !== "slither") {
+    assert(config.compiler_path !== "", "The path of the compiler path is not provided while enabling the testing mode and the target is a solidity compiler.");
+  }
+  assert(['solidity', 'solang', 'solar', 'slither'].includes(config.target), "The target is not either 'solidity', 'solang', 'solar', or 'slither'.");
+}
@@ -1,4 +1,4 @@
-import { assert, merge_set } from "./utility";
+import { assert, merge_set, random_bigInt } from "./utility";
 import { Type, TypeKind, MappingType, ArrayType, TypeProvider } from "./type"
 import * as dot from 'ts-graphviz';
 import { config } from './config'
@@ -10,7 +10,7 @@ import { StorageLocation } from "./loc";
 import { VisMut, VisMutKind } from "./vismut";
 import { LinkedListNode } from "./dataStructor";
 import { decl_db, expr_db } from "./db";
-import { Value, intersection_range, is_equal_range, is_super_range } from "./value";
+import { Value, ValueLattice, intersection_range, is_equal_range } from "./value";
 import fs from 'fs';
 /**
  * Stores how a non-leaf constraint node restrains a leaf node.
@@ -43,6 +43,99 @@ export class ConstraintNode {
     this.id = id;
   }
 }
+/**
+ * A connected component of the leaves, connected by the relations among leaves.
+ * Solutions of different components are independent, so the solutions of a DAG
+ * are the cartesian product of the solutions of its components.
+ * Solutions of a component are counted by dynamic programming over its leaves in BFS order:
+ * the number of ways to complete a partial solution only depends on the solutions of
+ * the assigned leaves that still relate to unassigned ones, i.e., the frontier.
+ */
+class LeafComponent<T, V extends Value<T>> {
+  // one leaf for each group of leaves that must take the same solution
+  leaves : number[];
+  members : number[][];
+  ranges : V[][];
+  // positions of the related leaves that come before each leaf
+  private earlier_neighbours : number[][];
+  // positions of the assigned leaves that still relate to the leaves from each position on
+  private frontier : number[][];
+  private consistent : (leaf1 : number, solution1 : V, leaf2 : number, solution2 : V) => boolean;
+  private memo : Map<string, bigint> = new Map<string, bigint>();
+  constructor(leaves : number[], members : number[][], ranges : V[][], neighbours : Map<number, Set<number>>,
+    consistent : (leaf1 : number, solution1 : V, leaf2 : number, solution2 : V) => boolean) {
+    this.leaves = leaves;
+    this.members = members;
+    this.ranges = ranges;
+    this.consistent = consistent;
+    const position = new Map<number, number>(leaves.map((leaf, i) => [leaf, i]));
+    this.earlier_neighbours = leaves.map((leaf, i) =>
+      [...neighbours.get(leaf)!].map(n => position.get(n)!).filter(p => p < i));
+    const last_neighbour = leaves.map((leaf, i) => Math.max(i, ...[...neighbours.get(leaf)!].map(n => position.get(n)!)));
+    this.frontier = leaves.map((_, i) => leaves.map((_, p) => p).filter(p => p < i && last_neighbour[p] >= i));
+  }
+
+  private fits(i : number, x : number, assignment : number[]) : boolean {
+    return this.earlier_neighbours[i].every(p =>
+      this.consistent(this.leaves[i], this.ranges[i][x], this.leaves[p], this.ranges[p][assignment[p]]));
+  }
+
+  /**
+   * The number of solutions that extend the solutions of the leaves before position i in `assignment`.
+   */
+  private count_from(i : number, assignment : number[]) : bigint {
+    if (i === this.leaves.length) return 1n;
+    const key = `${i}:${this.frontier[i].map(p => assignment[p]).join(",")}`;
+    const memoized = this.memo.get(key);
+    if (memoized !== undefined) return memoized;
+    let count = 0n;
+    for (let x = 0; x < this.ranges[i].length; x++) {
+      if (!this.fits(i, x, assignment)) continue;
+      assignment[i] = x;
+      count += this.count_from(i + 1, assignment);
+    }
+    assignment[i] = -1;
+    this.memo.set(key, count);
+    return count;
+  }
+
+  count() : bigint {
+    return this.count_from(0, new Array(this.leaves.length).fill(-1));
+  }
+
+  /**
+   * Draw a solution uniformly at random: each leaf picks a solution with a probability
+   * proportional to the number of ways to complete the partial solution.
+   * The component must have at least one solution.
+   * Return the positions of the picked solutions in `ranges`.
+   */
+  sample() : number[] {
+    const assignment = new Array(this.leaves.length).fill(-1);
+    for (let i = 0; i < this.leaves.length; i++) {
+      const candidates : [number, bigint][] = [];
+      let total = 0n;
+      for (let x = 0; x < this.ranges[i].length; x++) {
+        if (!this.fits(i, x, assignment)) continue;
+        assignment[i] = x;
+        const count = this.count_from(i + 1, assignment);
+        if (count === 0n) continue;
+        candidates.push([x, count]);
+        total += count;
+      }
+      assert(total > 0n, `LeafComponent: leaf ${this.leaves[i]} has no solution`);
+      let r = random_bigInt(0n, total);
+      for (const [x, count] of candidates) {
+        if (r < count) {
+          assignment[i] = x;
+          break;
+        }
+        r -= count;
+      }
+    }
+    return assignment;
+  }
+}
+
 /**
  * A directed acyclic graph that stores the constraints between nodes.
  */
@@ -71,6 +164,8 @@ export class ConstraintDAG<T, V extends Value<T>> {
   // If "leaf1 leaf2" is in leaves_equal, then the solution of leaf2 is the equivalent of the solution of leaf1.
   leaves_equal : Set<string> = new Set<string>();
   leaves_same_range : Set<string> = new Set<string>();
+  // Interned values of solution ranges, with their sub/super relations memoised as bitsets
+  protected lattice : ValueLattice<T> = new ValueLattice<T>();
   name : string;
 
   constructor() {
@@ -92,6 +187,7 @@ export class ConstraintDAG<T, V extends Value<T>> {
     this.leaves_same.clear();
     this.leaves_equal.clear();
     this.leaves_same_range.clear();
+    this.lattice = new ValueLattice<T>();
   }
 
   async check_property() : Promise<void> {
@@ -223,66 +319,55 @@ export class ConstraintDAG<T, V extends Value<T>> {
   }
 
   protected dominator_solution_range_should_be_shrinked(dominator_id : number, dominatee_id : number) : V[] | undefined {
-    let minimum_solution_range_of_dominator;
     const rank = this.sub.has(`${dominator_id} ${dominatee_id}`) ? "sub" :
       this.super.has(`${dominator_id} ${dominatee_id}`) ? "super" : undefined;
+    const dominator_range = this.solution_range.get(dominator_id)!;
+    const dominatee_range = this.solution_range.get(dominatee_id)!;
+    let intersection;
     if (rank === undefined) {
-      minimum_solution_range_of_dominator = [...
-        merge_set(new Set<V>(this.solution_range.get(dominatee_id)!
-          .flatMap(t => t.supers() as V[])), new Set<V>(this.solution_range.get(dominatee_id)!
-            .flatMap(t => t.subs() as V[])))
-      ];
+      intersection = this.lattice.same_range_in(dominator_range, dominatee_range);
     }
     else if (rank === "sub") {
-      minimum_solution_range_of_dominator = [...new Set<V>(this.solution_range.get(dominatee_id)!
-        .flatMap(t => t.supers() as V[]))];
+      intersection = this.lattice.supers_in(dominator_range, dominatee_range);
     }
     else if (rank === "super") {
-      minimum_solution_range_of_dominator = [...new Set<V>(this.solution_range.get(dominatee_id)!
-        .flatMap(t => t.subs() as V[]))];
+      intersection = this.lattice.subs_in(dominator_range, dominatee_range);
     }
     else {
       throw new Error(`dominator_solution_range_should_be_shrinked: rank ${rank} is not supported`);
     }
-    const intersection = this.solution_range.get(dominator_id)!.filter(t => minimum_solution_range_of_dominator.some(g => g.same(t)));
     assert(intersection.length > 0, `dominator_solution_range_should_be_shrinked: intersection is empty
-       dominator_id: ${dominator_id}, solution_range is ${this.solution_range.get(dominator_id)!.map(t => t.str())}
-       dominatee_id: ${dominatee_id}, solution_range is ${this.solution_range.get(dominatee_id)!.map(t => t.str())}
-       minimum_solution_range_of_dominator: ${minimum_solution_range_of_dominator.map(t => t.str())}`);
-    if (is_super_range(this.solution_range.get(dominator_id)!, intersection) && !is_equal_range(this.solution_range.get(dominator_id)!, intersection)) {
+       dominator_id: ${dominator_id}, solution_range is ${dominator_range.map(t => t.str())}
+       dominatee_id: ${dominatee_id}, solution_range is ${dominatee_range.map(t => t.str())}`);
+    //! The intersection is filtered from the range, so it is tighter iff it is shorter
+    if (intersection.length < dominator_range.length) {
       return intersection;
     }
     return undefined;
   }
 
   protected dominatee_solution_range_should_be_shrinked(dominator_id : number, dominatee_id : number) : V[] | undefined {
-    let minimum_solution_range_of_dominatee;
     const rank = this.sub.has(`${dominator_id} ${dominatee_id}`) ? "sub" :
       this.super.has(`${dominator_id} ${dominatee_id}`) ? "super" : undefined;
+    const dominator_range = this.solution_range.get(dominator_id)!;
+    const dominatee_range = this.solution_range.get(dominatee_id)!;
+    let intersection;
     if (rank === undefined) {
-      minimum_solution_range_of_dominatee = [...
-        merge_set(new Set<V>(this.solution_range.get(dominator_id)!
-          .flatMap(t => t.subs() as V[])), new Set<V>(this.solution_range.get(dominator_id)!
-            .flatMap(t => t.supers() as V[])))
-      ];
+      intersection = this.lattice.same_range_in(dominatee_range, dominator_range);
     }
     else if (rank === "sub") {
-      minimum_solution_range_of_dominatee = [...new Set<V>(this.solution_range.get(dominator_id)!
-        .flatMap(t => t.subs() as V[]))];
+      intersection = this.lattice.subs_in(dominatee_range, dominator_range);
     }
     else if (rank === "super") {
-      minimum_solution_range_of_dominatee = [...new Set<V>(this.solution_range.get(dominator_id)!
-        .flatMap(t => t.supers() as V[]))];
+      intersection = this.lattice.supers_in(dominatee_range, dominator_range);
     }
     else {
       throw new Error(`dominatee_solution_range_should_be_shrinked: rank ${rank} is not supported`);
     }
-    const intersection = this.solution_range.get(dominatee_id)!.filter(t => minimum_solution_range_of_dominatee.some(g => g.same(t)));
     assert(intersection.length > 0, `dominatee_solution_range_should_be_shrinked: intersection is empty
-       dominator_id: ${dominator_id}, solution_range is ${this.solution_range.get(dominator_id)!.map(t => t.str())}
-       dominatee_id: ${dominatee_id}, solution_range is ${this.solution_range.get(dominatee_id)!.map(t => t.str())}
-       minimum_solution_range_of_dominatee: ${minimum_solution_range_of_dominatee.map(t => t.str())}`);
-    if (is_super_range(this.solution_range.get(dominatee_id)!, intersection) && !is_equal_range(this.solution_range.get(dominatee_id)!, intersection)) {
+       dominator_id: ${dominator_id}, solution_range is ${dominator_range.map(t => t.str())}
+       dominatee_id: ${dominatee_id}, solution_range is ${dominatee_range.map(t => t.str())}`);
+    if (intersection.length < dominatee_range.length) {
       return intersection;
     }
     return undefined;
@@ -601,133 +686,118 @@ export class ConstraintDAG<T, V extends Value<T>> {
 
   protected try_shrink_dominator_solution_range(solution_range : Map<number, V[]>,
     dominator_id : number, dominatee_id : number) : V[] {
-    let minimum_solution_range_of_dominator;
     const rank = this.sub.has(`${dominator_id} ${dominatee_id}`) ? "sub" :
       this.super.has(`${dominator_id} ${dominatee_id}`) ? "super" : undefined;
-    if (rank === undefined) minimum_solution_range_of_dominator = solution_range.get(dominatee_id)!;
-    else if (rank === "sub") {
-      minimum_solution_range_of_dominator = [...new Set<V>(solution_range.get(dominatee_id)!.flatMap(t => t.supers() as V[]))];
-    }
-    else if (rank === "super") {
-      minimum_solution_range_of_dominator = [...new Set<V>(solution_range.get(dominatee_id)!.flatMap(t => t.subs() as V[]))];
-    }
+    if (rank === undefined) return this.lattice.same_in(solution_range.get(dominator_id)!, solution_range.get(dominatee_id)!);
+    else if (rank === "sub") return this.lattice.supers_in(solution_range.get(dominator_id)!, solution_range.get(dominatee_id)!);
+    else if (rank === "super") return this.lattice.subs_in(solution_range.get(dominator_id)!, solution_range.get(dominatee_id)!);
     else {
       throw new Error(`dominator_solution_range_should_be_shrinked: rank ${rank} is not supported`);
     }
-    const intersection = solution_range.get(dominator_id)!.filter(t => minimum_solution_range_of_dominator.some(g => g.same(t)));
-    return intersection;
   }
 
   protected try_shrink_dominatee_solution_range(solution_range : Map<number, V[]>,
     dominator_id : number, dominatee_id : number) : V[] {
-    let minimum_solution_range_of_dominatee;
     const rank = this.sub.has(`${dominator_id} ${dominatee_id}`) ? "sub" :
       this.super.has(`${dominator_id} ${dominatee_id}`) ? "super" : undefined;
-    if (rank === undefined) minimum_solution_range_of_dominatee = solution_range.get(dominator_id)!;
-    else if (rank === "sub") {
-      minimum_solution_range_of_dominatee = [...new Set<V>(solution_range.get(dominator_id)!.flatMap(t => t.subs() as V[]))];
-    }
-    else if (rank === "super") {
-      minimum_solution_range_of_dominatee = [...new Set<V>(solution_range.get(dominator_id)!.flatMap(t => t.supers() as V[]))];
-    }
+    if (rank === undefined) return this.lattice.same_in(solution_range.get(dominatee_id)!, solution_range.get(dominator_id)!);
+    else if (rank === "sub") return this.lattice.subs_in(solution_range.get(dominatee_id)!, solution_range.get(dominator_id)!);
+    else if (rank === "super") return this.lattice.supers_in(solution_range.get(dominatee_id)!, solution_range.get(dominator_id)!);
     else {
       throw new Error(`dominatee_solution_range_should_be_shrinked: rank ${rank} is not supported`);
     }
-    const intersection = solution_range.get(dominatee_id)!.filter(t => minimum_solution_range_of_dominatee!.some(g => g.same(t)));
-    return intersection;
   }
 
+  /**
+   * Align the ranges of the nodes structurally tied to `node` after its range in `solution_range` is tightened,
+   * e.g., the key and value of a mapping.
+   * Return the nodes whose ranges are reassigned, or "conflict" if one of them becomes empty.
+   */
+  protected align_solution_range(node : number, solution_range : Map<number, V[]>) : number[] | "conflict" {
+    return [];
+  }
+
+  /**
+   * Check whether `node` can take `new_range` without emptying the range of any node, leaving the DAG untouched.
+   * The tightened ranges are propagated as in `tighten_solution_range_middle_out`.
+   */
   try_tighten_solution_range_middle_out(node : number, new_range : V[]) : boolean {
     const solution_range = new Map(this.solution_range);
     solution_range.set(node, new_range);
-    let upwards = (node : number) : boolean => {
-      if (this.dag_nodes.get(node)!.ins.length === 0) {
-        if (this.dag_nodes.get(node)!.outs.length !== 0)
-          return downwards(node);
-      }
-      let res = true;
+    const worklist = [node];
+    const queued = new Set<number>(worklist);
+    const enqueue = (node : number) : void => {
+      if (queued.has(node)) return;
+      queued.add(node);
+      worklist.push(node);
+    }
+    for (let i = 0; i < worklist.length; i++) {
+      const node = worklist[i];
+      queued.delete(node);
+      if (solution_range.get(node)!.length === 0) return false;
       for (let parent of this.dag_nodes.get(node)!.ins) {
         const minimum_solution_range_of_dominator = this.try_shrink_dominator_solution_range(solution_range, parent, node);
-        if (is_equal_range(solution_range.get(parent)!, minimum_solution_range_of_dominator)) {
-          continue;
-        }
-        if (minimum_solution_range_of_dominator.length === 0) {
-          return false;
-        }
+        if (minimum_solution_range_of_dominator.length === solution_range.get(parent)!.length) continue;
+        if (minimum_solution_range_of_dominator.length === 0) return false;
         solution_range.set(parent, minimum_solution_range_of_dominator);
-        res &&= upwards(parent);
-        if (!res) return false;
-        res &&= downwards(parent);
-        if (!res) return false;
-      }
-      return res;
-    }
-    let downwards = (node : number) : boolean => {
-      if (this.dag_nodes.get(node)!.outs.length === 0) {
-        if (this.dag_nodes.get(node)!.ins.length !== 0)
-          return upwards(node);
+        const aligned = this.align_solution_range(parent, solution_range);
+        if (aligned === "conflict") return false;
+        aligned.forEach(enqueue);
+        enqueue(parent);
       }
-      let res = true;
       for (let child of this.dag_nodes.get(node)!.outs) {
         const minimum_solution_range_of_dominatee = this.try_shrink_dominatee_solution_range(solution_range, node, child);
-        if (is_equal_range(solution_range.get(child)!, minimum_solution_range_of_dominatee)) {
-          continue;
-        }
-        if (minimum_solution_range_of_dominatee.length === 0) {
-          return false;
-        }
+        if (minimum_solution_range_of_dominatee.length === solution_range.get(child)!.length) continue;
+        if (minimum_solution_range_of_dominatee.length === 0) return false;
         solution_range.set(child, minimum_solution_range_of_dominatee);
-        res &&= upwards(child);
-        if (!res) return false;
-        res &&= downwards(child);
-        if (!res) return false;
+        const aligned = this.align_solution_range(child, solution_range);
+        if (aligned === "conflict") return false;
+        aligned.forEach(enqueue);
+        enqueue(child);
       }
-      return res;
     }
-    return downwards(node) && upwards(node);
+    return true;
   }
 
+  /**
+   * Propagate the tightened range of `node` through the DAG.
+   * Propagation runs as an AC-3 style worklist: a node is revisited only when its range shrinks,
+   * and then the ranges of its dominators and dominatees are filtered against it.
+   */
   protected tighten_solution_range_middle_out(node : number) {
-    let upwards = (node : number) : void => {
-      if (this.dag_nodes.get(node)!.ins.length === 0) {
-        if (this.dag_nodes.get(node)!.outs.length !== 0)
-          downwards(node);
-        return;
-      }
+    const worklist = [node];
+    const queued = new Set<number>(worklist);
+    const enqueue = (node : number) : void => {
+      if (queued.has(node)) return;
+      queued.add(node);
+      worklist.push(node);
+    }
+    for (let i = 0; i < worklist.length; i++) {
+      const node = worklist[i];
+      queued.delete(node);
       for (let parent of this.dag_nodes.get(node)!.ins) {
         let minimum_solution_range_of_dominator;
         if (minimum_solution_range_of_dominator =
           this.dominator_solution_range_should_be_shrinked(parent, node)) {
-          if (is_super_range(this.solution_range.get(parent)!, minimum_solution_range_of_dominator) &&
-            !is_equal_range(this.solution_range.get(parent)!, minimum_solution_range_of_dominator)) {
-            this.solution_range.set(parent, minimum_solution_range_of_dominator);
-            upwards(parent);
-            downwards(parent);
-          }
+          this.solution_range.set(parent, minimum_solution_range_of_dominator);
+          const aligned = this.align_solution_range(parent, this.solution_range);
+          assert(aligned !== "conflict", "tighten_solution_range_middle_out: conflict");
+          aligned.forEach(enqueue);
+          enqueue(parent);
         }
       }
-    }
-    let downwards = (node : number) : void => {
-      if (this.dag_nodes.get(node)!.outs.length === 0) {
-        if (this.dag_nodes.get(node)!.ins.length !== 0)
-          upwards(node);
-        return;
-      }
       for (let child of this.dag_nodes.get(node)!.outs) {
         let minimum_solution_range_of_dominatee;
         if (minimum_solution_range_of_dominatee =
           this.dominatee_solution_range_should_be_shrinked(node, child)) {
-          if (is_super_range(this.solution_range.get(child)!, minimum_solution_range_of_dominatee) &&
-            !is_equal_range(this.solution_range.get(child)!, minimum_solution_range_of_dominatee)) {
-            this.solution_range.set(child, minimum_solution_range_of_dominatee);
-            downwards(child);
-            upwards(child);
-          }
+          this.solution_range.set(child, minimum_solution_range_of_dominatee);
+          const aligned = this.align_solution_range(child, this.solution_range);
+          assert(aligned !== "conflict", "tighten_solution_range_middle_out: conflict");
+          aligned.forEach(enqueue);
+          enqueue(child);
         }
       }
     }
-    upwards(node);
-    downwards(node);
   }
 
   protected allocate_solutions_for_leaves_in_stream() : Generator<Map<number, V>> {
@@ -933,6 +1003,138 @@ export class ConstraintDAG<T, V extends Value<T>> {
     return dfs(0, new Map<number, V>());
   }
 
+  /**
+   * Whether leaf1 and leaf2 can take solution1 and solution2 at the same time.
+   * It checks the same relations as `check_leaf_solution` in `allocate_solutions_for_leaves_in_stream`.
+   */
+  protected leaf_solutions_are_consistent(leaf1 : number, solution1 : V, leaf2 : number, solution2 : V) : boolean {
+    const one2two = `${leaf1} ${leaf2}`;
+    const two2one = `${leaf2} ${leaf1}`;
+    if (this.leaves_sub.has(one2two) && !solution1.is_super_of(solution2)) return false;
+    if (this.leaves_sub.has(two2one) && !solution2.is_super_of(solution1)) return false;
+    if (this.leaves_same.has(one2two) && !solution1.same(solution2)) return false;
+    if (this.leaves_same.has(two2one) && !solution2.same(solution1)) return false;
+    if (this.leaves_equal.has(one2two) && !solution1.is_equivalent_of(solution2)) return false;
+    if (this.leaves_equal.has(two2one) && !solution2.is_equivalent_of(solution1)) return false;
+    if ((this.leaves_same_range.has(one2two) || this.leaves_same_range.has(two2one))
+      && !solution1.is_sub_of(solution2) && !solution1.is_super_of(solution2)) return false;
+    return true;
+  }
+
+  /**
+   * Split the leaves into connected components of the relations among leaves.
+   * Leaves related by `leaves_same` must take the same solution, so each group of them is
+   * one leaf of the component, whose range only keeps the solutions all leaves of the group can take.
+   */
+  protected leaf_components() : LeafComponent<T, V>[] {
+    const representative = new Map<number, number>();
+    const find = (leaf : number) : number => {
+      while (representative.get(leaf) !== leaf) leaf = representative.get(leaf)!;
+      return leaf;
+    }
+    for (const leaf of this.leaves) representative.set(leaf, leaf);
+    for (const edge of this.leaves_same) {
+      const [leaf1, leaf2] = edge.split(" ").map(t => parseInt(t));
+      if (!this.leaves.has(leaf1) || !this.leaves.has(leaf2)) continue;
+      representative.set(find(leaf1), find(leaf2));
+    }
+    const members = new Map<number, number[]>();
+    for (const leaf of this.leaves) {
+      const group = find(leaf);
+      if (!members.has(group)) members.set(group, []);
+      members.get(group)!.push(leaf);
+    }
+    //! The related leaves between two groups
+    const related_leaves = new Map<string, [number, number][]>();
+    const neighbours = new Map<number, Set<number>>();
+    for (const group of members.keys()) neighbours.set(group, new Set<number>());
+    for (const relation of [this.leaves_sub, this.leaves_equal, this.leaves_same_range]) {
+      for (const edge of relation) {
+        const [leaf1, leaf2] = edge.split(" ").map(t => parseInt(t));
+        //! Relations may still mention leaves removed by remove_irrelevant_leaves
+        if (!this.leaves.has(leaf1) || !this.leaves.has(leaf2)) continue;
+        const group1 = find(leaf1), group2 = find(leaf2);
+        if (group1 === group2) continue;
+        neighbours.get(group1)!.add(group2);
+        neighbours.get(group2)!.add(group1);
+        if (!related_leaves.has(`${group1} ${group2}`)) {
+          related_leaves.set(`${group1} ${group2}`, []);
+          related_leaves.set(`${group2} ${group1}`, []);
+        }
+        related_leaves.get(`${group1} ${group2}`)!.push([leaf1, leaf2]);
+        related_leaves.get(`${group2} ${group1}`)!.push([leaf2, leaf1]);
+      }
+    }
+    const consistent = (group1 : number, solution1 : V, group2 : number, solution2 : V) : boolean =>
+      related_leaves.get(`${group1} ${group2}`)!.every(([leaf1, leaf2]) =>
+        this.leaf_solutions_are_consistent(leaf1, solution1, leaf2, solution2));
+    const components : LeafComponent<T, V>[] = [];
+    const visited = new Set<number>();
+    for (const group of members.keys()) {
+      if (visited.has(group)) continue;
+      //! BFS order keeps related leaves close, so the frontier of the counting stays small
+      const component = [group];
+      visited.add(group);
+      for (let i = 0; i < component.length; i++) {
+        for (const next of neighbours.get(component[i])!) {
+          if (visited.has(next)) continue;
+          visited.add(next);
+          component.push(next);
+        }
+      }
+      const ranges = component.map(group => this.solution_range.get(group)!.filter(
+        t => members.get(group)!.every(leaf => this.solution_range.get(leaf)!.some(g => g.same(t)))));
+      components.push(new LeafComponent<T, V>(component, component.map(group => members.get(group)!),
+        ranges, neighbours, consistent));
+    }
+    return components;
+  }
+
+  /**
+   * The exact number of solutions of leaves, counted without enumerating them.
+   * It is only valid after `prepare_resolve`.
+   */
+  count_solutions() : bigint {
+    let count = 1n;
+    for (const component of this.leaf_components()) count *= component.count();
+    return count;
+  }
+
+  /**
+   * Draw at most `maximum_solution_count` distinct solutions of leaves uniformly at random from all the solutions.
+   * If there are no more solutions than `maximum_solution_count`, all of them are enumerated instead.
+   */
+  protected *sample_solutions_for_leaves(maximum_solution_count : number) : Generator<Map<number, V>> {
+    const components = this.leaf_components();
+    let total = 1n;
+    for (const component of components) total *= component.count();
+    Log.log(`${this.name}: ${total} solutions of leaves in ${components.length} component(s)`);
+    if (total === 0n) return;
+    if (total <= BigInt(maximum_solution_count)) {
+      yield* this.allocate_solutions_for_leaves_in_stream();
+      return;
+    }
+    //! Solutions are drawn with replacement, so give up on distinct ones after enough attempts
+    const sampled = new Set<string>();
+    for (let attempt = 0; sampled.size < maximum_solution_count && attempt < maximum_solution_count * 10; attempt++) {
+      const assignments = components.map(component => component.sample());
+      const key = assignments.map(assignment => assignment.join(",")).join(";");
+      if (sampled.has(key)) continue;
+      sampled.add(key);
+      const leaf_solution = new Map<number, V>();
+      components.forEach((component, k) => {
+        component.leaves.forEach((_, i) => {
+          const solution = component.ranges[i][assignments[k][i]];
+          //! Every leaf takes the solution from its own range
+          for (const leaf of component.members[i]) {
+            leaf_solution.set(leaf, this.solution_range.get(leaf)!.find(t => t.same(solution))!);
+          }
+        });
+      });
+      yield leaf_solution;
+    }
+  }
+
   protected build_leaves_relation() : void {
     for (let [_, leaf_infos] of this.node2leaf) {
       const leaf_infos_array = [...leaf_infos];
@@ -1118,14 +1320,18 @@ export class ConstraintDAG<T, V extends Value<T>> {
 
   protected get_maximum_solution_count() : number { return -1; }
 
-  async resolve() : Promise<void> {
+  /**
+   * Prepare the resolution: check the DAG, find roots and leaves, and build the relations among leaves.
+   * Solutions are then enumerated by `stream_solutions`.
+   */
+  async prepare_resolve() : Promise<void> {
     // !initialize the resolution
     this.initialize_resolve();
     await this.check_property();
     // !Get roots and leaves
     this.get_roots_and_leaves(false);
+    let mul = 1n, all_mul = 1n;
     if (config.enable_search_space_cmp) {
-      let mul = 1n, all_mul = 1n;
       for (let id of this.solution_range.keys()) {
         if (!this.leaves.has(id)) continue;
         if (this.solution_range.get(id)!.length === 0) continue;
@@ -1135,10 +1341,6 @@ export class ConstraintDAG<T, V extends Value<T>> {
         if (this.solution_range.get(id)!.length === 0) continue;
         all_mul *= BigInt(this.solution_range.get(id)!.length)
       }
-      if (!fs.existsSync("search_space.csv")) {
-        fs.writeFileSync(`search_space.csv`, '', 'utf8');
-      }
-      fs.writeFileSync(`search_space.csv`, mul.toString() + "," + all_mul.toString() + "\n", { flag: 'a' });
     }
     // !Map nodes to their leaves, recording if there exists a path from the node to leaf with leaf_id on which sub/super domination does not holds.
     // If there are multiple paths from node to leaf, then the sub does not hold as long as there exists a path on which sub domination does not hold.
@@ -1151,6 +1353,13 @@ export class ConstraintDAG<T, V extends Value<T>> {
     }
     this.build_leaves_relation();
     this.remove_irrelevant_leaves();
+    if (config.enable_search_space_cmp) {
+      //! Besides the naive products of solution ranges, record the exact number of solutions
+      if (!fs.existsSync("search_space.csv")) {
+        fs.writeFileSync(`search_space.csv`, '', 'utf8');
+      }
+      fs.writeFileSync(`search_space.csv`, mul.toString() + "," + all_mul.toString() + "," + this.count_solutions().toString() + "\n", { flag: 'a' });
+    }
     Log.log(`> leaves_sub: ${this.leaves_sub.size}`);
     for (const edge of this.leaves_sub) {
       Log.log(edge);
@@ -1170,88 +1379,108 @@ export class ConstraintDAG<T, V extends Value<T>> {
     if (config.debug || config.unit_test_mode) {
       await this.draw_for_debug();
     }
-    // !Assign solutions to roots
-    let should_stop = false;
+  }
+
+  /**
+   * Lazily enumerate at most `maximum_solution_count` solutions after `prepare_resolve`.
+   * With `config.solution_sampling` set to "uniform", the solutions are drawn uniformly from all the solutions
+   * instead of being the first ones in the enumeration order.
+   * Only the solution being consumed is alive, so the memory does not grow with `maximum_solution_count`.
+   */
+  *stream_solutions() : Generator<Map<number, V>> {
     let maximum_solution_count = this.get_maximum_solution_count();
     assert(maximum_solution_count !== -1, "maximum_solution_count should be set.");
     let solution_id = 0;
-    for (const leaf_solution of this.allocate_solutions_for_leaves_in_stream()) {
+    let solution_count = 0;
+    const leaf_solutions = config.solution_sampling === "uniform" ?
+      this.sample_solutions_for_leaves(maximum_solution_count) :
+      this.allocate_solutions_for_leaves_in_stream();
+    for (const leaf_solution of leaf_solutions) {
       this.solutions.clear();
-      if (should_stop) break;
-      if (this.solutions_collection.length >= maximum_solution_count) {
-        should_stop = true;
-        break;
-      }
+      if (solution_count >= maximum_solution_count) break;
       Log.log(`leaf_solution${solution_id++}: ${Array.from(leaf_solution).map(t => [t[0], t[1].str()])}`);
       if (leaf_solution.size === 0) continue;
-      this.solutions_collection.push(new Map(leaf_solution));
+      solution_count++;
+      yield new Map(leaf_solution);
+    }
+  }
+
+  async resolve() : Promise<void> {
+    await this.prepare_resolve();
+    // !Assign solutions to roots
+    for (const solutions of this.stream_solutions()) {
+      this.solutions_collection.push(solutions);
     }
   }
 
   verify() : void {
     for (const solutions of this.solutions_collection) {
-      // 1. Verify that all nodes have been resolved.
-      let not_resolved = new Set<number>();
-      for (let [id, _] of this.dag_nodes) {
-        if (this.leaves.has(id) && !solutions.has(id)) {
-          not_resolved.add(id);
+      this.verify_solution(solutions);
+    }
+  }
+
+  verify_solution(solutions : Map<number, V>) : void {
+    // 1. Verify that all nodes have been resolved.
+    let not_resolved = new Set<number>();
+    for (let [id, _] of this.dag_nodes) {
+      if (this.leaves.has(id) && !solutions.has(id)) {
+        not_resolved.add(id);
+      }
+    }
+    assert(not_resolved.size === 0,
+      `ConstraintDAG::Verify: nodes ${[...not_resolved]} have not been resolved.
+      Here are solutions to all nodes:\n${[...solutions].sort((a, b) => a[0] - b[0]).map(([id, t]) => `${id}: ${t.str()}`).join("\n")}`);
+    // 2. Verify that all resolved types are one of the solution candidates of the node.
+    for (let [id, solution_candidates] of this.solution_range) {
+      if (!this.leaves.has(id)) continue;
+      let resolved_type = solutions.get(id)!;
+      let match = false;
+      for (let solution_candidate of solution_candidates) {
+        if (resolved_type.same(solution_candidate)) {
+          match = true;
+          break;
         }
       }
-      assert(not_resolved.size === 0,
-        `ConstraintDAG::Verify: nodes ${[...not_resolved]} have not been resolved.
+      assert(match,
+        `ConstraintDAG::Verify: solution ${resolved_type.str()} to node ${id} is not one of the solution candidates: ${solution_candidates.map(t => t.str()).join(", ")}
+        Here are solutions to all nodes:\n${[...solutions].sort((a, b) => a[0] - b[0]).map(([id, t]) => `${id}: ${t.str()}`).join("\n")}`);
+    }
+    // 3. Verify that all leaf relation constraints hold.
+    for (const edge of this.leaves_sub) {
+      const [leaf1, leaf2] = edge.split(" ");
+      if (!solutions.has(parseInt(leaf1)) || !solutions.has(parseInt(leaf2))) continue;
+      const node1 = solutions.get(parseInt(leaf1))!;
+      const node2 = solutions.get(parseInt(leaf2))!;
+      assert(node1.is_super_of(node2),
+        `ConstraintDAG::Verify: sub constraint is not satisfied: ${leaf1} of ${node1.str()} --> ${leaf2} of ${node2.str()}.
+        Here are solutions to all nodes:\n${[...solutions].sort((a, b) => a[0] - b[0]).map(([id, t]) => `${id}: ${t.str()}`).join("\n")}`);
+    }
+    for (const edge of this.leaves_same) {
+      const [leaf1, leaf2] = edge.split(" ");
+      if (!solutions.has(parseInt(leaf1)) || !solutions.has(parseInt(leaf2))) continue;
+      const node1 = solutions.get(parseInt(leaf1))!;
+      const node2 = solutions.get(parseInt(leaf2))!;
+      assert(node1.same(node2),
+        `ConstraintDAG::Verify: same constraint is not satisfied: ${leaf1} of ${node1.str()} --> ${leaf2} of ${node2.str()}.
+        Here are solutions to all nodes:\n${[...solutions].sort((a, b) => a[0] - b[0]).map(([id, t]) => `${id}: ${t.str()}`).join("\n")}`);
+    }
+    for (const edge of this.leaves_equal) {
+      const [leaf1, leaf2] = edge.split(" ");
+      if (!solutions.has(parseInt(leaf1)) || !solutions.has(parseInt(leaf2))) continue;
+      const node1 = solutions.get(parseInt(leaf1))!;
+      const node2 = solutions.get(parseInt(leaf2))!;
+      assert(node1.is_equivalent_of(node2),
+        `ConstraintDAG::Verify: equal constraint is not satisfied: ${leaf1} of ${node1.str()} --> ${leaf2} of ${node2.str()}.
+        Here are solutions to all nodes:\n${[...solutions].sort((a, b) => a[0] - b[0]).map(([id, t]) => `${id}: ${t.str()}`).join("\n")}`);
+    }
+    for (const edge of this.leaves_same_range) {
+      const [leaf1, leaf2] = edge.split(" ");
+      if (!solutions.has(parseInt(leaf1)) || !solutions.has(parseInt(leaf2))) continue;
+      const node1 = solutions.get(parseInt(leaf1))!;
+      const node2 = solutions.get(parseInt(leaf2))!;
+      assert(node1.is_sub_of(node2) || node1.is_super_of(node2),
+        `ConstraintDAG::Verify: same_range constraint is not satisfied: ${leaf1} of ${node1.str()} --> ${leaf2} of ${node2.str()}.
         Here are solutions to all nodes:\n${[...solutions].sort((a, b) => a[0] - b[0]).map(([id, t]) => `${id}: ${t.str()}`).join("\n")}`);
-      // 2. Verify that all resolved types are one of the solution candidates of the node.
-      for (let [id, solution_candidates] of this.solution_range) {
-        if (!this.leaves.has(id)) continue;
-        let resolved_type = solutions.get(id)!;
-        let match = false;
-        for (let solution_candidate of solution_candidates) {
-          if (resolved_type.same(solution_candidate)) {
-            match = true;
-            break;
-          }
-        }
-        assert(match,
-          `ConstraintDAG::Verify: solution ${resolved_type.str()} to node ${id} is not one of the solution candidates: ${solution_candidates.map(t => t.str()).join(", ")}
-          Here are solutions to all nodes:\n${[...solutions].sort((a, b) => a[0] - b[0]).map(([id, t]) => `${id}: ${t.str()}`).join("\n")}`);
-      }
-      // 3. Verify that all leaf relation constraints hold.
-      for (const edge of this.leaves_sub) {
-        const [leaf1, leaf2] = edge.split(" ");
-        if (!solutions.has(parseInt(leaf1)) || !solutions.has(parseInt(leaf2))) continue;
-        const node1 = solutions.get(parseInt(leaf1))!;
-        const node2 = solutions.get(parseInt(leaf2))!;
-        assert(node1.is_super_of(node2),
-          `ConstraintDAG::Verify: sub constraint is not satisfied: ${leaf1} of ${node1.str()} --> ${leaf2} of ${node2.str()}.
-          Here are solutions to all nodes:\n${[...solutions].sort((a, b) => a[0] - b[0]).map(([id, t]) => `${id}: ${t.str()}`).join("\n")}`);
-      }
-      for (const edge of this.leaves_same) {
-        const [leaf1, leaf2] = edge.split(" ");
-        if (!solutions.has(parseInt(leaf1)) || !solutions.has(parseInt(leaf2))) continue;
-        const node1 = solutions.get(parseInt(leaf1))!;
-        const node2 = solutions.get(parseInt(leaf2))!;
-        assert(node1.same(node2),
-          `ConstraintDAG::Verify: same constraint is not satisfied: ${leaf1} of ${node1.str()} --> ${leaf2} of ${node2.str()}.
-          Here are solutions to all nodes:\n${[...solutions].sort((a, b) => a[0] - b[0]).map(([id, t]) => `${id}: ${t.str()}`).join("\n")}`);
-      }
-      for (const edge of this.leaves_equal) {
-        const [leaf1, leaf2] = edge.split(" ");
-        if (!solutions.has(parseInt(leaf1)) || !solutions.has(parseInt(leaf2))) continue;
-        const node1 = solutions.get(parseInt(leaf1))!;
-        const node2 = solutions.get(parseInt(leaf2))!;
-        assert(node1.is_equivalent_of(node2),
-          `ConstraintDAG::Verify: equal constraint is not satisfied: ${leaf1} of ${node1.str()} --> ${leaf2} of ${node2.str()}.
-          Here are solutions to all nodes:\n${[...solutions].sort((a, b) => a[0] - b[0]).map(([id, t]) => `${id}: ${t.str()}`).join("\n")}`);
-      }
-      for (const edge of this.leaves_same_range) {
-        const [leaf1, leaf2] = edge.split(" ");
-        if (!solutions.has(parseInt(leaf1)) || !solutions.has(parseInt(leaf2))) continue;
-        const node1 = solutions.get(parseInt(leaf1))!;
-        const node2 = solutions.get(parseInt(leaf2))!;
-        assert(node1.is_sub_of(node2) || node1.is_super_of(node2),
-          `ConstraintDAG::Verify: same_range constraint is not satisfied: ${leaf1} of ${node1.str()} --> ${leaf2} of ${node2.str()}.
-          Here are solutions to all nodes:\n${[...solutions].sort((a, b) => a[0] - b[0]).map(([id, t]) => `${id}: ${t.str()}`).join("\n")}`);
-      }
     }
   }
 
@@ -1446,219 +1675,21 @@ export class TypeConstraintDAG extends ConstraintDAG<TypeKind, Type> {
     return undefined;
   }
 
-  protected tighten_solution_range_middle_out(node : number) {
-    let updown = (node : number) : void => {
-      upwards(node);
-      downwards(node);
-    }
-    let upwards = (node : number) : void => {
-      if (this.dag_nodes.get(node)!.ins.length === 0) {
-        if (this.dag_nodes.get(node)!.outs.length !== 0)
-          downwards(node);
-        return;
-      }
-      for (let parent of this.dag_nodes.get(node)!.ins) {
-        let minimum_solution_range_of_dominator;
-        if (minimum_solution_range_of_dominator =
-          this.dominator_solution_range_should_be_shrinked(parent, node)) {
-          if (is_super_range(this.solution_range.get(parent)!, minimum_solution_range_of_dominator) &&
-            !is_equal_range(this.solution_range.get(parent)!, minimum_solution_range_of_dominator)) {
-            this.solution_range.set(parent, minimum_solution_range_of_dominator);
-            updown(parent);
-            let result1 = this.assign_new_type_range_if_node_is_of_mapping_type(parent, this.solution_range);
-            assert(result1 !== "conflict", "tighten_solution_range_middle_out: conflict");
-            if (result1 !== undefined) {
-              updown(result1[0]);
-              updown(result1[1]);
-            }
-            let result2 = this.assign_new_type_range_if_node_is_mapping_value(parent, this.solution_range);
-            assert(result2 !== "conflict", "tighten_solution_range_middle_out: conflict");
-            if (result2 !== undefined) {
-              updown(result2);
-            }
-            let result3 = this.assign_new_type_range_if_node_is_mapping_key(parent, this.solution_range);
-            assert(result3 !== "conflict", "tighten_solution_range_middle_out: conflict");
-            if (result3 !== undefined) {
-              updown(result3);
-            }
-            let result4 = this.assign_new_type_range_if_node_is_array_type(parent, this.solution_range);
-            assert(result4 !== "conflict", "tighten_solution_range_middle_out: conflict");
-            if (result4 !== undefined) {
-              updown(result4);
-            }
-            let result5 = this.assign_new_type_range_if_node_is_array_base(parent, this.solution_range);
-            assert(result5 !== "conflict", "tighten_solution_range_middle_out: conflict");
-            if (result5 !== undefined) {
-              updown(result5);
-            }
-          }
-        }
-      }
-    }
-    let downwards = (node : number) : void => {
-      if (this.dag_nodes.get(node)!.outs.length === 0) {
-        if (this.dag_nodes.get(node)!.ins.length !== 0)
-          upwards(node);
-        return;
-      }
-      for (let child of this.dag_nodes.get(node)!.outs) {
-        let minimum_solution_range_of_dominatee;
-        if (minimum_solution_range_of_dominatee =
-          this.dominatee_solution_range_should_be_shrinked(node, child)) {
-          if (is_super_range(this.solution_range.get(child)!, minimum_solution_range_of_dominatee) &&
-            !is_equal_range(this.solution_range.get(child)!, minimum_solution_range_of_dominatee)) {
-            this.solution_range.set(child, minimum_solution_range_of_dominatee);
-            updown(child);
-            let result1 = this.assign_new_type_range_if_node_is_of_mapping_type(child, this.solution_range);
-            assert(result1 !== "conflict", "tighten_solution_range_middle_out: conflict");
-            if (result1 !== undefined) {
-              updown(result1[0]);
-              updown(result1[1]);
-            }
-            let result2 = this.assign_new_type_range_if_node_is_mapping_value(child, this.solution_range);
-            assert(result2 !== "conflict", "tighten_solution_range_middle_out: conflict");
-            if (result2 !== undefined) {
-              updown(result2);
-            }
-            let result3 = this.assign_new_type_range_if_node_is_mapping_key(child, this.solution_range);
-            assert(result3 !== "conflict", "tighten_solution_range_middle_out: conflict");
-            if (result3 !== undefined) {
-              updown(result3);
-            }
-            let result4 = this.assign_new_type_range_if_node_is_array_type(child, this.solution_range);
-            assert(result4 !== "conflict", "tighten_solution_range_middle_out: conflict");
-            if (result4 !== undefined) {
-              updown(result4);
-            }
-            let result5 = this.assign_new_type_range_if_node_is_array_base(child, this.solution_range);
-            assert(result5 !== "conflict", "tighten_solution_range_middle_out: conflict");
-            if (result5 !== undefined) {
-              updown(result5);
-            }
-          }
-        }
-      }
-    }
-    return updown(node);
-  }
-
-  try_tighten_solution_range_middle_out(node : number, new_range : Type[]) : boolean {
-    const solution_range = new Map(this.solution_range);
-    solution_range.set(node, new_range);
-    let updown = (node : number) : boolean => {
-      return downwards(node) && upwards(node);
-    }
-    let upwards = (node : number) : boolean => {
-      if (solution_range.get(node)!.length === 0) return false;
-      if (this.dag_nodes.get(node)!.ins.length === 0) {
-        if (this.dag_nodes.get(node)!.outs.length !== 0)
-          return downwards(node);
-      }
-      let res = true;
-      for (let parent of this.dag_nodes.get(node)!.ins) {
-        const minimum_solution_range_of_dominator = this.try_shrink_dominator_solution_range(solution_range, parent, node);
-        if (is_equal_range(solution_range.get(parent)!, minimum_solution_range_of_dominator)) {
-          continue;
-        }
-        if (minimum_solution_range_of_dominator.length === 0) {
-          return false;
-        }
-        solution_range.set(parent, minimum_solution_range_of_dominator);
-        let result1 = this.assign_new_type_range_if_node_is_of_mapping_type(parent, solution_range);
-        if (result1 === "conflict") return false;
-        if (result1 !== undefined) {
-          res &&= updown(result1[0]);
-          if (!res) return false;
-          res &&= updown(result1[1]);
-          if (!res) return false;
-        }
-        let result2 = this.assign_new_type_range_if_node_is_mapping_value(parent, solution_range);
-        if (result2 === "conflict") return false;
-        if (result2 !== undefined) {
-          res &&= updown(result2);
-          if (!res) return false;
-        }
-        let result3 = this.assign_new_type_range_if_node_is_mapping_key(parent, solution_range);
-        if (result3 === "conflict") return false;
-        if (result3 !== undefined) {
-          res &&= updown(result3);
-          if (!res) return false;
-        }
-        let result4 = this.assign_new_type_range_if_node_is_array_type(parent, solution_range);
-        if (result4 === "conflict") return false;
-        if (result4 !== undefined) {
-          res &&= updown(result4);
-          if (!res) return false;
-        }
-        let result5 = this.assign_new_type_range_if_node_is_array_base(parent, solution_range);
-        if (result5 === "conflict") return false;
-        if (result5 !== undefined) {
-          res &&= updown(result5);
-          if (!res) return false;
-        }
-        res &&= upwards(parent);
-        if (!res) return false;
-        res &&= downwards(parent);
-        if (!res) return false;
-      }
-      return res;
-    }
-    let downwards = (node : number) : boolean => {
-      if (solution_range.get(node)!.length === 0) return false;
-      if (this.dag_nodes.get(node)!.outs.length === 0) {
-        if (this.dag_nodes.get(node)!.ins.length !== 0)
-          return upwards(node);
-      }
-      let res = true;
-      for (let child of this.dag_nodes.get(node)!.outs) {
-        const minimum_solution_range_of_dominatee = this.try_shrink_dominatee_solution_range(solution_range, node, child);
-        if (is_equal_range(solution_range.get(child)!, minimum_solution_range_of_dominatee)) {
-          continue;
-        }
-        if (minimum_solution_range_of_dominatee.length === 0) {
-          return false;
-        }
-        solution_range.set(child, minimum_solution_range_of_dominatee);
-        let result1 = this.assign_new_type_range_if_node_is_of_mapping_type(child, solution_range);
-        if (result1 === "conflict") return false;
-        if (result1 !== undefined) {
-          res &&= updown(result1[0]);
-          if (!res) return false;
-          res &&= updown(result1[1]);
-          if (!res) return false;
-        }
-        let result2 = this.assign_new_type_range_if_node_is_mapping_value(child, solution_range);
-        if (result2 === "conflict") return false;
-        if (result2 !== undefined) {
-          res &&= updown(result2);
-          if (!res) return false;
-        }
-        let result3 = this.assign_new_type_range_if_node_is_mapping_key(child, solution_range);
-        if (result3 === "conflict") return false;
-        if (result3 !== undefined) {
-          res &&= updown(result3);
-          if (!res) return false;
-        }
-        let result4 = this.assign_new_type_range_if_node_is_array_type(child, solution_range);
-        if (result4 === "conflict") return false;
-        if (result4 !== undefined) {
-          res &&= updown(result4);
-          if (!res) return false;
-        }
-        let result5 = this.assign_new_type_range_if_node_is_array_base(child, solution_range);
-        if (result5 === "conflict") return false;
-        if (result5 !== undefined) {
-          res &&= updown(result5);
-          if (!res) return false;
-        }
-        res &&= upwards(child);
-        if (!res) return false;
-        res &&= downwards(child);
-        if (!res) return false;
-      }
-      return res;
-    }
-    return updown(node);
+  protected align_solution_range(node : number, solution_range : Map<number, Type[]>) : number[] | "conflict" {
+    const aligned : number[] = [];
+    const result1 = this.assign_new_type_range_if_node_is_of_mapping_type(node, solution_range);
+    if (result1 === "conflict") return "conflict";
+    if (result1 !== undefined) aligned.push(...result1);
+    for (const result of [
+      this.assign_new_type_range_if_node_is_mapping_value(node, solution_range),
+      this.assign_new_type_range_if_node_is_mapping_key(node, solution_range),
+      this.assign_new_type_range_if_node_is_array_type(node, solution_range),
+      this.assign_new_type_range_if_node_is_array_base(node, solution_range)
+    ]) {
+      if (result === "conflict") return "conflict";
+      if (result !== undefined) aligned.push(result);
+    }
+    return aligned;
   }
 
   private connect_mapping_type_var_or_expr(dominator_id : number, dominatee_id : number) : void {
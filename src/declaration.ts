@@ -14,6 +14,7 @@ import {
 import { assert } from "./utility";
 import { TypeKind, Type, ElementaryType, UnionType, FunctionType, ContractType, StructType, MappingType, ArrayType } from "./type";
 import { IRNode, factory } from "./node";
+import { slot_printing, slot_placeholder } from "./slot";
 import { IRStatement, IRPlaceholderStatement } from "./statement";
 import { IRExpression, IRModifierInvoker } from "./expression";
 
@@ -89,7 +90,9 @@ export class IRVariableDeclaration extends IRDeclaration {
   lower() : ASTNode {
     let typename : TypeName;
     if (this.type !== undefined) {
-      typename = this.lower_type(this.type);
+      typename = slot_printing.enabled ?
+        factory.makeElementaryTypeName("", slot_placeholder(this.id)) :
+        this.lower_type(this.type);
       if (this.type.kind === TypeKind.ContractType
         || this.type.kind === TypeKind.ElementaryType
       ) {
@@ -9,6 +9,7 @@ import { TypeKind, Type, ElementaryType, ContractType, StructType, MappingType,
 import { IRNode, factory } from "./node";
 import { IRModifier, IRVariableDeclaration } from "./declaration";
 import { config } from "./config";
+import { slot_printing, slot_placeholder } from "./slot";
 
 export abstract class IRExpression extends IRNode {
   constructor(id : number, scope : number) {
@@ -143,6 +144,10 @@ export class IRLiteral extends IRExpression {
     assert(this.type !== undefined, `IRLiteral ${this.id}: type is not generated`);
     assert(this.type.kind === TypeKind.ElementaryType || this.type.kind === TypeKind.StringType,
       `IRLiteral ${this.id}: type is not ElementaryType or StringType, but ${this.type.kind}`);
+    //! The literal is rendered per type solution, so its value and kind are left untouched here
+    if (slot_printing.enabled) {
+      return factory.makeIdentifier("", slot_placeholder(this.id), -1);
+    }
     this.generateKind();
     if (this.value === undefined) this.generateVal();
     const value = this.value!;
@@ -413,7 +418,8 @@ export class IRNewDynamicArray extends IRExpression {
     }
   }
   lower() {
-    const new_expr = factory.makeNewExpression("", factory.makeUserDefinedTypeName("", this.type_to_str() + "[]", -1));
+    const base_type_str = slot_printing.enabled ? slot_placeholder(this.id) : this.type_to_str();
+    const new_expr = factory.makeNewExpression("", factory.makeUserDefinedTypeName("", base_type_str + "[]", -1));
     return factory.makeFunctionCall("", FunctionCallKind.FunctionCall, new_expr, [this.length.lower() as Expression]);
   }
 }
\ No newline at end of file
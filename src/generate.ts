@@ -6,6 +6,7 @@ import * as decl from "./declaration";
 import { config } from "./config";
 import { init_global_id, init_indent, init_scope } from "./genContext";
 import * as fs from "fs";
+import crypto from "crypto";
 import { assert, pick_random_element } from "./utility";
 import { MappingType, ArrayType, Type } from './type';
 import * as db from './db';
@@ -14,6 +15,7 @@ import { FuncVis, FuncVisProvider, VarVis, VarVisProvider } from "./visibility";
 import { FuncVisMutKind, VarVisKind } from "./vismut";
 import { FuncStat, FuncStatProvider } from "./funcstat";
 import { Log } from "./log";
+import { slot_printing, split_template, fill_template } from "./slot";
 
 import {
   PrettyFormatter,
@@ -42,6 +44,16 @@ function resetASTWriter() {
 }
 
 
+/**
+ * The DAG whose solutions are traversed in the current mode.
+ * It is only prepared before the generation of programs, and its solutions are streamed into programs one by one.
+ * The other DAGs are fully resolved since only one of their solutions is picked.
+ */
+function resolve_dag(dag : typeof type_dag | typeof vismut_dag | typeof storage_location_dag) : Promise<void> {
+  const streamed = config.mode === "type" ? type_dag : config.mode === "scope" ? vismut_dag : config.mode === "loc" ? storage_location_dag : undefined;
+  return dag === streamed ? dag.prepare_resolve() : dag.resolve();
+}
+
 function init_generation() {
   db.init();
   type_dag.clear();
@@ -170,8 +182,46 @@ function assign_array_type(array_decl_id : number, type_solutions : Map<number,
   }
 }
 
+/**
+ * Lower and print the source unit once, with a placeholder in every type slot.
+ */
+function print_template(source_unit_gen : gen.SourceUnitGenerator) : { pieces : string[], slot_ids : number[] } {
+  slot_printing.enabled = true;
+  try {
+    return split_template(writer.write(source_unit_gen.irnode!.lower()));
+  }
+  finally {
+    slot_printing.enabled = false;
+  }
+}
+
+//! The type a slot holds under the current type solution. Literals only contribute their types, not their random values.
+function slot_type_str(slot_id : number) : string {
+  const irnode = irnodes.get(slot_id)!;
+  if (irnode instanceof expr.IRLiteral || irnode instanceof decl.IRVariableDeclaration) {
+    return irnode.type!.str();
+  }
+  if (irnode instanceof expr.IRNewDynamicArray) {
+    return irnode.type_to_str();
+  }
+  throw new Error(`The slot ${slot_id} is neither a literal, a variable declaration nor a new dynamic array.`);
+}
+
+function render_slot(slot_id : number) : string {
+  const irnode = irnodes.get(slot_id)!;
+  if (irnode instanceof expr.IRLiteral) {
+    return writer.write(irnode.lower());
+  }
+  if (irnode instanceof decl.IRVariableDeclaration) {
+    return writer.write(irnode.lower_type(irnode.type!));
+  }
+  if (irnode instanceof expr.IRNewDynamicArray) {
+    return irnode.type_to_str();
+  }
+  throw new Error(`The slot ${slot_id} is neither a literal, a variable declaration nor a new dynamic array.`);
+}
+
 function generate_type_mode(source_unit_gen : gen.SourceUnitGenerator) {
-  console.log(`${type_dag.solutions_collection.length} solution(s)`);
   //! Select one vismut solution
   if (vismut_dag.solutions_collection.length > 0) {
     const vismut_solutions = pick_random_element(vismut_dag.solutions_collection)!;
@@ -203,9 +253,39 @@ function generate_type_mode(source_unit_gen : gen.SourceUnitGenerator) {
       }
     }
   }
-  //! Traverse type solutions
-  if (type_dag.solutions_collection.length === 0) {
-    const program = writer.write(source_unit_gen.irnode!.lower());
+  //! Traverse type solutions as they are enumerated, so each program is written as soon as its solution is found
+  let cnt = 0;
+  //! Type solutions that print the same types into the slots are written only once. Only their digests are kept.
+  const written_programs = new Set<string>();
+  let solution_cnt = 0;
+  //! Type solutions only change the slots of the program, so the rest is printed once
+  let template : { pieces : string[], slot_ids : number[] } | undefined;
+  for (const type_solutions of type_dag.stream_solutions()) {
+    solution_cnt++;
+    type_dag.verify_solution(type_solutions);
+    for (let [key, value] of type_solutions) {
+      if (irnodes.get(key)! instanceof expr.IRLiteral || irnodes.get(key)! instanceof decl.IRVariableDeclaration) {
+        (irnodes.get(key)! as expr.IRLiteral | decl.IRVariableDeclaration).type = value;
+      }
+    }
+    for (const new_dynamic_array_id of db.expr_db.new_dynamic_array_exprs_ids()) {
+      assign_newDynamicArray_type(new_dynamic_array_id, type_solutions);
+    }
+    for (const mapping_decl_id of db.decl_db.mapping_decls_ids()) {
+      assign_mapping_type(mapping_decl_id, type_solutions);
+    }
+    for (const array_decl_id of db.decl_db.array_decls_ids()) {
+      assign_array_type(array_decl_id, type_solutions);
+    }
+    if (template === undefined) {
+      //! Built after the first solution is assigned, so that the storage locations of declarations are settled
+      template = print_template(source_unit_gen);
+    }
+    const slot_assignment = template.slot_ids.map(slot_type_str).join("\n");
+    const slot_digest = crypto.createHash("sha256").update(slot_assignment).digest("hex");
+    if (written_programs.has(slot_digest)) continue;
+    written_programs.add(slot_digest);
+    const program = fill_template(template.pieces, template.slot_ids.map(render_slot));
     if (!fs.existsSync(`${config.out_dir}`)) {
       fs.mkdirSync(`${config.out_dir}`);
     }
@@ -217,51 +297,30 @@ function generate_type_mode(source_unit_gen : gen.SourceUnitGenerator) {
     let minute = date.getMinutes();
     let second = date.getSeconds();
     let millisecond = date.getMilliseconds();
-    let program_name = `program_${year}-${month}-${day}_${hour}:${minute}:${second}:${millisecond}_0.sol`;
+    let program_name = `program_${year}-${month}-${day}_${hour}:${minute}:${second}:${millisecond}_${cnt}.sol`;
+    cnt++;
     fs.writeFileSync(`${config.out_dir}/${program_name}`, program, "utf-8");
   }
-  else {
-    let cnt = 0;
-    let pre_program = "";
-    for (let type_solutions of type_dag.solutions_collection) {
-      if (type_solutions.size === 0) continue;
-      for (let [key, value] of type_solutions) {
-        if (irnodes.get(key)! instanceof expr.IRLiteral || irnodes.get(key)! instanceof decl.IRVariableDeclaration) {
-          (irnodes.get(key)! as expr.IRLiteral | decl.IRVariableDeclaration).type = value;
-        }
-      }
-      for (const new_dynamic_array_id of db.expr_db.new_dynamic_array_exprs_ids()) {
-        assign_newDynamicArray_type(new_dynamic_array_id, type_solutions);
-      }
-      for (const mapping_decl_id of db.decl_db.mapping_decls_ids()) {
-        assign_mapping_type(mapping_decl_id, type_solutions);
-      }
-      for (const array_decl_id of db.decl_db.array_decls_ids()) {
-        assign_array_type(array_decl_id, type_solutions);
-      }
-      const program = writer.write(source_unit_gen.irnode!.lower());
-      if (program === pre_program) continue;
-      pre_program = program;
-      if (!fs.existsSync(`${config.out_dir}`)) {
-        fs.mkdirSync(`${config.out_dir}`);
-      }
-      let date = new Date();
-      let year = date.getFullYear();
-      let month = date.getMonth() + 1;
-      let day = date.getDate();
-      let hour = date.getHours();
-      let minute = date.getMinutes();
-      let second = date.getSeconds();
-      let millisecond = date.getMilliseconds();
-      let program_name = `program_${year}-${month}-${day}_${hour}:${minute}:${second}:${millisecond}_${cnt}.sol`;
-      cnt++;
-      fs.writeFileSync(`${config.out_dir}/${program_name}`, program, "utf-8");
+  console.log(`${solution_cnt} solution(s)`);
+  if (solution_cnt === 0) {
+    const program = writer.write(source_unit_gen.irnode!.lower());
+    if (!fs.existsSync(`${config.out_dir}`)) {
+      fs.mkdirSync(`${config.out_dir}`);
     }
+    let date = new Date();
+    let year = date.getFullYear();
+    let month = date.getMonth() + 1;
+    let day = date.getDate();
+    let hour = date.getHours();
+    let minute = date.getMinutes();
+    let second = date.getSeconds();
+    let millisecond = date.getMilliseconds();
+    let program_name = `program_${year}-${month}-${day}_${hour}:${minute}:${second}:${millisecond}_0.sol`;
+    fs.writeFileSync(`${config.out_dir}/${program_name}`, program, "utf-8");
   }
 }
 
 function generate_scope_mode(source_unit_gen : gen.SourceUnitGenerator) {
-  console.log(`${vismut_dag.solutions_collection.length} solution(s)`);
   //! Select one type solution
   if (type_dag.solutions_collection.length > 0) {
     const type_solutions = pick_random_element(type_dag.solutions_collection)!;
@@ -293,9 +352,31 @@ function generate_scope_mode(source_unit_gen : gen.SourceUnitGenerator) {
         (irnodes.get(key)! as decl.IRVariableDeclaration).loc = storageLocation2loc(value);
     }
   }
-  //! Traverse vismut solutions
-  if (vismut_dag.solutions_collection.length === 0) {
+  //! Traverse vismut solutions as they are enumerated, so each program is written as soon as its solution is found
+  let cnt = 0;
+  //! Whitespace-equivalent programs are written only once. Only their digests are kept.
+  const written_programs = new Set<string>();
+  let solution_cnt = 0;
+  for (const vismut_solutions of vismut_dag.stream_solutions()) {
+    solution_cnt++;
+    vismut_dag.verify_solution(vismut_solutions);
+    for (let [key, value] of vismut_solutions) {
+      if (irnodes.has(key) === false) continue;
+      if (irnodes.get(key)!.typeName === "IRVariableDeclaration") {
+        (irnodes.get(key)! as decl.IRVariableDeclaration).visibility =
+          varvis2statevisibility((value.kind as VarVisKind).visibility);
+      }
+      else if (irnodes.get(key)!.typeName === "IRFunctionDefinition") {
+        (irnodes.get(key)! as decl.IRFunctionDefinition).visibility =
+          funcvis2funcvisibility((value.kind as FuncVisMutKind).visibility);
+        (irnodes.get(key)! as decl.IRFunctionDefinition).stateMutability =
+          funcstat2functionstatemutability((value.kind as FuncVisMutKind).state_mutability);
+      }
+    }
     const program = writer.write(source_unit_gen.irnode!.lower());
+    const program_digest = crypto.createHash("sha256").update(program.replace(/\s+/g, " ").trim()).digest("hex");
+    if (written_programs.has(program_digest)) continue;
+    written_programs.add(program_digest);
     if (!fs.existsSync(`${config.out_dir}`)) {
       fs.mkdirSync(`${config.out_dir}`);
     }
@@ -307,50 +388,30 @@ function generate_scope_mode(source_unit_gen : gen.SourceUnitGenerator) {
     let minute = date.getMinutes();
     let second = date.getSeconds();
     let millisecond = date.getMilliseconds();
-    let program_name = `program_${year}-${month}-${day}_${hour}:${minute}:${second}:${millisecond}_0.sol`;
+    let program_name = `program_${year}-${month}-${day}_${hour}:${minute}:${second}:${millisecond}_${cnt}.sol`;
+    cnt++;
     fs.writeFileSync(`${config.out_dir}/${program_name}`, program, "utf-8");
   }
-  else {
-    let cnt = 0;
-    let pre_program = "";
-    for (const vismut_solutions of vismut_dag.solutions_collection) {
-      if (vismut_solutions.size === 0) continue;
-      for (let [key, value] of vismut_solutions) {
-        if (irnodes.has(key) === false) continue;
-        if (irnodes.get(key)!.typeName === "IRVariableDeclaration") {
-          (irnodes.get(key)! as decl.IRVariableDeclaration).visibility =
-            varvis2statevisibility((value.kind as VarVisKind).visibility);
-        }
-        else if (irnodes.get(key)!.typeName === "IRFunctionDefinition") {
-          (irnodes.get(key)! as decl.IRFunctionDefinition).visibility =
-            funcvis2funcvisibility((value.kind as FuncVisMutKind).visibility);
-          (irnodes.get(key)! as decl.IRFunctionDefinition).stateMutability =
-            funcstat2functionstatemutability((value.kind as FuncVisMutKind).state_mutability);
-        }
-      }
-      const program = writer.write(source_unit_gen.irnode!.lower());
-      if (program === pre_program) continue;
-      pre_program = program;
-      if (!fs.existsSync(`${config.out_dir}`)) {
-        fs.mkdirSync(`${config.out_dir}`);
-      }
-      let date = new Date();
-      let year = date.getFullYear();
-      let month = date.getMonth() + 1;
-      let day = date.getDate();
-      let hour = date.getHours();
-      let minute = date.getMinutes();
-      let second = date.getSeconds();
-      let millisecond = date.getMilliseconds();
-      let program_name = `program_${year}-${month}-${day}_${hour}:${minute}:${second}:${millisecond}_${cnt}.sol`;
-      cnt++;
-      fs.writeFileSync(`${config.out_dir}/${program_name}`, program, "utf-8");
+  console.log(`${solution_cnt} solution(s)`);
+  if (solution_cnt === 0) {
+    const program = writer.write(source_unit_gen.irnode!.lower());
+    if (!fs.existsSync(`${config.out_dir}`)) {
+      fs.mkdirSync(`${config.out_dir}`);
     }
+    let date = new Date();
+    let year = date.getFullYear();
+    let month = date.getMonth() + 1;
+    let day = date.getDate();
+    let hour = date.getHours();
+    let minute = date.getMinutes();
+    let second = date.getSeconds();
+    let millisecond = date.getMilliseconds();
+    let program_name = `program_${year}-${month}-${day}_${hour}:${minute}:${second}:${millisecond}_0.sol`;
+    fs.writeFileSync(`${config.out_dir}/${program_name}`, program, "utf-8");
   }
 }
 
 function generate_loc_mode(source_unit_gen : gen.SourceUnitGenerator) {
-  console.log(`${storage_location_dag.solutions_collection.length} solution(s)`);
   //! Select one type solution
   const type_solutions = pick_random_element(type_dag.solutions_collection)!;
   for (const [key, value] of type_solutions) {
@@ -384,9 +445,27 @@ function generate_loc_mode(source_unit_gen : gen.SourceUnitGenerator) {
       }
     }
   }
-  //! Traverse storage location solutions
-  if (storage_location_dag.solutions_collection.length === 0) {
+  //! Traverse storage location solutions as they are enumerated, so each program is written as soon as its solution is found
+  let cnt = 0;
+  //! Whitespace-equivalent programs are written only once. Only their digests are kept.
+  const written_programs = new Set<string>();
+  let solution_cnt = 0;
+  for (const storage_location_solutions of storage_location_dag.stream_solutions()) {
+    solution_cnt++;
+    storage_location_dag.verify_solution(storage_location_solutions);
+    for (let [key, value] of storage_location_solutions) {
+      //! key may be ghost and is not in irnodes
+      if (!irnodes.has(key)) continue;
+      if (irnodes.get(key)!.typeName !== "IRVariableDeclaration") {
+        continue;
+      }
+      // if ((irnodes.get(key)! as decl.IRVariableDeclaration).loc === undefined)
+      (irnodes.get(key)! as decl.IRVariableDeclaration).loc = storageLocation2loc(value);
+    }
     let program = writer.write(source_unit_gen.irnode!.lower());
+    const program_digest = crypto.createHash("sha256").update(program.replace(/\s+/g, " ").trim()).digest("hex");
+    if (written_programs.has(program_digest)) continue;
+    written_programs.add(program_digest);
     if (!fs.existsSync(`${config.out_dir}`)) {
       fs.mkdirSync(`${config.out_dir}`);
     }
@@ -398,41 +477,26 @@ function generate_loc_mode(source_unit_gen : gen.SourceUnitGenerator) {
     let minute = date.getMinutes();
     let second = date.getSeconds();
     let millisecond = date.getMilliseconds();
-    let program_name = `program_${year}-${month}-${day}_${hour}:${minute}:${second}:${millisecond}_0.sol`;
+    let program_name = `program_${year}-${month}-${day}_${hour}:${minute}:${second}:${millisecond}_${cnt}.sol`;
+    cnt++;
     fs.writeFileSync(`${config.out_dir}/${program_name}`, program, "utf-8");
   }
-  else {
-    let cnt = 0;
-    let pre_program = "";
-    for (let storage_location_solutions of storage_location_dag.solutions_collection) {
-      if (storage_location_solutions.size === 0) continue;
-      for (let [key, value] of storage_location_solutions) {
-        //! key may be ghost and is not in irnodes
-        if (!irnodes.has(key)) continue;
-        if (irnodes.get(key)!.typeName !== "IRVariableDeclaration") {
-          continue;
-        }
-        // if ((irnodes.get(key)! as decl.IRVariableDeclaration).loc === undefined)
-        (irnodes.get(key)! as decl.IRVariableDeclaration).loc = storageLocation2loc(value);
-      }
-      let program = writer.write(source_unit_gen.irnode!.lower());
-      if (program === pre_program) continue;
-      pre_program = program;
-      if (!fs.existsSync(`${config.out_dir}`)) {
-        fs.mkdirSync(`${config.out_dir}`);
-      }
-      let date = new Date();
-      let year = date.getFullYear();
-      let month = date.getMonth() + 1;
-      let day = date.getDate();
-      let hour = date.getHours();
-      let minute = date.getMinutes();
-      let second = date.getSeconds();
-      let millisecond = date.getMilliseconds();
-      let program_name = `program_${year}-${month}-${day}_${hour}:${minute}:${second}:${millisecond}_${cnt}.sol`;
-      cnt++;
-      fs.writeFileSync(`${config.out_dir}/${program_name}`, program, "utf-8");
+  console.log(`${solution_cnt} solution(s)`);
+  if (solution_cnt === 0) {
+    let program = writer.write(source_unit_gen.irnode!.lower());
+    if (!fs.existsSync(`${config.out_dir}`)) {
+      fs.mkdirSync(`${config.out_dir}`);
     }
+    let date = new Date();
+    let year = date.getFullYear();
+    let month = date.getMonth() + 1;
+    let day = date.getDate();
+    let hour = date.getHours();
+    let minute = date.getMinutes();
+    let second = date.getSeconds();
+    let millisecond = date.getMilliseconds();
+    let program_name = `program_${year}-${month}-${day}_${hour}:${minute}:${second}:${millisecond}_0.sol`;
+    fs.writeFileSync(`${config.out_dir}/${program_name}`, program, "utf-8");
   }
 }
 
@@ -472,7 +536,7 @@ export async function generate() {
       }
       let startTime = performance.now();
       let type_resolved = true;
-      await type_dag.resolve().catch((err) => {
+      await resolve_dag(type_dag).catch((err) => {
         if (config.stop_on_erwin_bug) {
           console.error(err);
           process.exit(1);
@@ -488,7 +552,7 @@ export async function generate() {
       console.log(`Time cost of resolving type constraints: ${endTime - startTime} ms`);
       startTime = performance.now();
       let vismut_resolved = true;
-      await vismut_dag.resolve().catch((err) => {
+      await resolve_dag(vismut_dag).catch((err) => {
         if (config.stop_on_erwin_bug) {
           console.error(err);
           process.exit(1);
@@ -504,7 +568,7 @@ export async function generate() {
       console.log(`Time cost of resolving visibility and state mutability constraints: ${endTime - startTime} ms`);
       startTime = performance.now();
       let storage_location_resolved = true;
-      await storage_location_dag.resolve().catch((err) => {
+      await resolve_dag(storage_location_dag).catch((err) => {
         if (config.stop_on_erwin_bug) {
           console.error(err);
           process.exit(1);
@@ -639,7 +703,7 @@ export async function generate() {
       }
       let startTime = performance.now();
       let type_resolved = true;
-      await type_dag.resolve().catch((err) => {
+      await resolve_dag(type_dag).catch((err) => {
         if (config.stop_on_erwin_bug) {
           console.error(err);
           process.exit(1);
@@ -656,7 +720,7 @@ export async function generate() {
       console.log(`Time cost of resolving type constraints: ${endTime - startTime} ms`);
       startTime = performance.now();
       let vismut_resolved = true;
-      await vismut_dag.resolve().catch((err) => {
+      await resolve_dag(vismut_dag).catch((err) => {
         if (config.stop_on_erwin_bug) {
           console.error(err);
           process.exit(1);
@@ -673,7 +737,7 @@ export async function generate() {
       console.log(`Time cost of resolving visibility and state mutability constraints: ${endTime - startTime} ms`);
       startTime = performance.now();
       let storage_location_resolved = true;
-      await storage_location_dag.resolve().catch((err) => {
+      await resolve_dag(storage_location_dag).catch((err) => {
         if (config.stop_on_erwin_bug) {
           console.error(err);
           process.exit(1);
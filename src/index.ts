@@ -1,13 +1,18 @@
 #!/usr/bin/env node
 import { Command } from "commander";
-import { config } from "./config";
+import { config, check_generation_config } from "./config";
 import { assert } from "./utility";
 import { initType, } from './type';
 import * as figlet from "figlet"
 import { generate } from "./generate";
 import { mutate } from "./mutate";
+import { serve } from "./serve";
+import { is_worker, configure_worker, run_workers } from "./workers";
 
-console.log(figlet.textSync('Erwin'));
+//! stdout of `erwin serve` only carries the JSON-line replies, and workers share the stdout of the coordinator
+if (process.argv[2] !== "serve" && !is_worker()) {
+  console.log(figlet.textSync('Erwin'));
+}
 
 const program = new Command();
 program
@@ -29,6 +34,7 @@ program
   .option('-t --target <string>', 'The testing target. The value can be "solidity", "solang", "solar", and "slither". Default to solidity', `${config.target}`)
   // Dominance Constraint Solution
   .option("-max --maximum_solution_count <number>", "The maximum number of solutions Erwin will consider.", `${config.maximum_solution_count}`)
+  .option("--solution_sampling <string>", "How the solutions are picked when there are more than the maximum. The value can be 'enumerate' (the first ones in the enumeration order) or 'uniform' (uniformly at random).", `${config.solution_sampling}`)
   // Type
   .option("--int_types_num <number>", "The upper limit for the quantity of integer data types that will be incorporated into the created Solidity code. The possible values are 1, 2, 3, 4, 5, or 6.", `${config.int_num}`)
   .option("--uint_types_num <number>", "The upper limit for the quantity of unsigned integer data types that will be incorporated into the created Solidity code. The possible values are 1, 2, 3, 4, 5, or 6.", `${config.uint_num}`)
@@ -101,6 +107,7 @@ program
   .option("--event_prob <float>", "The probability of generating an event.", `${config.event_prob}`)
   .option("--error_prob <float>", "The probability of generating an error.", `${config.error_prob}`)
   .option("--generation_rounds <number>", "The number of rounds Erwin will generate.", `${config.generation_rounds}`)
+  .option("--workers <number>", "The number of worker processes that generate programs in parallel. Worker k writes to the subdirectory worker_k of the output directories.", `${config.workers}`)
   .option("--time", "Enable the time limit.", `${config.time}`)
   .option("--time_limit <number>", "The time limit of the generation.", `${config.time_limit}`)
   .option("--log_file_path <string>", "The path of the log file.", `${config.log_file_path}`)
@@ -110,6 +117,13 @@ program
   .option("--test_out_dir <string>", "The output directory for the generated test program. The default is 'test_results'", `${config.test_out_dir}`)
   .option("--terminate_on_compiler_crash", "Terminate the program when a failure occurs during testing the target software under the test mode", `${config.terminate_on_compiler_crash}`)
   .option("--enable_search_space_cmp", "Enable the search space comparison record.", `${config.enable_search_space_cmp}`)
+  .option("--compile_cache_dir <string>", "The directory of the cache of compilation results in the test mode. An empty string disables the cache.", `${config.compile_cache_dir}`)
+  .option("--compile_batch_size <number>", "The number of programs compiled together by one solc process in the test mode.", `${config.compile_batch_size}`)
+  .option("--compile_timeout <number>", "The time limit in seconds of one solc process in the test mode.", `${config.compile_timeout}`)
+program
+  .command("serve")
+  .description("Keep Erwin alive and generate programs on demand. Each line on stdin is a JSON object of configuration overrides, such as {\"id\": 1, \"mode\": \"type\", \"maximum_solution_count\": 50}. Each reply on stdout is a JSON object listing the generated programs.")
+  .option("-o --out_dir <string>", "The default output directory for the generated program. The default is 'generated_programs'", `${config.out_dir}`);
 program.parse(process.argv);
 // Set the configuration
 if (program.args[0] === "mutate") {
@@ -134,6 +148,7 @@ else if (program.args[0] === "generate") {
   config.modifier_count_per_contract_lower_limit = parseInt(program.commands[1].opts().modifier_count_per_contract_lower_limit);
   config.literal_prob = parseFloat(program.commands[1].opts().literal_prob);
   config.maximum_solution_count = parseInt(program.commands[1].opts().maximum_solution_count);
+  config.solution_sampling = program.commands[1].opts().solution_sampling;
   config.tuple_prob = parseFloat(program.commands[1].opts().tuple_prob);
   config.array_length_upperlimit = parseInt(program.commands[1].opts().array_length_upperlimit);
   config.expression_complexity_level = parseInt(program.commands[1].opts().expression_complexity_level);
@@ -183,11 +198,15 @@ else if (program.args[0] === "generate") {
   config.error_decl_per_contract_upperlimit = parseInt(program.commands[1].opts().error_decl_per_contract_upperlimit);
   config.error_decl_per_contract_lowerlimit = parseInt(program.commands[1].opts().error_decl_per_contract_lowerlimit);
   config.generation_rounds = parseInt(program.commands[1].opts().generation_rounds);
+  config.workers = parseInt(program.commands[1].opts().workers);
   if (program.commands[1].opts().time) config.time = true;
   config.time_limit = parseInt(program.commands[1].opts().time_limit);
   config.compiler_path = program.commands[1].opts().compiler_path;
   config.target = program.commands[1].opts().target;
   config.test_out_dir = program.commands[1].opts().test_out_dir;
+  config.compile_cache_dir = program.commands[1].opts().compile_cache_dir;
+  config.compile_batch_size = parseInt(program.commands[1].opts().compile_batch_size);
+  config.compile_timeout = parseFloat(program.commands[1].opts().compile_timeout);
   if (program.commands[1].opts().refresh_folder === true) config.refresh_folder = true;
   if (program.commands[1].opts().debug === true) config.debug = true;
   if (program.commands[1].opts().stop_on_erwin_bug === true) config.stop_on_erwin_bug = true;
@@ -203,93 +222,19 @@ else if (program.args[0] === "generate") {
   }
   initType();
 }
+else if (program.args[0] === "serve") {
+  config.out_dir = program.commands[2].opts().out_dir;
+  initType();
+}
 // Check the validity of the arguments
 if (program.args[0] === "mutate") {
   assert(config.file !== "", "The file to be mutated is not provided.")
 }
 else if (program.args[0] === "generate") {
-  assert(config.array_length_upperlimit >= 1, "The upper limit of the length of an array must be not less than 0.");
-  assert(config.function_body_stmt_cnt_upper_limit >= 0, "The upper limit of the number of statements of a function must be not less than 0.");
-  assert(config.function_body_stmt_cnt_lower_limit >= 0, "The lower limit of the number of statements of a function must be not less than 0.");
-  assert(config.return_count_of_function_upperlimit >= 0, "The upper limit of the number of return values of a function must be not less than 0.");
-  assert(config.return_count_of_function_lowerlimit >= 0, "The lower limit of the number of return values of a function must be not less than 0.");
-  assert(config.param_count_of_function_lowerlimit >= 0, "The lower limit of the number of parameters of a function must be not less than 0.");
-  assert(config.param_count_of_function_upperlimit >= 0, "The upper limit of the number of parameters of a function must be not less than 0.");
-  assert(config.function_count_per_contract_lower_limit <= config.function_count_per_contract_upper_limit, "The lower limit of the number of functions must be less than or equal to the upper limit.");
-  assert(config.function_count_per_contract_lower_limit >= 0, "The number of functions must be not less than 0.");
-  assert(config.modifier_per_function_lower_limit <= config.modifier_per_function_upper_limit, "The lower limit of the number of modifiers must be less than or equal to the upper limit.");
-  assert(config.modifier_per_function_lower_limit >= 0, "The number of modifiers must be not less than 0.");
-  assert(config.modifier_count_per_contract_lower_limit <= config.modifier_count_per_contract_upper_limit, "The lower limit of the number of modifiers must be less than or equal to the upper limit.");
-  assert(config.modifier_count_per_contract_lower_limit >= 0, "The number of modifiers must be not less than 0.");
-  assert(config.literal_prob >= 0 && config.literal_prob <= 1, "The probability of generating a literal must be in the range [0,1].");
-  assert(config.maximum_solution_count >= 0, "The maximum number of solutions must be not less than 0.");
-  assert(config.tuple_prob >= 0 && config.tuple_prob <= 1, "The probability of generating a tuple surrounding an expression must be in the range [0,1].");
-  assert(config.init_state_var_in_constructor_prob >= 0 && config.init_state_var_in_constructor_prob <= 1, "The probability of initializing a state variable in the constructor must be in the range [0,1].");
-  assert(config.expression_complexity_level >= 1, "The complex level of the expression must be not less than 1.");
-  assert(config.state_variable_count_upperlimit >= 0, "state_variable_count_upperlimit must be not less than 0.");
-  assert(config.state_variable_count_lowerlimit >= 0, "state_variable_count_lowerlimit must be not less than 0.");
-  assert(config.contract_count >= 0, "contract_count must be not less than 0.");
-  if (config.mode === "") {
-    console.warn("You didn't specify the mode of Erwin. Therefore, Erwin will generate trivially, without exhaustively enumerating test programs in the search space.");
-    config.mode = "type";
-    config.maximum_solution_count = 1;
-  }
-  assert(["type", "scope", "loc"].includes(config.mode), "The mode is not either 'type', 'scope', 'loc', instead it is " + config.mode);
-  assert(config.uint_num >= 1 && config.uint_num <= 6, "The number of uint types must be in the range [1,6].");
-  assert(config.int_num >= 1 && config.int_num <= 6, "The number of int types must be in the range [1,6].");
-  assert(config.vardecl_prob >= 0 && config.vardecl_prob <= 1.0, "The probability of generating a variable declaration must be in the range [0,1].");
-  assert(config.new_prob >= 0 && config.new_prob <= 1.0, "The probability of generating a variable declaration in place must be in the range [0,1].");
-  assert(config.else_prob >= 0.0 && config.else_prob <= 1.0, "The probability of generating an else statement must be in the range [0,1].");
-  assert(config.mapping_type_prob >= 0.0 && config.mapping_type_prob <= 1.0, "The probability of generating a mapping must be in the range [0,1].");
-  assert(config.array_type_prob >= 0.0 && config.array_type_prob <= 1.0, "The probability of generating an array must be in the range [0,1].");
-  assert(config.string_type_prob >= 0.0 && config.string_type_prob <= 1.0, "The probability of generating a string must be in the range [0,1].");
-  assert(config.contract_type_prob >= 0.0 && config.contract_type_prob <= 1.0, "The probability of generating a contract instance must be in the range [0,1].");
-  assert(config.struct_type_prob >= 0.0 && config.struct_type_prob <= 1.0, "The probability of generating a struct instance must be in the range [0,1].");
-  assert(config.array_type_prob + config.mapping_type_prob + config.contract_type_prob + config.struct_type_prob + config.string_type_prob < 1, "A variable can be of elementary type, contract type, contract type, struct type, mapping type, array type, or string type. Therefore, the sum of the probabilities of generating non-elementary types must be less than 1 to ensure the generation of elementary-type variables.");
-  assert(config.dynamic_array_prob >= 0.0 && config.dynamic_array_prob <= 1.0, "The probability of generating a dynamic array must be in the range [0,1].");
-  assert(config.event_prob >= 0.0 && config.event_prob <= 1.0, "The probability of generating an event must be in the range [0,1].");
-  assert(config.error_prob >= 0.0 && config.error_prob <= 1.0, "The probability of generating an error must be in the range [0,1].");
-  assert(config.return_count_of_function_lowerlimit <= config.return_count_of_function_upperlimit, "The lower limit of the number of return values of a function must be less than or equal to the upper limit.");
-  assert(config.param_count_of_function_lowerlimit <= config.param_count_of_function_upperlimit, "The lower limit of the number of parameters of a function must be less than or equal to the upper limit.");
-  assert(config.state_variable_count_lowerlimit <= config.state_variable_count_upperlimit, "state_variable_count_lowerlimit must be less than or equal to state_variable_count_upperlimit.");
-  assert(config.nonstructured_statement_prob >= 0.0 && config.nonstructured_statement_prob <= 1.0, "The probability of generating a nonstructured statement must be in the range [0,1].");
-  assert(config.expression_complexity_prob >= 0.0 && config.expression_complexity_prob <= 1.0, "The probability of generating a complex expression must be in the range [0,1].");
-  assert(config.function_body_stmt_cnt_lower_limit <= config.function_body_stmt_cnt_upper_limit, "The lower limit of the number of statements of a function must be less than or equal to the upper limit.");
-  assert(config.function_body_stmt_cnt_lower_limit >= 0, "The lower limit of the number of statements of a function must be not less than 1.");
-  assert(config.statement_complexity__level >= 0, "The complex level of the statement must be not less than 0.");
-  assert(config.type_complexity_level >= 0, "The complex level of the type must be not less than 0.");
-  assert(config.for_init_cnt_lower_limit <= config.for_init_cnt_upper_limit, "The lower limit of the number of initialization in a for loop must be less than or equal to the upper limit.");
-  assert(config.for_init_cnt_lower_limit >= 0, "The upper limit of the number of initialization in a for loop must be not less than 0.");
-  assert(config.function_body_stmt_cnt_lower_limit <= config.function_body_stmt_cnt_upper_limit, "The lower limit of the number of statements of a function must be less than or equal to the upper limit.");
-  assert(config.function_body_stmt_cnt_lower_limit >= 0, "The lower limit of the number of statements of a function must be not less than 1.");
-  assert(config.for_body_stmt_cnt_lower_limit <= config.for_body_stmt_cnt_upper_limit, "The lower limit of the number of statements in the body of a for loop must be less than or equal to the upper limit.");
-  assert(config.for_body_stmt_cnt_lower_limit >= 0, "The lower limit of the number of statements in the body of a for loop must be not less than 0.");
-  assert(config.while_body_stmt_cnt_lower_limit <= config.while_body_stmt_cnt_upper_limit, "The lower limit of the number of statements in the body of a while loop must be less than or equal to the upper limit.");
-  assert(config.while_body_stmt_cnt_lower_limit >= 0, "The lower limit of the number of statements in the body of a while loop must be not less than 0.");
-  assert(config.do_while_body_stmt_cnt_lower_limit <= config.do_while_body_stmt_cnt_upper_limit, "The lower limit of the number of statements in the body of a do while loop must be less than or equal to the upper limit.");
-  assert(config.do_while_body_stmt_cnt_lower_limit >= 0, "The lower limit of the number of statements in the body of a do while loop must be not less than 0.");
-  assert(config.if_body_stmt_cnt_lower_limit <= config.if_body_stmt_cnt_upper_limit, "The lower limit of the number of statements in the body of an if statement must be less than or equal to the upper limit.");
-  assert(config.struct_member_variable_count_lowerlimit <= config.struct_member_variable_count_upperlimit, "The lower limit of the number of member variables in a struct must be less than or equal to the upper limit.");
-  assert(config.struct_member_variable_count_lowerlimit >= 1, "The lower limit of the number of member variables in a struct must be not less than 1.");
-  assert(config.struct_decl_per_contract_lowerlimit <= config.struct_decl_per_contract_upperlimit, "The lower limit of the number of struct declarations in a contract must be less than or equal to the upper limit.");
-  assert(config.struct_decl_per_contract_lowerlimit >= 1, "The lower limit of the number of struct declarations in a contract must be not less than 1.");
-  assert(config.event_decl_per_contract_lowerlimit <= config.event_decl_per_contract_upperlimit, "The lower limit of the number of events in a contract must be less than or equal to the upper limit.");
-  assert(config.event_decl_per_contract_lowerlimit >= 1, "The lower limit of the number of events in a contract must be not less than 1.");
-  assert(config.error_decl_per_contract_lowerlimit <= config.error_decl_per_contract_upperlimit, "The lower limit of the number of errors in a contract must be less than or equal to the upper limit.");
-  assert(config.error_decl_per_contract_lowerlimit >= 1, "The lower limit of the number of errors in a contract must be not less than 1.");
-  assert(config.struct_prob >= 0 && config.struct_prob <= 1, "The probability of generating a struct must be in the range [0,1].");
-  assert(config.in_func_initialization_prob >= 0 && config.in_func_initialization_prob <= 1, "The probability of generating an initialization statement must be in the range [0,1].");
-  assert(config.contract_member_initialization_prob >= 0 && config.contract_member_initialization_prob <= 1, "The probability of generating an initialization statement must be in the range [0,1].");
-  assert(config.init_with_state_var_prob >= 0 && config.init_with_state_var_prob <= 1, "The probability of initializing a variable with a state variable must be in the range [0,1].");
-  assert(config.constructor_prob >= 0 && config.constructor_prob <= 1, "The probability of generating a constructor must be in the range [0,1].");
-  assert(config.return_prob >= 0 && config.return_prob <= 1, "The probability of generating a return statement must be in the range [0,1].");
-  assert(config.reuse_name_prob >= 0 && config.reuse_name_prob < 1, "The probability of reusing a name must be in the range [0,1).");
-  assert(config.generation_rounds >= 1, "The number of generation rounds must be not less than 1.");
-  assert(config.test_out_dir !== "", "The output directory for the generated test program is not provided.");
-  if (config.enable_test && config.target !== "slither") {
-    assert(config.compiler_path !== "", "The path of the compiler path is not provided while enabling the testing mode and the target is a solidity compiler.");
+  check_generation_config();
+  if (is_worker()) {
+    configure_worker();
   }
-  assert(['solidity', 'solang', 'solar', 'slither'].includes(config.target), "The target is not either 'solidity', 'solang', 'solar', or 'slither'.");
 }
 
 if (program.args[0] === "mutate") {
@@ -299,6 +244,16 @@ if (program.args[0] === "mutate") {
 }
 else if (program.args[0] === "generate") {
   (async () => {
-    await generate();
+    if (config.workers > 1) {
+      await run_workers();
+    }
+    else {
+      await generate();
+    }
   })();
-}
\ No newline at end of file
+}
+else if (program.args[0] === "serve") {
+  (async () => {
+    await serve();
+  })();
+}
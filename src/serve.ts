@@ -0,0 +1,100 @@
+import * as readline from "readline";
+import * as fs from "fs";
+import { config, check_generation_config } from "./config";
+import { initType } from "./type";
+import { generate } from "./generate";
+
+/**
+ * A generation request sent to `erwin serve`, one JSON object per line.
+ * Except `id`, every field is the name of a configuration item in `config`,
+ * such as `mode`, `maximum_solution_count`, `out_dir`, or `mapping_type_prob`.
+ * The overrides only live through the request they come with.
+ */
+type ServeRequest = { id ?: number | string } & { [key : string] : any };
+
+/**
+ * The reply to a generation request, one JSON object per line.
+ */
+type ServeResponse = {
+  id ?: number | string,
+  ok : boolean,
+  programs : string[],
+  time : number,
+  error ?: string
+};
+
+function apply_overrides(request : ServeRequest) : void {
+  for (const [key, value] of Object.entries(request)) {
+    if (key === "id") continue;
+    if (!(key in config)) {
+      throw new Error(`Unknown configuration item ${key}.`);
+    }
+    const expected = typeof (config as any)[key];
+    if (typeof value !== expected) {
+      throw new Error(`The configuration item ${key} expects a ${expected}, but receives ${JSON.stringify(value)}.`);
+    }
+    (config as any)[key] = value;
+  }
+  if (config.debug) {
+    config.stop_on_erwin_bug = true;
+  }
+  if (config.mode == "scope") {
+    config.int_num = 1;
+    config.uint_num = 1;
+  }
+  initType();
+  check_generation_config();
+}
+
+function list_programs(dir : string) : Set<string> {
+  if (!fs.existsSync(dir)) return new Set<string>();
+  return new Set<string>(fs.readdirSync(dir).filter((file) => file.endsWith(".sol")));
+}
+
+async function handle_request(request : ServeRequest) : Promise<ServeResponse> {
+  //! Snapshot the configuration so that overrides do not leak into the following requests
+  const snapshot = { ...config };
+  const start_time = performance.now();
+  try {
+    apply_overrides(request);
+    const before = config.refresh_folder ? new Set<string>() : list_programs(config.out_dir);
+    await generate();
+    const programs = [...list_programs(config.out_dir)]
+      .filter((file) => !before.has(file))
+      .sort()
+      .map((file) => `${config.out_dir}/${file}`);
+    return { id: request.id, ok: true, programs: programs, time: performance.now() - start_time };
+  }
+  catch (err) {
+    return { id: request.id, ok: false, programs: [], time: performance.now() - start_time, error: `${err}` };
+  }
+  finally {
+    Object.assign(config, snapshot);
+    initType();
+  }
+}
+
+/**
+ * Keep Erwin alive and generate programs on demand.
+ * Requests are read from stdin and replies are written to stdout, both as JSON lines.
+ * Requests are handled one by one in the arrival order.
+ * Everything else Erwin prints during generation is redirected to stderr
+ * so that stdout only carries the replies.
+ */
+export async function serve() {
+  console.log = console.error;
+  const rl = readline.createInterface({ input: process.stdin, terminal: false });
+  for await (const line of rl) {
+    if (line.trim() === "") continue;
+    let request : ServeRequest;
+    try {
+      request = JSON.parse(line);
+    }
+    catch (err) {
+      process.stdout.write(JSON.stringify({ ok: false, programs: [], time: 0, error: `${err}` }) + "\n");
+      continue;
+    }
+    const response = await handle_request(request);
+    process.stdout.write(JSON.stringify(response) + "\n");
+  }
+}
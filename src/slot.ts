@@ -0,0 +1,38 @@
+/**
+ * Slot printing of type-mode variants.
+ * When `slot_printing.enabled` is set, the IR nodes whose text depends on the type solution,
+ * i.e., literals, the type names of variable declarations and the base types of `new T[]`,
+ * lower into placeholders instead of their text. The program is then printed once as a template,
+ * and each type solution only renders the slots and splices them into the template.
+ */
+export const slot_printing = { enabled: false };
+
+const SLOT_PATTERN = /__erwin_slot_(\d+)__/;
+
+export function slot_placeholder(id : number) : string {
+  return `__erwin_slot_${id}__`;
+}
+
+/**
+ * Split a template into text pieces and slot ids.
+ * `pieces` has one more element than `slot_ids`, and slot `slot_ids[i]` sits between `pieces[i]` and `pieces[i + 1]`.
+ */
+export function split_template(template : string) : { pieces : string[], slot_ids : number[] } {
+  //! split with a capturing group interleaves the text pieces and the captured ids
+  const parts = template.split(new RegExp(SLOT_PATTERN.source, "g"));
+  const pieces : string[] = [];
+  const slot_ids : number[] = [];
+  for (let i = 0; i < parts.length; i++) {
+    if (i % 2 === 0) pieces.push(parts[i]);
+    else slot_ids.push(parseInt(parts[i]));
+  }
+  return { pieces, slot_ids };
+}
+
+export function fill_template(pieces : string[], slot_texts : string[]) : string {
+  let program = pieces[0];
+  for (let i = 0; i < slot_texts.length; i++) {
+    program += slot_texts[i] + pieces[i + 1];
+  }
+  return program;
+}
@@ -1,10 +1,11 @@
-import { exec, ExecException } from 'child_process';
+import { exec, spawn, ExecException } from 'child_process';
 import { promisify } from 'util';
 import { readdir, stat } from 'fs/promises';
 import path from 'path';
 import { config } from './config';
 import { select_random_elements, random_int, pick_random_element } from './utility';
 import * as fs from 'fs';
+import { compile_cache_key, get_cached_result, put_cached_result, normalise_error, restore_error } from './cache';
 
 function cleanAnsiCodes(input : string) : string {
   // This regex matches ANSI escape codes
@@ -120,7 +121,10 @@ async function compile_by_solang(file_path : string) : Promise<[string, string]>
   return [stdout, stderr];
 }
 
-async function compile_by_solidity(file_path : string) : Promise<[string, string]> {
+/**
+ * Randomly select the command-line flags of a compilation by solc.
+ */
+function solidity_compilation_flags() : string {
   const output_flags = [
     '--ast-compact-json',
     '--asm',
@@ -247,9 +251,312 @@ async function compile_by_solidity(file_path : string) : Promise<[string, string
     const index = selected_model_checker_flags.indexOf('--model-checker-print-query');
     selected_model_checker_flags.splice(index, 1);
   }
-  const compile_command = `${config.compiler_path} ${file_path} ${pick_random_element(selected_output_flags)} ${selected_opt_flags.join(' ')} ${selected_model_checker_flags.join(' ')}` + ' --via-ir';
-  const { stdout, stderr } = await execPromise(compile_command);
-  return [stdout, stderr];
+  return `${pick_random_element(selected_output_flags)} ${selected_opt_flags.join(' ')} ${selected_model_checker_flags.join(' ')}` + ' --via-ir';
+}
+
+async function compile_by_solidity(file_path : string) : Promise<[string, string]> {
+  const flags = solidity_compilation_flags();
+  //! Skip the compiler if the same program has been compiled by the same compiler with the same flags
+  const key = compile_cache_key(fs.readFileSync(file_path, 'utf-8'), config.compiler_path, flags);
+  const cached = get_cached_result(key);
+  if (cached !== undefined) {
+    const stderr = restore_error(cached.error, file_path);
+    if (cached.status === 0 && cached.signal === null) {
+      return ["", stderr];
+    }
+    //! Fail in the same way as execPromise does
+    throw Object.assign(new Error(`Command failed: ${config.compiler_path} ${file_path} ${flags}`),
+      { code: cached.status, signal: cached.signal, stdout: "", stderr: stderr });
+  }
+  const compile_command = `${config.compiler_path} ${file_path} ${flags}`;
+  try {
+    //! A compiler that hangs on the program is killed, and exec fails with `killed` set
+    const { stdout, stderr } = await execPromise(compile_command, { timeout: config.compile_timeout * 1000, killSignal: 'SIGKILL' });
+    put_cached_result(key, { status: 0, signal: null, error: normalise_error(stderr, file_path) });
+    return [stdout, stderr];
+  }
+  catch (error) {
+    const execError = error as ExecException & {
+      stderr ?: string;
+    };
+    //! Only cache failures of the compiler itself, not those of exec, such as an exceeded maxBuffer
+    if (!execError.killed && (typeof execError.code === 'number' || execError.signal)) {
+      put_cached_result(key, {
+        status: typeof execError.code === 'number' ? execError.code : null,
+        signal: execError.signal ?? null,
+        error: normalise_error(execError.stderr ?? "", file_path)
+      });
+    }
+    throw error;
+  }
+}
+
+//! Output flags of the command line and the corresponding outputs of the standard JSON interface
+const standard_json_outputs : Record<string, [string[], string[]]> = {
+  '--ast-compact-json': [['ast'], []],
+  '--asm': [[], ['evm.assembly']],
+  '--asm-json': [[], ['evm.legacyAssembly']],
+  '--opcodes': [[], ['evm.bytecode.opcodes']],
+  '--bin': [[], ['evm.bytecode.object']],
+  '--bin-runtime': [[], ['evm.deployedBytecode.object']],
+  '--abi': [[], ['abi']],
+  '--ir': [[], ['ir']],
+  '--ir-ast-json': [[], ['irAst']],
+  '--ir-optimized': [[], ['irOptimized']],
+  '--ir-optimized-ast-json': [[], ['irOptimizedAst']],
+  '--hashes': [[], ['evm.methodIdentifiers']],
+  '--userdoc': [[], ['userdoc']],
+  '--devdoc': [[], ['devdoc']],
+  '--metadata': [[], ['metadata']],
+  '--storage-layout': [[], ['storageLayout']],
+};
+
+/**
+ * Translate the flags returned by `solidity_compilation_flags` into the equivalent
+ * `settings` of a `solc --standard-json` input, as experiments/compile.py does.
+ */
+function standard_json_settings(flags : string) : any {
+  const settings : any = { outputSelection: { '*': { '': [], '*': [] } } };
+  const optimizer : any = {};
+  const model_checker : any = {};
+  const tokens = flags.split(/\s+/).filter((token) => token !== '');
+  for (let i = 0; i < tokens.length; i++) {
+    const flag = tokens[i];
+    if (flag in standard_json_outputs) {
+      settings.outputSelection['*'][''].push(...standard_json_outputs[flag][0]);
+      settings.outputSelection['*']['*'].push(...standard_json_outputs[flag][1]);
+    }
+    else if (flag === '--via-ir') settings.viaIR = true;
+    else if (flag === '--optimize') optimizer.enabled = true;
+    else if (flag === '--optimize-runs') optimizer.runs = parseInt(tokens[++i]);
+    else if (flag === '--optimize-yul') optimizer.details = { ...optimizer.details, yul: true };
+    else if (flag === '--no-optimize-yul') optimizer.details = { ...optimizer.details, yul: false };
+    else if (flag === '--yul-optimizations') optimizer.details = { ...optimizer.details, yulDetails: { optimizerSteps: tokens[++i] } };
+    else if (flag === '--model-checker-div-mod-no-slacks') model_checker.divModNoSlacks = true;
+    else if (flag === '--model-checker-engine') model_checker.engine = tokens[++i];
+    else if (flag === '--model-checker-ext-calls') model_checker.extCalls = tokens[++i];
+    else if (flag === '--model-checker-invariants') model_checker.invariants = tokens[++i].split(',');
+    else if (flag === '--model-checker-print-query') model_checker.printQuery = true;
+    else if (flag === '--model-checker-show-proved-safe') model_checker.showProvedSafe = true;
+    else if (flag === '--model-checker-show-unproved') model_checker.showUnproved = true;
+    else if (flag === '--model-checker-show-unsupported') model_checker.showUnsupported = true;
+    else if (flag === '--model-checker-solvers') model_checker.solvers = tokens[++i].split(',');
+    else if (flag === '--model-checker-targets') model_checker.targets = tokens[++i].split(',');
+    else if (flag === '--model-checker-timeout') model_checker.timeout = parseInt(tokens[++i]);
+    else if (flag === '--model-checker-bmc-loop-iterations') model_checker.bmcLoopIterations = parseInt(tokens[++i]);
+  }
+  if (Object.keys(optimizer).length > 0) settings.optimizer = optimizer;
+  if (Object.keys(model_checker).length > 0) settings.modelChecker = model_checker;
+  return settings;
+}
+
+function run_standard_json(input : string) : Promise<{ code : number | null, signal : string | null, stdout : string, killed : boolean }> {
+  return new Promise((resolve) => {
+    const child = spawn(config.compiler_path, ['--standard-json']);
+    let stdout = '';
+    let killed = false;
+    //! Kill solc if it exceeds the time limit, as exec does when compiling one program
+    const timer = setTimeout(() => {
+      killed = true;
+      child.kill('SIGKILL');
+    }, config.compile_timeout * 1000);
+    child.stdout.on('data', (data) => { stdout += data; });
+    child.stderr.resume();
+    child.on('error', () => {
+      clearTimeout(timer);
+      resolve({ code: null, signal: null, stdout: stdout, killed: killed });
+    });
+    child.on('close', (code, signal) => {
+      clearTimeout(timer);
+      resolve({ code: code, signal: signal, stdout: stdout, killed: killed });
+    });
+    child.stdin.on('error', () => { });
+    child.stdin.end(input);
+  });
+}
+
+function compiler_error(file_path : string, flags : string, code : number | null, signal : string | null, stderr : string, killed : boolean = false) : SolidityCompilerError {
+  //! Fail in the same way as execPromise does
+  return Object.assign(new Error(`Command failed: ${config.compiler_path} ${file_path} ${flags}`),
+    { code: code ?? undefined, signal: signal ?? undefined, killed: killed, stdout: "", stderr: stderr }) as SolidityCompilerError;
+}
+
+//! Errors in the settings rather than in a program, such as an unknown EVM version or SMT solver
+const settings_error_types = ['JSONError', 'ConfigError'];
+
+/**
+ * Compile a bucket of programs in one `solc --standard-json` process and map the diagnostics back to the programs.
+ * If solc crashes, times out or reports an error that belongs to no program, such as an internal compiler error,
+ * the bucket is bisected until the triggering program is compiled on its own.
+ * An error in the settings is not bisected but reported for every program of the bucket.
+ * Return the programs that fail, as `compile_by_solidity` would fail on them.
+ */
+async function compile_standard_json_bucket(file_paths : string[], flags : string) : Promise<Map<string, SolidityCompilerError>> {
+  const sources : Record<string, { content : string }> = {};
+  for (const file_path of file_paths) {
+    sources[file_path] = { content: fs.readFileSync(file_path, 'utf-8') };
+  }
+  const input = JSON.stringify({ language: 'Solidity', sources: sources, settings: standard_json_settings(flags) });
+  const { code, signal, stdout, killed } = await run_standard_json(input);
+  let output : any = undefined;
+  try {
+    output = JSON.parse(stdout);
+  }
+  catch (err) { }
+  const messages = new Map<string, string[]>();
+  const unattributed : string[] = [];
+  const settings_errors : string[] = [];
+  if (code === 0 && output !== undefined) {
+    for (const error of output.errors ?? []) {
+      if (error.severity !== 'error') continue;
+      const file_path = error.sourceLocation?.file;
+      const message = error.formattedMessage ?? error.message ?? '';
+      if (file_path !== undefined && file_path in sources) {
+        messages.set(file_path, [...(messages.get(file_path) ?? []), message]);
+      }
+      else if (error.sourceLocation === undefined && settings_error_types.includes(error.type)) {
+        settings_errors.push(message);
+      }
+      else {
+        unattributed.push(message);
+      }
+    }
+    if (settings_errors.length > 0) {
+      return new Map(file_paths.map(file_path =>
+        [file_path, compiler_error(file_path, flags, 1, null, settings_errors.join('\n'))] as [string, SolidityCompilerError]));
+    }
+    if (unattributed.length === 0) {
+      return new Map([...messages].map(([file_path, file_messages]) =>
+        [file_path, compiler_error(file_path, flags, 1, null, file_messages.join('\n'))] as [string, SolidityCompilerError]));
+    }
+  }
+  if (file_paths.length === 1) {
+    return new Map([[file_paths[0], compiler_error(file_paths[0], flags, code === 0 ? 1 : code, signal, unattributed.join('\n'), killed)]]);
+  }
+  const middle = Math.floor(file_paths.length / 2);
+  const failures = await compile_standard_json_bucket(file_paths.slice(0, middle), flags);
+  for (const [file_path, error] of await compile_standard_json_bucket(file_paths.slice(middle), flags)) {
+    failures.set(file_path, error);
+  }
+  return failures;
+}
+
+/**
+ * Compile a bucket of programs with the same random flags in one solc process,
+ * consulting the compilation cache for every program.
+ * Return the programs that fail, as `compile_by_solidity` would fail on them.
+ */
+async function compile_batch_by_solidity(file_paths : string[]) : Promise<Map<string, SolidityCompilerError>> {
+  const flags = solidity_compilation_flags();
+  const failures = new Map<string, SolidityCompilerError>();
+  const keys = new Map<string, string>();
+  for (const file_path of file_paths) {
+    const key = compile_cache_key(fs.readFileSync(file_path, 'utf-8'), config.compiler_path, flags);
+    const cached = get_cached_result(key);
+    if (cached === undefined) {
+      keys.set(file_path, key);
+    }
+    else if (cached.status !== 0 || cached.signal !== null) {
+      failures.set(file_path, compiler_error(file_path, flags, cached.status, cached.signal, restore_error(cached.error, file_path)));
+    }
+  }
+  if (keys.size === 0) return failures;
+  const compiled = await compile_standard_json_bucket([...keys.keys()], flags);
+  for (const [file_path, key] of keys) {
+    const error = compiled.get(file_path);
+    if (error === undefined) {
+      put_cached_result(key, { status: 0, signal: null, error: "" });
+      continue;
+    }
+    //! A timeout depends on the time limit of this run, so it is not cached
+    if (!error.killed) {
+      put_cached_result(key, {
+        status: typeof error.code === 'number' ? error.code : null,
+        signal: error.signal ?? null,
+        error: normalise_error(error.stderr, file_path)
+      });
+    }
+    failures.set(file_path, error);
+  }
+  return failures;
+}
+
+type SolidityCompilerError = ExecException & {
+  stdout : string;
+  stderr : string;
+  signal ?: string;
+};
+
+/**
+ * Save a program that fails the Solidity compiler under `${config.test_out_dir}/solidity_compiler`.
+ * Return 3 if the compiler exceeds the time limit on the program and 1 otherwise.
+ */
+function record_solidity_compiler_error(filePath : string, execError : SolidityCompilerError) : number {
+  console.error(`=========Error in file ${filePath}=========`);
+  // The compiler was killed at the time limit
+  if (execError.killed) {
+    console.error('Time limit exceeded for compiler test');
+    if (!folderExists(config.test_out_dir)) {
+      fs.mkdirSync(config.test_out_dir)
+    }
+    // create folder `${config.test_out_dir}/solidity_compiler` if it does not exist
+    const test_dir = path.join(config.test_out_dir, 'solidity_compiler');
+    if (!folderExists(test_dir)) {
+      fs.mkdirSync(test_dir)
+    }
+    // create folder `${config.test_out_dir}/solidity_compiler/time_limit_exceeded` if it does not exist
+    const time_limit_dir = path.join(test_dir, 'time_limit_exceeded');
+    if (!folderExists(time_limit_dir)) {
+      fs.mkdirSync(time_limit_dir)
+    }
+    // copy the file to `${config.test_out_dir}/solidity_compiler/time_limit_exceeded`
+    fs.copyFileSync(filePath, path.join(time_limit_dir, path.basename(filePath)));
+    return 3;
+  }
+  // Check for segmentation fault first
+  if (execError.signal === 'SIGSEGV') {
+    console.error('Segmentation fault (SIGSEGV) detected in compiler execution');
+    if (!folderExists(config.test_out_dir)) {
+      fs.mkdirSync(config.test_out_dir)
+    }
+    // create folder `${config.test_out_dir}/solidity_compiler` if it does not exist
+    const test_dir = path.join(config.test_out_dir, 'solidity_compiler');
+    if (!folderExists(test_dir)) {
+      fs.mkdirSync(test_dir)
+    }
+    // create folder `${config.test_out_dir}/solidity_compiler/segmentation_fault` if it does not exist
+    const seg_fault_dir = path.join(test_dir, 'segmentation_fault');
+    if (!folderExists(seg_fault_dir)) {
+      fs.mkdirSync(seg_fault_dir)
+    }
+    // copy the file to `${config.test_out_dir}/solidity_compiler/segmentation_fault`
+    fs.copyFileSync(filePath, path.join(seg_fault_dir, path.basename(filePath)))
+  }
+  // If it's not a segmentation fault, check for other errors
+  else if (execError.stderr) {
+    console.error(`Solidity compiler error: ${execError.stderr}`);
+    if (!folderExists(config.test_out_dir)) {
+      fs.mkdirSync(config.test_out_dir)
+    }
+    // create folder `${config.test_out_dir}/solidity_compiler` if it does not exist
+    const test_dir = path.join(config.test_out_dir, 'solidity_compiler');
+    if (!folderExists(test_dir)) {
+      fs.mkdirSync(test_dir)
+    }
+    // create folder `${config.test_out_dir}/solidity_compiler/other_errors` if it does not exist
+    const other_errors_dir = path.join(test_dir, 'other_errors');
+    if (!folderExists(other_errors_dir)) {
+      fs.mkdirSync(other_errors_dir)
+    }
+    // copy the file to `${config.test_out_dir}/solidity_compiler/other_errors`
+    const destinationPath = path.join(other_errors_dir, path.basename(filePath));
+    fs.copyFileSync(filePath, destinationPath);
+    // insert the error message as a comment in the copied file
+    const fileContent = fs.readFileSync(destinationPath);
+    const commentedError = `/*${cleanAnsiCodes(execError.stderr)}*/\n${fileContent}`;
+    fs.writeFileSync(destinationPath, commentedError);
+  }
+  return 1;
 }
 
 /**
@@ -259,123 +566,57 @@ async function compile_by_solidity(file_path : string) : Promise<[string, string
  * - 0 if all the generated programs pass the compilation
  * - 1 if generated program triggers an error
  * - 2 if the output directory does not exist
- * - 3 if the time limit is exceeded
+ * - 3 if a generated program makes the compiler exceed the time limit of one compilation
  * - 4 if the compiler path is incorrect
  */
 export async function test_solidity_compiler() : Promise<number> {
-  return new Promise((resolve) => {
-    const timeoutDuration = 5 * 60 * 1000; // 5 minutes in milliseconds
-    let currentFile : string | null = null;
-    const timeoutId = setTimeout(() => {
-      console.error('Time limit exceeded for compiler test');
-      if (currentFile) {
-        if (!folderExists(config.test_out_dir)) {
-          fs.mkdirSync(config.test_out_dir)
-        }
-        // create folder `${config.test_out_dir}/solidity_compiler` if it does not exist
-        const test_dir = path.join(config.test_out_dir, 'solidity_compiler');
-        // if test_dir does not exist on the OS, create it
-        if (!folderExists(test_dir)) {
-          fs.mkdirSync(test_dir)
-        }
-        // create folder `${config.test_out_dir}/solidity_compiler/time_limit_exceeded` if it does not exist
-        const time_limit_dir = path.join(test_dir, 'time_limit_exceeded');
-        // if time_limit_dir does not exist on the OS, create it
-        if (!folderExists(time_limit_dir)) {
-          fs.mkdirSync(time_limit_dir)
-        }
-        // copy the file to `${config.test_out_dir}/solidity_compiler/time_limit_exceeded`
-        fs.copyFileSync(currentFile, path.join(time_limit_dir, path.basename(currentFile)));
-      }
-      resolve(3);
-    }, timeoutDuration);
-
-    const runCompilerTest = async () : Promise<number> => {
-      // Check if the "generated_programs" directory exists
-      const dirPath = config.out_dir;
-      const stats = await stat(dirPath);
-      if (!stats.isDirectory()) {
-        console.error('Output directory does not exist');
-        return 2;
-      }
+  //! Every compilation is bounded by config.compile_timeout, so a hang costs one time limit and is recorded as a finding
+  // Check if the "generated_programs" directory exists
+  const dirPath = config.out_dir;
+  const stats = await stat(dirPath);
+  if (!stats.isDirectory()) {
+    console.error('Output directory does not exist');
+    return 2;
+  }
 
-      // @ts-ignore
-      const { stdout, stderr } = await execPromise(`${config.compiler_path} --version`);
-      if (stderr) {
-        console.error('Compiler path is incorrect');
-        return 4;
-      }
+  // @ts-ignore
+  const { stdout, stderr } = await execPromise(`${config.compiler_path} --version`);
+  if (stderr) {
+    console.error('Compiler path is incorrect');
+    return 4;
+  }
 
-      const files = await readdir(dirPath);
-      for (const file of files) {
-        const filePath = path.join(dirPath, file);
-        const stats = await stat(filePath);
-        if (stats.isFile()) {
-          currentFile = filePath;
-          try {
-            await compile_by_solidity(filePath);
-          } catch (error) {
-            const execError = error as ExecException & {
-              stdout : string;
-              stderr : string;
-              signal ?: string;
-            };
-            console.error(`=========Error in file ${filePath}=========`);
-            // Check for segmentation fault first
-            if (execError.signal === 'SIGSEGV') {
-              console.error('Segmentation fault (SIGSEGV) detected in compiler execution');
-              if (!folderExists(config.test_out_dir)) {
-                fs.mkdirSync(config.test_out_dir)
-              }
-              // create folder `${config.test_out_dir}/solidity_compiler` if it does not exist
-              const test_dir = path.join(config.test_out_dir, 'solidity_compiler');
-              if (!folderExists(test_dir)) {
-                fs.mkdirSync(test_dir)
-              }
-              // create folder `${config.test_out_dir}/solidity_compiler/segmentation_fault` if it does not exist
-              const seg_fault_dir = path.join(test_dir, 'segmentation_fault');
-              if (!folderExists(seg_fault_dir)) {
-                fs.mkdirSync(seg_fault_dir)
-              }
-              // copy the file to `${config.test_out_dir}/solidity_compiler/segmentation_fault`
-              fs.copyFileSync(filePath, path.join(seg_fault_dir, path.basename(filePath)))
-            }
-            // If it's not a segmentation fault, check for other errors
-            else if (execError.stderr) {
-              console.error(`Solidity compiler error: ${execError.stderr}`);
-              if (!folderExists(config.test_out_dir)) {
-                fs.mkdirSync(config.test_out_dir)
-              }
-              // create folder `${config.test_out_dir}/solidity_compiler` if it does not exist
-              const test_dir = path.join(config.test_out_dir, 'solidity_compiler');
-              if (!folderExists(test_dir)) {
-                fs.mkdirSync(test_dir)
-              }
-              // create folder `${config.test_out_dir}/solidity_compiler/other_errors` if it does not exist
-              const other_errors_dir = path.join(test_dir, 'other_errors');
-              if (!folderExists(other_errors_dir)) {
-                fs.mkdirSync(other_errors_dir)
-              }
-              // copy the file to `${config.test_out_dir}/solidity_compiler/other_errors`
-              const destinationPath = path.join(other_errors_dir, path.basename(filePath));
-              fs.copyFileSync(filePath, destinationPath);
-              // insert the error message as a comment in the copied file
-              const fileContent = fs.readFileSync(destinationPath);
-              const commentedError = `/*${cleanAnsiCodes(execError.stderr)}*/\n${fileContent}`;
-              await fs.writeFileSync(destinationPath, commentedError);
-            }
-            return 1;
-          }
+  const files = await readdir(dirPath);
+  if (config.compile_batch_size > 1) {
+    const filePaths : string[] = [];
+    for (const file of files) {
+      const filePath = path.join(dirPath, file);
+      if ((await stat(filePath)).isFile()) filePaths.push(filePath);
+    }
+    //! Compile the programs in buckets, one solc process per bucket
+    for (let i = 0; i < filePaths.length; i += config.compile_batch_size) {
+      const bucket = filePaths.slice(i, i + config.compile_batch_size);
+      const failures = await compile_batch_by_solidity(bucket);
+      for (const filePath of bucket) {
+        if (failures.has(filePath)) {
+          return record_solidity_compiler_error(filePath, failures.get(filePath)!);
         }
       }
-      return 0;
-    };
-
-    runCompilerTest().then((result) => {
-      clearTimeout(timeoutId);
-      resolve(result);
-    });
-  });
+    }
+    return 0;
+  }
+  for (const file of files) {
+    const filePath = path.join(dirPath, file);
+    const stats = await stat(filePath);
+    if (stats.isFile()) {
+      try {
+        await compile_by_solidity(filePath);
+      } catch (error) {
+        return record_solidity_compiler_error(filePath, error as SolidityCompilerError);
+      }
+    }
+  }
+  return 0;
 }
 
 /**
@@ -578,7 +578,7 @@ export class TypeProvider {
   private static m_payable_address : ElementaryType = new ElementaryType("address", "payable");
 }
 
-export let integer_types : Type[] = [
+const candidate_integer_types : Type[] = [
   TypeProvider.int256(),
   TypeProvider.int128(),
   TypeProvider.int64(),
@@ -587,7 +587,7 @@ export let integer_types : Type[] = [
   TypeProvider.int8()
 ];
 
-export let uinteger_types : Type[] = [
+const candidate_uinteger_types : Type[] = [
   TypeProvider.uint256(),
   TypeProvider.uint128(),
   TypeProvider.uint64(),
@@ -596,6 +596,8 @@ export let uinteger_types : Type[] = [
   TypeProvider.uint8()
 ];
 
+export let integer_types : Type[] = candidate_integer_types;
+export let uinteger_types : Type[] = candidate_uinteger_types;
 export let all_integer_types : Type[];
 export let elementary_types : Type[];
 export const bool_types : Type[] = [TypeProvider.bool()];
@@ -603,8 +605,10 @@ export const address_types : Type[] = [TypeProvider.address(), TypeProvider.paya
 export let size_of_type : number;
 
 export function initType() : void {
-  integer_types = pick_random_subarray(integer_types, config.int_num);
-  uinteger_types = pick_random_subarray(uinteger_types, config.uint_num);
+  //! Always pick from the full candidates so that initType can be called again
+  //! with a different int_num/uint_num, e.g., by `erwin serve`.
+  integer_types = pick_random_subarray(candidate_integer_types, config.int_num);
+  uinteger_types = pick_random_subarray(candidate_uinteger_types, config.uint_num);
   all_integer_types = integer_types.concat(uinteger_types);
   elementary_types = all_integer_types.concat(bool_types).concat(address_types);
   size_of_type = sizeof(elementary_types[0]);
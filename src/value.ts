@@ -182,3 +182,102 @@ export function intersection_range<T>(s1 : Value<T>[], s2 : Value<T>[]) : Value<
   }
   return [...new Set(result)];
 }
+
+/**
+ * A relation between Values, memoised as one bitset per Value over the ids of a ValueLattice.
+ * A row is computed lazily, and only extended when Values are interned after it was computed.
+ */
+class LatticeRelation<T> {
+  private values : Value<T>[];
+  private holds : (v : Value<T>, u : Value<T>) => boolean;
+  private rows : Uint32Array[] = [];
+  private computed : number[] = [];
+  constructor(values : Value<T>[], holds : (v : Value<T>, u : Value<T>) => boolean) {
+    this.values = values;
+    this.holds = holds;
+  }
+
+  row(id : number) : Uint32Array {
+    const size = this.values.length;
+    let row = this.rows[id];
+    if (row === undefined || row.length * 32 < size) {
+      const grown = new Uint32Array(Math.max(1, (size + 31) >>> 5) * 2);
+      if (row !== undefined) grown.set(row);
+      row = this.rows[id] = grown;
+    }
+    const value = this.values[id];
+    for (let j = this.computed[id] ?? 0; j < size; j++) {
+      if (this.holds(value, this.values[j])) row[j >>> 5] |= 1 << (j & 31);
+    }
+    this.computed[id] = size;
+    return row;
+  }
+}
+
+/**
+ * Interns Values as small integer ids and memoises the sub/super/same relations among them as bitsets.
+ * Filtering a range by the subs or supers of another range then costs a few bitwise ORs
+ * instead of rebuilding sets from `subs()`/`supers()` and comparing every pair with `same()`.
+ * Values are interned by identity, and the relations are assumed not to change once interned.
+ */
+export class ValueLattice<T> {
+  private ids : Map<Value<T>, number> = new Map<Value<T>, number>();
+  private values : Value<T>[] = [];
+  // v.is_sub_of(u)
+  private sub_of : LatticeRelation<T> = new LatticeRelation<T>(this.values, (v, u) => v.is_sub_of(u));
+  // v.is_super_of(u)
+  private super_of : LatticeRelation<T> = new LatticeRelation<T>(this.values, (v, u) => v.is_super_of(u));
+  // v.same(u)
+  private same_as : LatticeRelation<T> = new LatticeRelation<T>(this.values, (v, u) => v.same(u));
+
+  id(value : Value<T>) : number {
+    let id = this.ids.get(value);
+    if (id === undefined) {
+      id = this.values.length;
+      this.ids.set(value, id);
+      this.values.push(value);
+    }
+    return id;
+  }
+
+  private filter<V extends Value<T>>(range : V[], bounds : V[], relations : LatticeRelation<T>[]) : V[] {
+    const range_ids = range.map(t => this.id(t));
+    const bound_ids = bounds.map(t => this.id(t));
+    const mask = new Uint32Array((this.values.length + 31) >>> 5);
+    for (const relation of relations) {
+      for (const id of bound_ids) {
+        const row = relation.row(id);
+        for (let w = 0; w < mask.length; w++) mask[w] |= row[w];
+      }
+    }
+    return range.filter((_, i) => (mask[range_ids[i] >>> 5] & (1 << (range_ids[i] & 31))) !== 0);
+  }
+
+  /**
+   * The Values in `range` that are supers of some Value in `bounds`.
+   */
+  supers_in<V extends Value<T>>(range : V[], bounds : V[]) : V[] {
+    return this.filter(range, bounds, [this.sub_of]);
+  }
+
+  /**
+   * The Values in `range` that are subs of some Value in `bounds`.
+   */
+  subs_in<V extends Value<T>>(range : V[], bounds : V[]) : V[] {
+    return this.filter(range, bounds, [this.super_of]);
+  }
+
+  /**
+   * The Values in `range` that are in the same range as some Value in `bounds`.
+   */
+  same_range_in<V extends Value<T>>(range : V[], bounds : V[]) : V[] {
+    return this.filter(range, bounds, [this.sub_of, this.super_of]);
+  }
+
+  /**
+   * The Values in `range` that are the same as some Value in `bounds`.
+   */
+  same_in<V extends Value<T>>(range : V[], bounds : V[]) : V[] {
+    return this.filter(range, bounds, [this.same_as]);
+  }
+}
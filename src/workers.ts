@@ -0,0 +1,86 @@
+import { ChildProcess, fork } from "child_process";
+import * as fs from "fs";
+import path from "path";
+import { config } from "./config";
+
+/**
+ * Parallel generation with `erwin generate --workers N`.
+ * The coordinator forks N copies of Erwin with the same arguments. Every worker is a separate process,
+ * so the module-level databases and constraint DAGs of different workers never meet.
+ * Worker k writes programs to `${out_dir}/worker_k` and test results to `${test_out_dir}/worker_k`.
+ * The generation rounds are split among the workers, and all workers stop at one global deadline.
+ */
+
+const WORKER_ID_ENV = "ERWIN_WORKER_ID";
+const WORKER_ROUNDS_ENV = "ERWIN_WORKER_ROUNDS";
+const WORKER_DEADLINE_ENV = "ERWIN_WORKER_DEADLINE";
+
+export function is_worker() : boolean {
+  return process.env[WORKER_ID_ENV] !== undefined;
+}
+
+function worker_dir(dir : string, worker_id : string) : string {
+  return path.join(dir, `worker_${worker_id}`);
+}
+
+function worker_file(file : string, worker_id : string) : string {
+  const parsed = path.parse(file);
+  return path.join(parsed.dir, `${parsed.name}_worker_${worker_id}${parsed.ext}`);
+}
+
+/**
+ * Redirect the outputs of this worker to its own subdirectories and take its share of the rounds and time.
+ */
+export function configure_worker() : void {
+  const worker_id = process.env[WORKER_ID_ENV]!;
+  config.workers = 1;
+  config.out_dir = worker_dir(config.out_dir, worker_id);
+  config.test_out_dir = worker_dir(config.test_out_dir, worker_id);
+  config.log_file_path = worker_file(config.log_file_path, worker_id);
+  //! Erwin only creates the leaf folders of outputs
+  fs.mkdirSync(config.out_dir, { recursive: true });
+  fs.mkdirSync(path.dirname(config.test_out_dir), { recursive: true });
+  config.generation_rounds = parseInt(process.env[WORKER_ROUNDS_ENV]!);
+  config.time_limit = Math.max(0, (parseInt(process.env[WORKER_DEADLINE_ENV]!) - Date.now()) / 1000);
+}
+
+/**
+ * Fork the workers and wait for them.
+ * If a worker exits with a non-zero code, e.g., it stops on an Erwin bug or a compiler crash,
+ * the other workers are killed and the coordinator exits with the same code.
+ */
+export async function run_workers() : Promise<void> {
+  const deadline = Date.now() + config.time_limit * 1000;
+  //! Without a time limit, there is no point in forking more workers than rounds
+  const worker_count = config.time ? config.workers : Math.min(config.workers, config.generation_rounds);
+  const children : ChildProcess[] = [];
+  const exits : Promise<number>[] = [];
+  for (let k = 0; k < worker_count; k++) {
+    const rounds = Math.floor(config.generation_rounds / worker_count) + (k < config.generation_rounds % worker_count ? 1 : 0);
+    const child = fork(process.argv[1], process.argv.slice(2), {
+      env: {
+        ...process.env,
+        [WORKER_ID_ENV]: `${k}`,
+        [WORKER_ROUNDS_ENV]: `${rounds}`,
+        [WORKER_DEADLINE_ENV]: `${deadline}`
+      }
+    });
+    children.push(child);
+    exits.push(new Promise<number>((resolve) => {
+      child.on("exit", (code, signal) => resolve(code ?? (signal === null ? 0 : 1)));
+    }));
+  }
+  const codes = await Promise.all(exits.map((exit, k) => exit.then((code) => {
+    if (code !== 0) {
+      console.error(`Worker ${k} exited with code ${code}.`);
+      for (const child of children) {
+        if (child.exitCode === null) child.kill();
+      }
+    }
+    return code;
+  })));
+  const failure = codes.find((code) => code !== 0);
+  if (failure !== undefined) {
+    process.exit(failure);
+  }
+}
@@ -43,6 +43,82 @@ async () => {
 }
 )
 
+test("test streaming solutions",
+async () => {
+  type_dag.insert(1, uinteger_types);
+  type_dag.insert(2, uinteger_types);
+  type_dag.insert(3, uinteger_types);
+  type_dag.insert(4, uinteger_types);
+  type_dag.connect(1, 2, "sub");
+  type_dag.connect(1, 3);
+  type_dag.connect(3, 4, "sub");
+  config.mode = "type";
+  config.maximum_solution_count = 3;
+  await type_dag.prepare_resolve();
+  let solution_count = 0;
+  for (const solutions of type_dag.stream_solutions()) {
+    type_dag.verify_solution(solutions);
+    solution_count++;
+  }
+  expect(solution_count).toEqual(3);
+  //! Streamed solutions are not collected
+  expect(type_dag.solutions_collection.length).toEqual(0);
+  config.mode = "";
+  config.maximum_solution_count = 500;
+  type_dag.clear();
+}
+)
+
+test("test uniform sampling",
+async () => {
+  type_dag.insert(1, uinteger_types);
+  type_dag.insert(2, uinteger_types);
+  type_dag.insert(3, uinteger_types);
+  type_dag.insert(4, uinteger_types);
+  type_dag.connect(1, 2, "sub");
+  type_dag.connect(1, 3);
+  type_dag.connect(3, 4, "sub");
+  config.mode = "type";
+  config.maximum_solution_count = 3;
+  config.solution_sampling = "uniform";
+  await type_dag.prepare_resolve();
+  const sampled = new Set<string>();
+  for (const solutions of type_dag.stream_solutions()) {
+    type_dag.verify_solution(solutions);
+    sampled.add(Array.from(solutions).map(t => `${t[0]}:${t[1].str()}`).join(","));
+  }
+  //! Sampled solutions are distinct
+  expect(sampled.size).toEqual(3);
+  config.mode = "";
+  config.maximum_solution_count = 500;
+  config.solution_sampling = "enumerate";
+  type_dag.clear();
+}
+)
+
+test("test counting solutions",
+async () => {
+  type_dag.insert(1, uinteger_types);
+  type_dag.insert(2, uinteger_types);
+  type_dag.insert(3, uinteger_types);
+  type_dag.insert(4, uinteger_types);
+  type_dag.insert(5, uinteger_types);
+  type_dag.connect(1, 2, "sub");
+  type_dag.connect(1, 3);
+  type_dag.connect(3, 4, "sub");
+  type_dag.connect(1, 5);
+  config.mode = "type";
+  await type_dag.prepare_resolve();
+  let solution_count = 0;
+  for (const _ of type_dag.stream_solutions()) {
+    solution_count++;
+  }
+  expect(type_dag.count_solutions()).toEqual(BigInt(solution_count));
+  config.mode = "";
+  type_dag.clear();
+}
+)
+
 test("test constraint dag 3",
 async () => {
   type_dag.insert(1, uinteger_types);